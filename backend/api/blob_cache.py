@@ -0,0 +1,146 @@
+"""
+Size bounded on disk LRU cache for Firebase Storage blobs.
+Entries are keyed by path and generation, so an overwritten blob is never served stale.
+Callers get a hard link to the cached file, it stays valid even if the entry is evicted.
+The directory can be shared, each process keeps its own index and size bound over it.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+from google.cloud.storage import Blob, Bucket
+from loguru import logger
+
+BLOB_CACHE_DIR = os.getenv(
+    "SABQCHA_BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sabqcha-blob-cache")
+)
+BLOB_CACHE_MAX_BYTES = int(float(os.getenv("SABQCHA_BLOB_CACHE_MAX_MB", "1024")) * 1e6)
+
+
+class BlobCache:
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self._dir = Path(directory)
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()  # file name -> size, LRU first
+        self._size = 0
+        self._loaded = False
+        self._in_flight: dict[str, asyncio.Task[Path]] = {}
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0, "bytes_downloaded": 0}
+
+    async def download_to_filename(
+        self, bucket: Bucket, file_path: str, dest: str, blob: Blob | None = None
+    ):
+        """Drop in for `blob.download_to_filename`, pass `blob` if its metadata is loaded."""
+        if blob is None or blob.generation is None:
+            blob = await asyncio.to_thread(bucket.get_blob, file_path)
+            if not blob:
+                raise FileNotFoundError(file_path)
+
+        assert blob.size is not None
+        if blob.size > self._max_bytes:
+            await asyncio.to_thread(blob.download_to_filename, dest)
+            return
+
+        self._load()
+        key = f"{bucket.name}/{file_path}#{blob.generation}"
+        name = hashlib.sha256(key.encode()).hexdigest() + Path(file_path).suffix
+
+        if name in self._entries and not (self._dir / name).exists():
+            # Evicted by another process sharing the directory
+            self._forget(name)
+
+        if name in self._entries:
+            self._entries.move_to_end(name)
+            self.stats["hits"] += 1
+            outcome = "hit"
+            cached = self._dir / name
+        elif name in self._in_flight:
+            # Someone is already downloading it, wait for theirs
+            self.stats["shared"] += 1
+            outcome = "shared"
+            cached = await asyncio.shield(self._in_flight[name])
+        else:
+            self.stats["misses"] += 1
+            outcome = "miss"
+            task = asyncio.create_task(self._fetch(blob, name))
+            self._in_flight[name] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(name, None))
+            cached = await asyncio.shield(task)
+
+        try:
+            await asyncio.to_thread(_link, cached, Path(dest))
+        except FileNotFoundError:
+            self._forget(name)
+            await asyncio.to_thread(blob.download_to_filename, dest)
+
+        logger.info("Blob cache {} for {}, hit rate {:.0%}", outcome, file_path, self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["shared"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["shared"]) / lookups if lookups else 0.0
+
+    def _load(self):
+        """Pick up what earlier processes left in the cache directory, oldest first."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        files = [p for p in self._dir.iterdir() if p.is_file() and not p.name.startswith(".")]
+        for path in sorted(files, key=lambda p: p.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._size += size
+        self._evict()
+
+    async def _fetch(self, blob: Blob, name: str) -> Path:
+        path = self._dir / name
+        # Downloads land under a dot name and are renamed into place once complete
+        fd, partial = tempfile.mkstemp(prefix=".", dir=self._dir)
+        os.close(fd)
+        try:
+            await asyncio.to_thread(blob.download_to_filename, partial)
+            os.replace(partial, path)
+        except BaseException:
+            Path(partial).unlink(missing_ok=True)
+            raise
+
+        size = path.stat().st_size
+        self._entries[name] = size
+        self._size += size
+        self.stats["bytes_downloaded"] += size
+        self._evict(keep=name)
+        return path
+
+    def _forget(self, name: str):
+        self._size -= self._entries.pop(name, 0)
+
+    def _evict(self, keep: str | None = None):
+        while self._size > self._max_bytes and self._entries:
+            name, size = next(iter(self._entries.items()))
+            if name == keep:
+                break
+            del self._entries[name]
+            self._size -= size
+            (self._dir / name).unlink(missing_ok=True)
+            self.stats["evictions"] += 1
+
+
+def _link(source: Path, dest: Path):
+    # Replace dest atomically, falling back to a copy across file systems
+    partial = dest.with_name(f".{dest.name}.partial")
+    partial.unlink(missing_ok=True)
+    try:
+        os.link(source, partial)
+    except OSError:
+        shutil.copyfile(source, partial)
+    os.replace(partial, dest)
+
+
+cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES)
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LruTtlCache(Generic[K, V]):
+    """
+    Bounded in-process LRU cache with an optional per-entry TTL.
+    Not thread safe, meant to be used from the event loop only.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float | None = None) -> None:
+        assert max_size > 0
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V):
+        expires_at = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        )
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K):
+        self._entries.pop(key, None)
+
+    def evict_where(self, predicate: Callable[[K, V], bool]) -> int:
+        """Drop every entry matching the predicate, returns the number of dropped entries."""
+        keys = [k for k, (_, v) in self._entries.items() if predicate(k, v)]
+        for k in keys:
+            del self._entries[k]
+        return len(keys)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,80 +1,158 @@
 import asyncio
-import base64
+import hashlib
 import os
 import tempfile
-from asyncio.log import logger
+import time
 from pathlib import Path
 
 import pikepdf
 from google.cloud.storage import Bucket
+from loguru import logger
 from openai import AsyncOpenAI
-from pdf2image import convert_from_path
 
+from api import blob_cache, image_prep, pdf_utils
+from api.controllers import past_paper_controller
 from api.dal import past_paper_db, quiz_db
 from api.dependencies import DataContext
-from api.job_utils import background_job_decorator
+from api.exceptions import SolutionGradingError
+from api.job_utils import background_job_decorator, report_progress
+from api.models.quiz_model import Quiz, StudentSolution
 from api.prompts import GRADER_SYSTEM_PROMPT
 
+# Bounds the LLM grading calls a bulk grading job has in flight
+MAX_CONCURRENT_GRADINGS = int(os.getenv("SABQCHA_MAX_CONCURRENT_GRADINGS", "5"))
 
-@background_job_decorator(
-    lambda _, __, kwargs: f"{kwargs.get('quiz_id')}-{kwargs.get('solution_id')}"
-)
-async def grade_quiz(
+
+def _solutions_job_identifier(_, __, kwargs) -> str:
+    solution_ids = ",".join(sorted(kwargs.get("solution_ids", [])))
+    digest = hashlib.sha256(solution_ids.encode()).hexdigest()[:16]
+    return f"{kwargs.get('quiz_id')}-grade-{digest}"
+
+
+@background_job_decorator(_solutions_job_identifier)
+async def grade_quiz_solutions(
     data_context: DataContext,
     bucket: Bucket,
     openai_client: AsyncOpenAI,
     quiz_id: str,
-    solution_id: str,
+    solution_ids: list[str],
 ):
     """
-    Find the quiz_content -> Rubrics and Answer_sheet
-    Get the file path for solution_id
-    Download the file
-    Convert the file to images
-    Grading prompt
+    Grade a batch of a quiz's solutions, MAX_CONCURRENT_GRADINGS at a time.
+    The quiz is loaded once and every call starts with the same rubric and
+    marking scheme prefix, so the provider serves it from its prompt cache.
+    Already graded solutions are skipped, so a retry only redoes the failures.
     """
-    logger.info("Grading quiz {} for solution {}", quiz_id, solution_id)
-
     quiz = await quiz_db.get_quiz(data_context, quiz_id=quiz_id)
     assert quiz
     assert quiz.ms_llm_content_extract_content and quiz.rubric_llm_content_extract_content
 
-    solution = await quiz_db.get_student_solution(data_context, solution_id=solution_id)
-    assert solution
+    ungraded = await quiz_db.list_student_solutions(
+        data_context, quiz_id=quiz_id, ungraded_only=True
+    )
+    pending = {s.id: s for s in ungraded}
+    solutions = [pending[solution_id] for solution_id in solution_ids if solution_id in pending]
+
+    logger.info("Grading {} solutions for quiz {}", len(solutions), quiz_id)
+
+    slots = asyncio.Semaphore(MAX_CONCURRENT_GRADINGS)
+    graded = 0
+    failed: list[str] = []
+
+    async def _grade(solution: StudentSolution):
+        nonlocal graded
+        async with slots:
+            try:
+                await _grade_solution(data_context, bucket, openai_client, quiz, solution)
+            except Exception:
+                logger.exception("Failed to grade solution {} for quiz {}", solution.id, quiz_id)
+                failed.append(solution.id)
+                return
+
+        graded += 1
+        logger.info("Graded {}/{} solutions for quiz {}", graded, len(solutions), quiz_id)
+        await report_progress(f"graded {graded}/{len(solutions)}", graded * 100 // len(solutions))
+
+    await report_progress(f"graded 0/{len(solutions)}", 0)
+    start_time = time.perf_counter()
+    await asyncio.gather(*[_grade(s) for s in solutions])
+    logger.info(
+        "Graded {} solutions for quiz {} in {:.2f}s, {} failed",
+        graded,
+        quiz_id,
+        time.perf_counter() - start_time,
+        len(failed),
+    )
 
+    if failed:
+        raise SolutionGradingError(f"Failed to grade solutions {failed}")
+
+
+def _quiz_grading_prefix(quiz: Quiz) -> list[dict]:
+    """
+    The part of the grading input shared by every solution of a quiz.
+    It must stay byte for byte identical across calls for prompt caching to hit.
+    """
+    return [
+        {"role": "system", "content": GRADER_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "input_text",
+                    "text": f"Rubric for grading guidelines: {quiz.rubric_llm_content_extract_content}",
+                },
+                {
+                    "type": "input_text",
+                    "text": f"Correct solution for reference: {quiz.ms_llm_content_extract_content}",
+                },
+            ],
+        },
+    ]
+
+
+async def _grade_solution(
+    data_context: DataContext,
+    bucket: Bucket,
+    openai_client: AsyncOpenAI,
+    quiz: Quiz,
+    solution: StudentSolution,
+):
+    """
+    Get the file path for the solution
+    Download the file
+    Convert the file to images
+    Grading prompt
+    """
     with tempfile.TemporaryDirectory() as temp_dir:
         file_path_obj = Path(solution.solution_path)
         extension = file_path_obj.suffix
         assert extension == ".pdf"
 
         storage_file = tempfile.NamedTemporaryFile(suffix=extension, dir=temp_dir, delete=False)
-        blob = bucket.blob(solution.solution_path)
-        await asyncio.to_thread(blob.download_to_filename, storage_file.name)
+        await blob_cache.cache.download_to_filename(
+            bucket, solution.solution_path, storage_file.name
+        )
 
         compressed_pdf = tempfile.NamedTemporaryFile(suffix=extension, dir=temp_dir, delete=False)
         await asyncio.to_thread(compress_pdf, storage_file.name, compressed_pdf.name)
-        images = await asyncio.to_thread(pdf_to_images, compressed_pdf.name, temp_dir, dpi=150)
+        images = await pdf_utils.render_pdf(
+            compressed_pdf.name, image_prep.HANDWRITING, reference_dpi=150
+        )
+        image_prep.record_savings(f"Grading quiz {quiz.id} solution {solution.id}", images)
 
         response = await openai_client.responses.create(
             model="gpt-5-mini",
             input=[
-                {"role": "system", "content": GRADER_SYSTEM_PROMPT},
+                *_quiz_grading_prefix(quiz),
                 {
                     "role": "user",
                     "content": [
-                        {
-                            "type": "input_text",
-                            "text": f"Rubric for grading guidelines: {quiz.rubric_llm_content_extract_content}",
-                        },
-                        {
-                            "type": "input_text",
-                            "text": f"Correct solution for reference: {quiz.ms_llm_content_extract_content}",
-                        },
                         {
                             "type": "input_text",
                             "text": "Student's answer to be graded:",
                         },
-                        *[get_model_input_for_img(img) for img in images],
+                        *[image_prep.get_model_input(img) for img in images],
                         {
                             "type": "input_text",
                             "text": (
@@ -84,9 +162,10 @@ async def grade_quiz(
                     ],
                 },
             ],
+            prompt_cache_key=f"quiz-grading-{quiz.id}",
         )
 
-    await quiz_db.update_llm_contents_for_solution(data_context, solution_id, response.output_text)
+    await quiz_db.update_llm_contents_for_solution(data_context, solution.id, response.output_text)
 
     logger.info(
         "LLM responded with solution: {} ... {}",
@@ -95,8 +174,9 @@ async def grade_quiz(
     )
     if response.usage:
         logger.info(
-            "{} Input and {} Output tokens used",
+            "{} Input ({} cached) and {} Output tokens used",
             response.usage.input_tokens,
+            response.usage.input_tokens_details.cached_tokens,
             response.usage.output_tokens,
         )
 
@@ -131,15 +211,22 @@ async def grade_question(
     rubric = await past_paper_db.get_rubric_for_past_paper(data_context, past_paper_id)
     assert rubric
 
+    # Question and marking scheme pages are prepared once per paper, only the upload is new
+    past_paper_inputs = await past_paper_controller.get_past_paper_inputs(
+        data_context, bucket, past_paper
+    )
+
     with tempfile.TemporaryDirectory() as temp_dir:
         solution_file = await download_temp_img_file(bucket, solution_file_path, temp_dir)
-        question_file = await download_temp_img_file(
-            bucket, past_paper.question_file_path, temp_dir
+        solution_image = await image_prep.prepare_image_file(
+            solution_file, image_prep.HANDWRITING
         )
-        marking_scheme_file = await download_temp_img_file(
-            bucket, past_paper.marking_scheme_file_path, temp_dir
+        image_prep.record_savings(
+            f"Grading past paper {past_paper_id} for user {user_id}",
+            [*past_paper_inputs.images, solution_image],
         )
 
+        await report_progress("grading", 30)
         response = await openai_client.responses.create(
             model="gpt-5-mini",
             input=[
@@ -155,17 +242,17 @@ async def grade_question(
                             "type": "input_text",
                             "text": "Question for reference: ",
                         },
-                        get_model_input_for_img(question_file),
+                        *past_paper_inputs.question,
                         {
                             "type": "input_text",
                             "text": "Correct solution for reference: ",
                         },
-                        get_model_input_for_img(marking_scheme_file),
+                        *past_paper_inputs.marking_scheme,
                         {
                             "type": "input_text",
                             "text": "Student's answer to be graded:",
                         },
-                        get_model_input_for_img(solution_file),
+                        image_prep.get_model_input(solution_image),
                         {
                             "type": "input_text",
                             "text": (
@@ -202,58 +289,11 @@ async def download_temp_img_file(bucket: Bucket, file_path: str, dir: str) -> st
     assert extension in [".jpg", ".jpeg", ".png"]
     storage_file = tempfile.NamedTemporaryFile(suffix=extension, dir=dir, delete=False)
 
-    blob = bucket.blob(file_path)
-    await asyncio.to_thread(blob.download_to_filename, storage_file.name)
+    await blob_cache.cache.download_to_filename(bucket, file_path, storage_file.name)
 
     return storage_file.name
 
 
-def pdf_to_images(pdf_path: str, output_dir: str = "pdf_images", dpi: int = 300):
-    """
-    Converts all pages of a PDF into images.
-
-    Args:
-        pdf_path (str): Path to the PDF file.
-        output_dir (str): Directory to save images.
-        dpi (int): Image resolution (higher = sharper but larger).
-
-    Returns:
-        list[str]: Paths of the saved image files.
-    """
-    base_name = os.path.basename(pdf_path)
-    file_name = os.path.splitext(base_name)[0]
-
-    # Create output folder if not exists
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Convert PDF pages to images
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    image_paths = []
-
-    # Save each page as an image
-    for i, page in enumerate(pages, start=1):
-        image_path = os.path.join(output_dir, f"{file_name}_p_{i}.jpg")
-        page.save(image_path, "JPEG")
-        image_paths.append(image_path)
-        logger.info("Saved {}", image_path)
-
-    return image_paths
-
-
-def encode_image(image_path) -> str:
-    """Function to encode the image"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
-
-def get_model_input_for_img(path):
-    base64_image = encode_image(path)
-    return {
-        "type": "input_image",
-        "image_url": f"data:image/jpeg;base64,{base64_image}",
-    }
-
-
 def compress_pdf(input_path: str, output_path: str):
     pdf = pikepdf.open(input_path)
     pdf.save(output_path)
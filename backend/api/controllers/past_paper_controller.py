@@ -0,0 +1,121 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+from google.cloud.storage import Bucket
+from loguru import logger
+from pydantic import BaseModel
+
+from api import blob_cache, image_prep, pdf_utils
+from api.cache_utils import LruTtlCache
+from api.dal import past_paper_db
+from api.dependencies import DataContext, UnAuthDataContext
+from api.exceptions import NoImagesInPdfError, UnsupportedExtensionError
+from api.image_prep import PreparedImage
+from api.models.past_paper_models import PastPaper, PastPaperAssetKind
+
+# Question papers and marking schemes are printed, a change here re-renders every asset
+ASSET_PROFILE = image_prep.DOCUMENT
+ASSET_PROFILE_KEY = ASSET_PROFILE.model_dump_json()
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+class PastPaperInputs(BaseModel):
+    """A past paper's pages, encoded and ready to drop into a grading request."""
+
+    question: list[dict[str, str]]
+    marking_scheme: list[dict[str, str]]
+    images: list[PreparedImage]
+
+
+# Shared by every student attempting the same paper, keyed by the paper and its files
+_inputs_cache: LruTtlCache[tuple[str, str, str], PastPaperInputs] = LruTtlCache(max_size=64)
+
+
+async def prepare_past_paper_asset(
+    data_context: DataContext | UnAuthDataContext,
+    bucket: Bucket,
+    past_paper_id: str,
+    kind: PastPaperAssetKind,
+    file_path: str,
+) -> list[PreparedImage]:
+    """Render and store one of a past paper's files, one asset per page."""
+    extension = Path(file_path).suffix.lower()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage_file = tempfile.NamedTemporaryFile(suffix=extension, dir=temp_dir, delete=False)
+        await blob_cache.cache.download_to_filename(bucket, file_path, storage_file.name)
+
+        if extension == ".pdf":
+            images = await pdf_utils.render_pdf(
+                storage_file.name, ASSET_PROFILE, reference_dpi=300
+            )
+            if not images:
+                raise NoImagesInPdfError
+        elif extension in IMAGE_EXTENSIONS:
+            images = [await image_prep.prepare_image_file(storage_file.name, ASSET_PROFILE)]
+        else:
+            raise UnsupportedExtensionError
+
+    await past_paper_db.replace_past_paper_assets(
+        data_context, past_paper_id, kind, file_path, ASSET_PROFILE_KEY, images
+    )
+    logger.info(
+        "Prepared {} {} pages ({:.1f} KB) for past paper {}",
+        len(images),
+        kind,
+        sum(len(i.data) for i in images) / 1e3,
+        past_paper_id,
+    )
+    return images
+
+
+async def get_past_paper_inputs(
+    data_context: DataContext, bucket: Bucket, past_paper: PastPaper
+) -> PastPaperInputs:
+    """
+    The paper's question and marking scheme model inputs.
+    Served from memory, then from past_paper_asset, and only rendered if the
+    ingest step (api.ingest_past_papers) hasn't prepared the paper yet.
+    """
+    key = (past_paper.id, past_paper.question_file_path, past_paper.marking_scheme_file_path)
+    cached = _inputs_cache.get(key)
+    if cached:
+        return cached
+
+    assets = await past_paper_db.list_past_paper_assets(
+        data_context, past_paper.id, ASSET_PROFILE_KEY
+    )
+    pages: dict[PastPaperAssetKind, list[PreparedImage]] = {kind: [] for kind in PastPaperAssetKind}
+    for asset in assets:
+        pages[asset.kind].append(
+            PreparedImage.model_validate(asset.model_dump(exclude={"kind", "page"}))
+        )
+
+    file_paths = {
+        PastPaperAssetKind.QUESTION: past_paper.question_file_path,
+        PastPaperAssetKind.MARKING_SCHEME: past_paper.marking_scheme_file_path,
+    }
+    missing = [kind for kind in PastPaperAssetKind if not pages[kind]]
+    if missing:
+        logger.warning("Past paper {} has no prepared {}, preparing now", past_paper.id, missing)
+        prepared = await asyncio.gather(
+            *[
+                prepare_past_paper_asset(
+                    data_context, bucket, past_paper.id, kind, file_paths[kind]
+                )
+                for kind in missing
+            ]
+        )
+        pages.update(zip(missing, prepared))
+
+    inputs = PastPaperInputs(
+        question=[image_prep.get_model_input(i) for i in pages[PastPaperAssetKind.QUESTION]],
+        marking_scheme=[
+            image_prep.get_model_input(i) for i in pages[PastPaperAssetKind.MARKING_SCHEME]
+        ],
+        images=[*pages[PastPaperAssetKind.QUESTION], *pages[PastPaperAssetKind.MARKING_SCHEME]],
+    )
+    _inputs_cache.set(key, inputs)
+    return inputs
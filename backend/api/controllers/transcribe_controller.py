@@ -1,44 +1,73 @@
 import asyncio
-import base64
+import contextlib
+import hashlib
 import math
 import os
 import tempfile
+import time
 from pathlib import Path
 
 import ffmpeg
-import requests
 from google.cloud.storage import Bucket
 from loguru import logger
 from openai import AsyncOpenAI
-from pdf2image import convert_from_path
 
-from api import utils
-from api.dal import lecture_db, quiz_db, task_db
-from api.dependencies import DataContext
+from api import blob_cache, image_prep, pdf_utils, utils
+from api.dal import lecture_db, llm_content_db, quiz_db, room_db, task_db
+from api.dependencies import DataContext, get_stt_client
 from api.exceptions import (
     NoImagesInPdfError,
     OpenAiApiError,
     UnsupportedExtensionError,
-    UpliftAiApiError,
 )
-from api.job_utils import background_job_decorator
+from api.job_utils import background_job_decorator, report_progress
+from api.models.lecture_models import Lecture, LectureGroupDigest
+from api.models.quiz_model import LLM_CONTENT_EXTRACT_TYPE
 from api.models.task_models import WeekDay
-from api.models.transcription_models import LlmMcqResponse
+from api.models.transcription_models import LllmTaskSet, LlmMcqResponse
 from api.prompts import (
     EXTRACT_TEXT_FROM_MARKING_SCHEME_PROMPT,
     EXTRACT_TEXT_FROM_RUBRIC_PROMPT,
+    LECTURE_DIGEST_SYSTEM_PROMPT,
+    LECTURE_NOTES_SYSTEM_PROMPT,
     MCQ_SYSTEM_PROMPT,
+    generate_lecture_digest_user_prompt,
+    generate_lecture_notes_user_prompt,
+    generate_mcq_day_user_prompt,
+    generate_mcq_notes_user_prompt,
     generate_mcq_user_prompt,
 )
+from api.uplift_client import UpliftSttClient
 
 MAX_AUDIO_DURATION = 60 * 60  # In seconds, 1 hour
 AUDIO_CHUNK_LEN = 60  # In seconds
+OCR_MODEL = "gpt-5-mini"
+MCQ_MODEL = "gpt-5-mini"
 
-UPLIFT_BASE_URL = "https://api.upliftai.org/v1"
-UPLIFT_API_KEY = os.getenv("UPLIFT_API_KEY")
+# Weeks longer than this are condensed segment by segment before generating the task sets
+MCQ_MAP_REDUCE_WORDS = int(os.getenv("SABQCHA_MCQ_MAP_REDUCE_WORDS", "15000"))
+MCQ_SEGMENT_WORDS = int(os.getenv("SABQCHA_MCQ_SEGMENT_WORDS", "5000"))
 
+# Generate each day's task set in its own concurrent call instead of all five in one
+MCQ_PER_DAY_GENERATION = os.getenv("SABQCHA_MCQ_PER_DAY", "false").lower() in ("1", "true")
 
-@background_job_decorator(lambda _, args, kwargs: kwargs.get("lecture_group_id") or args[2])
+# Bounds lectures transcribed at once across all jobs in this process
+MAX_CONCURRENT_LECTURES = int(os.getenv("SABQCHA_MAX_CONCURRENT_LECTURES", "3"))
+_lecture_transcription_slots = asyncio.Semaphore(MAX_CONCURRENT_LECTURES)
+
+
+def _lecture_group_id(_: DataContext, args: tuple, kwargs: dict) -> str:
+    return kwargs.get("lecture_group_id") or args[2]
+
+
+async def _lecture_group_room(data_context: DataContext, args: tuple, kwargs: dict) -> str | None:
+    # Students of the room are waiting on the task sets, not only the teacher who uploaded
+    return await room_db.get_room_for_lecture_group(
+        data_context, _lecture_group_id(data_context, args, kwargs)
+    )
+
+
+@background_job_decorator(_lecture_group_id, room_fn=_lecture_group_room)
 async def transcribe(
     data_context: DataContext, bucket: Bucket, openai_client: AsyncOpenAI, lecture_group_id: str
 ):
@@ -47,66 +76,291 @@ async def transcribe(
     lectures = await lecture_db.list_lectures_for_group(data_context, lecture_group_id)
     assert lectures
 
-    all_lecture_transcripts: list[str] = []
-    for le in lectures:
-        lecture_transcript = await transcribe_lecture(bucket, le.file_path)
-        await lecture_db.add_transcription(data_context, le.id, lecture_transcript)
-        all_lecture_transcripts.append(lecture_transcript)
+    stt_client = get_stt_client()
+
+    await report_progress("transcribing lectures", 0)
+    # Lectures are transcribed concurrently, already transcribed ones are reused
+    # so a retry or regeneration only re-runs the task set generation
+    start_time = time.perf_counter()
+    all_lecture_transcripts = await asyncio.gather(
+        *[_get_lecture_transcript(data_context, bucket, stt_client, le) for le in lectures]
+    )
 
     final_mega_transcript = " ".join(all_lecture_transcripts)
+    logger.info(
+        "Transcripts of {} lectures ready in {:.2f}s, {} words",
+        len(lectures),
+        time.perf_counter() - start_time,
+        len(final_mega_transcript.split()),
+    )
+
+    await report_progress("generating task sets", 60)
+    notes: list[str] | None = None
+    if len(final_mega_transcript.split()) > MCQ_MAP_REDUCE_WORDS:
+        notes = await _write_lecture_notes(openai_client, all_lecture_transcripts)
+        user_prompt = generate_mcq_notes_user_prompt(notes)
+    else:
+        logger.info(
+            "Calling llm to create mcqs for transcript: {} ... {}",
+            final_mega_transcript[:10],
+            final_mega_transcript[-10:],
+        )
+        user_prompt = generate_mcq_user_prompt(final_mega_transcript)
+
+    # Written alongside the task sets, mistake analysis reads it instead of the transcripts.
+    # The digest is written from the transcripts read with the version it is stored against,
+    # the notes are only reused if no lecture was added since they were written
+    digest = await lecture_db.get_lecture_group_digest(data_context, lecture_group_id)
+    digest_notes = notes if digest.transcriptions == all_lecture_transcripts else None
+    digest_task = asyncio.create_task(
+        get_lecture_group_digest(
+            data_context,
+            openai_client,
+            lecture_group_id,
+            digest,
+            digest.transcriptions,
+            digest_notes,
+        )
+    )
+
+    try:
+        await _insert_task_sets(data_context, openai_client, lecture_group_id, user_prompt)
+    except BaseException:
+        # The job failed, don't keep writing the digest behind its back
+        digest_task.cancel()
+        raise
+    finally:
+        try:
+            await digest_task
+        except asyncio.CancelledError:
+            current_task = asyncio.current_task()
+            if current_task and current_task.cancelling():
+                raise
+        except Exception:
+            # Not fatal, the analysis writes it on first use
+            logger.exception("Failed to write digest for lecture group {}", lecture_group_id)
+
+    logger.info("Task sets generated for lecture group {}", lecture_group_id)
+
+
+async def _insert_task_sets(
+    data_context: DataContext, openai_client: AsyncOpenAI, lecture_group_id: str, user_prompt: str
+):
+    # Days generated by an earlier, partly failed attempt are kept
+    existing_days = await task_db.list_task_set_days(data_context, lecture_group_id)
+    days = [day for day in WeekDay if day not in existing_days]
+    if existing_days:
+        logger.info(
+            "Lecture group {} already has task sets for {}", lecture_group_id, existing_days
+        )
+
+    if MCQ_PER_DAY_GENERATION:
+        await _generate_task_sets_per_day(
+            data_context, openai_client, lecture_group_id, user_prompt, days
+        )
+    elif days:
+        llm_res = await _generate_task_sets(openai_client, user_prompt)
+
+        logger.info("LLM returned {} task_sets", len(llm_res.task_sets))
+        for ts, day in zip(llm_res.task_sets, WeekDay):
+            logger.info("LLM returned {} tasks for {}", len(ts.mcqs), day)
+            if day in existing_days:
+                continue
+
+            await task_db.insert_task_set(data_context, lecture_group_id, ts.mcqs, day)
+
 
+async def get_lecture_group_digest(
+    data_context: DataContext,
+    openai_client: AsyncOpenAI,
+    lecture_group_id: str,
+    digest: LectureGroupDigest,
+    transcripts: list[str],
+    notes: list[str] | None = None,
+) -> str:
+    """
+    The group's concept digest, written from `transcripts` if the stored one is stale.
+    `digest` and `transcripts` must be read together, so the digest is stored against
+    the content version it was written from.
+    """
+    if digest.digest:
+        return digest.digest
+
+    if notes is None and len(" ".join(transcripts).split()) > MCQ_MAP_REDUCE_WORDS:
+        notes = await _write_lecture_notes(openai_client, transcripts)
+    material = "\n\n".join(notes) if notes else " ".join(transcripts)
+
+    start_time = time.perf_counter()
+    openai_res = await openai_client.responses.create(
+        model=MCQ_MODEL,
+        input=[
+            {"role": "system", "content": LECTURE_DIGEST_SYSTEM_PROMPT},
+            {"role": "user", "content": generate_lecture_digest_user_prompt(material)},
+        ],
+    )
+    _log_llm_stage("Lecture digest", start_time, [openai_res])
+
+    if not await lecture_db.set_lecture_group_digest(
+        data_context, lecture_group_id, openai_res.output_text, digest.content_version
+    ):
+        logger.info("Lectures of group {} changed, digest not stored", lecture_group_id)
+
+    return openai_res.output_text
+
+
+def _log_llm_stage(stage: str, start_time: float, responses: list):
+    input_tokens = sum(r.usage.input_tokens for r in responses if r.usage)
+    output_tokens = sum(r.usage.output_tokens for r in responses if r.usage)
     logger.info(
-        "Calling llm to create mcqs for transcript: {} ... {}",
-        final_mega_transcript[:10],
-        final_mega_transcript[-10:],
+        "{}: {} calls in {:.2f}s, {} input and {} output tokens",
+        stage,
+        len(responses),
+        time.perf_counter() - start_time,
+        input_tokens,
+        output_tokens,
     )
+
+
+async def _generate_task_sets(openai_client: AsyncOpenAI, user_prompt: str) -> LlmMcqResponse:
+    start_time = time.perf_counter()
     openai_res = await openai_client.responses.parse(
-        model="gpt-5-mini",
+        model=MCQ_MODEL,
         input=[
             {"role": "system", "content": MCQ_SYSTEM_PROMPT},
-            {"role": "user", "content": generate_mcq_user_prompt(final_mega_transcript)},
+            {"role": "user", "content": user_prompt},
         ],
         text_format=LlmMcqResponse,
     )
-
-    if openai_res.usage:
-        logger.info("Input tokens: {}", openai_res.usage.input_tokens)
-        logger.info("Output tokens: {}", openai_res.usage.output_tokens)
-        logger.info("Total tokens used: {}", openai_res.usage.total_tokens)
+    _log_llm_stage("Task set generation", start_time, [openai_res])
 
     llm_res = openai_res.output_parsed
     if not llm_res:
         logger.error("Invalid Response form OpenAI: {}", openai_res.model_dump(mode="json"))
         raise OpenAiApiError("Invalid response from OpenAI")
 
-    logger.info("LLM returned {} task_sets", len(llm_res.task_sets))
-    for ts, day in zip(llm_res.task_sets, WeekDay):
-        logger.info("LLM returned {} tasks for {}", len(ts.mcqs), day)
+    return llm_res
 
-        await task_db.insert_task_set(data_context, lecture_group_id, ts.mcqs, day)
 
-    logger.info("Task sets generated for lecture group {}", lecture_group_id)
+async def _generate_task_sets_per_day(
+    data_context: DataContext,
+    openai_client: AsyncOpenAI,
+    lecture_group_id: str,
+    user_prompt: str,
+    days: list[WeekDay],
+):
+    """
+    One concurrent call per day, each inserted as soon as it arrives.
+    Every call starts with the same system and lecture prompt so it is served from the
+    prompt cache, only the trailing day instruction differs.
+    """
+    done = 0
+
+    async def _generate_day(day: WeekDay):
+        nonlocal done
+        day_number = list(WeekDay).index(day) + 1
+
+        start_time = time.perf_counter()
+        openai_res = await openai_client.responses.parse(
+            model=MCQ_MODEL,
+            input=[
+                {"role": "system", "content": MCQ_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt},
+                {
+                    "role": "user",
+                    "content": generate_mcq_day_user_prompt(day, day_number, len(WeekDay)),
+                },
+            ],
+            text_format=LllmTaskSet,
+            prompt_cache_key=f"mcq-{lecture_group_id}",
+        )
+        _log_llm_stage(f"Task set for {day}", start_time, [openai_res])
+
+        task_set = openai_res.output_parsed
+        if not task_set:
+            logger.error("Invalid Response form OpenAI: {}", openai_res.model_dump(mode="json"))
+            raise OpenAiApiError("Invalid response from OpenAI")
+
+        await task_db.insert_task_set(data_context, lecture_group_id, task_set.mcqs, day)
+
+        done += 1
+        await report_progress(
+            f"generated {done}/{len(days)} task sets", 60 + 40 * done // len(days)
+        )
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*[_generate_day(day) for day in days], return_exceptions=True)
+    failed = [r for r in results if isinstance(r, BaseException)]
+    logger.info(
+        "Generated {} task sets in {:.2f}s, {} failed",
+        len(days) - len(failed),
+        time.perf_counter() - start_time,
+        len(failed),
+    )
 
+    # The generated days are kept, a retry only generates the failed ones
+    if failed:
+        raise failed[0]
 
-async def transcribe_lecture(bucket: Bucket, file_path: str) -> str:
-    all_transcripts: list[str] = []
+
+async def _write_lecture_notes(openai_client: AsyncOpenAI, transcripts: list[str]) -> list[str]:
+    """
+    Map step for long weeks: condense each segment of the lectures into notes, concurrently.
+    The task sets are then generated from the notes, a much shorter input than the transcripts.
+    """
+    segments = [seg for tr in transcripts for seg in _split_words(tr, MCQ_SEGMENT_WORDS)]
+    logger.info("Writing notes for {} transcript segments", len(segments))
+
+    start_time = time.perf_counter()
+    responses = await asyncio.gather(
+        *[
+            openai_client.responses.create(
+                model=MCQ_MODEL,
+                input=[
+                    {"role": "system", "content": LECTURE_NOTES_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": generate_lecture_notes_user_prompt(seg, idx, len(segments)),
+                    },
+                ],
+            )
+            for idx, seg in enumerate(segments, start=1)
+        ]
+    )
+    _log_llm_stage("Lecture notes", start_time, responses)
+
+    return [r.output_text for r in responses]
+
+
+def _split_words(text: str, max_words: int) -> list[str]:
+    words = text.split()
+    return [" ".join(words[i : i + max_words]) for i in range(0, len(words), max_words)]
+
+
+async def _get_lecture_transcript(
+    data_context: DataContext, bucket: Bucket, stt_client: UpliftSttClient, lecture: Lecture
+) -> str:
+    if lecture.transcribed_content:
+        logger.info("Lecture {} already transcribed, skipping", lecture.id)
+        return lecture.transcribed_content
+
+    async with _lecture_transcription_slots:
+        transcript = await transcribe_lecture(bucket, stt_client, lecture.file_path)
+
+    await lecture_db.add_transcription(data_context, lecture.id, transcript)
+    return transcript
+
+
+async def transcribe_lecture(bucket: Bucket, stt_client: UpliftSttClient, file_path: str) -> str:
+    transcripts: dict[int, str] = {}
 
     with tempfile.TemporaryDirectory() as temp_dir:
         file_path_obj = Path(file_path)
         extension = file_path_obj.suffix  # .mp3, .mp4
 
         storage_file = tempfile.NamedTemporaryFile(suffix=extension, dir=temp_dir, delete=False)
-        blob = bucket.blob(file_path)
-        await asyncio.to_thread(blob.download_to_filename, storage_file.name)
+        await blob_cache.cache.download_to_filename(bucket, file_path, storage_file.name)
         input_file_name = storage_file.name
 
-        if extension != ".mp3":
-            logger.info("Converting {} to .mp3", extension)
-
-            output_file = tempfile.NamedTemporaryFile(suffix=".mp3", dir=temp_dir, delete=False)
-            await utils.audio_video_to_mp3(storage_file.name, output_file.name)
-            input_file_name = output_file.name
-
         # probe is blocking
         probe = await asyncio.to_thread(ffmpeg.probe, input_file_name)
         duration = math.floor(float(probe["format"]["duration"]))
@@ -123,137 +377,162 @@ async def transcribe_lecture(bucket: Bucket, file_path: str) -> str:
         logger.info("Total audio duration: {}", duration)
         logger.info("Num chunks: {}", num_chunks)
 
-        make_chunk_args: list[tuple[str, int]] = []
-        for i in range(num_chunks):
-            start_time = i * AUDIO_CHUNK_LEN
-            temp_chunk = tempfile.NamedTemporaryFile(
-                suffix=os.path.splitext(input_file_name)[1],
-                dir=temp_dir,
-                delete=False,
-            )
+        if extension != ".mp3":
+            logger.info("Converting {} to .mp3 while segmenting", extension)
 
-            make_chunk_args.append((temp_chunk.name, start_time))
+        async def _transcribe_chunk(idx: int, chunk_file_name: str):
+            transcripts[idx] = await stt_client.transcribe(chunk_file_name)
 
-        # run ffmpeg (blocking) in thread
-        def _make_chunk(outname: str, ss: int) -> None:
-            (
-                ffmpeg.input(input_file_name, ss=ss, t=AUDIO_CHUNK_LEN)
-                .output(outname, c="copy")
-                .overwrite_output()
-                .run(quiet=True)
-            )
+        chunk_dir = os.path.join(temp_dir, "chunks")
+        os.makedirs(chunk_dir)
 
-        await asyncio.gather(
-            *[
-                asyncio.to_thread(_make_chunk, temp_chunk_name, start_time)
-                for temp_chunk_name, start_time in make_chunk_args
-            ]
-        )
+        start_time = time.perf_counter()
+        stats_before = stt_client.stats()
 
-        # helper to post a chunk to uplift (blocking) in thread
-        def _post_chunk(file_path: str) -> str:
-            logger.info("Sending file {} to API", file_path)
-
-            with open(file_path, "rb") as f:
-                files = {"file": ("audio.mp3", f, "audio/mpeg")}
-                data = {"model": "scribe-mini", "language": "ur"}
-                headers = {"Authorization": f"Bearer {UPLIFT_API_KEY}"}
-                response = requests.post(
-                    f"{UPLIFT_BASE_URL}/transcribe/speech-to-text",
-                    headers=headers,
-                    files=files,
-                    data=data,
-                )
-
-            status_code = response.status_code
-            try:
-                res_json = response.json()
-            except Exception:
-                res_json = None
-
-            if status_code != 200:
-                logger.error("Uplift API returned non 200 error: {}", status_code, json=res_json)
-                raise UpliftAiApiError("Uplift API returned non 200 error")
-
-            if not res_json or "transcript" not in res_json:
-                logger.error("No transcript in response", json=res_json)
-                raise UpliftAiApiError("No transcript in response")
-
-            t = res_json["transcript"]
-            logger.info("Got transcription: {} ... {}", t[:10], t[-10:])
-            return t
-
-        all_transcripts = await asyncio.gather(
-            *[
-                asyncio.to_thread(_post_chunk, sharded_file_name)
-                for sharded_file_name, _ in make_chunk_args
-            ]
+        # Chunks are sent for transcription as soon as ffmpeg finishes writing them.
+        # aclosing stops ffmpeg right away if a chunk fails, not when the generator is collected
+        segments = utils.segment_audio(
+            input_file_name, chunk_dir, AUDIO_CHUNK_LEN, copy_codec=extension == ".mp3"
+        )
+        async with asyncio.TaskGroup() as tg, contextlib.aclosing(segments):
+            async for idx, chunk_file_name in segments:
+                if idx >= num_chunks:
+                    logger.info("Skipping tiny trailing chunk {}", chunk_file_name)
+                    continue
+                tg.create_task(_transcribe_chunk(idx, chunk_file_name))
+
+        elapsed = time.perf_counter() - start_time
+        stats_after = stt_client.stats()
+        logger.info(
+            "Transcribed {} chunks ({} retries, {:.1f} MB) in {:.2f}s, {:.2f} chunks/s",
+            len(transcripts),
+            stats_after["retries"] - stats_before["retries"],
+            (stats_after["bytes_sent"] - stats_before["bytes_sent"]) / 1e6,
+            elapsed,
+            len(transcripts) / elapsed if elapsed else 0.0,
         )
 
-    return " ".join(all_transcripts)
+    return " ".join(transcripts[idx] for idx in sorted(transcripts))
+
+
+def _ocr_prompt_version(system_prompt: str) -> str:
+    """Anything that changes the extracted text for the same document invalidates the cache."""
+    key = f"{OCR_MODEL}\n{image_prep.DOCUMENT.model_dump_json()}\n{system_prompt}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
 
 
 async def _extract_text_from_file(
-    bucket: Bucket, file_path: str, openai_client: AsyncOpenAI, system_prompt: str
+    data_context: DataContext,
+    bucket: Bucket,
+    file_path: str,
+    openai_client: AsyncOpenAI,
+    system_prompt: str,
+    content_type: LLM_CONTENT_EXTRACT_TYPE,
 ) -> str:
+    """
+    Extract a document's text and return the llm_content_extract id holding it.
+    Extracts are keyed by the blob's content hash and the prompt version,
+    so a document reused across quizzes is only OCR'd once.
+    """
     if not file_path:
         raise FileNotFoundError
 
+    prompt_version = _ocr_prompt_version(system_prompt)
+
+    blob = await asyncio.to_thread(bucket.get_blob, file_path)
+    if not blob:
+        raise FileNotFoundError
+
+    # GCS keeps an md5 for every non composite object, so a hit needs no download
+    content_hash = f"md5:{blob.md5_hash}" if blob.md5_hash else None
+    if content_hash:
+        extract_id = await llm_content_db.get_extract_id_by_hash(
+            data_context, content_hash, prompt_version
+        )
+        if extract_id:
+            logger.info("OCR cache hit for {} ({})", file_path, content_type)
+            return extract_id
+
     with tempfile.TemporaryDirectory() as temp_dir:
         file_path_obj = Path(file_path)
         extension = file_path_obj.suffix
         storage_file = tempfile.NamedTemporaryFile(suffix=extension, dir=temp_dir, delete=False)
-        blob = bucket.blob(file_path)
-        await asyncio.to_thread(blob.download_to_filename, storage_file.name)
-
-        image_extensions = {".jpg", ".jpeg", ".png", ".webp"}
-
-        if extension == ".pdf":
-            images = pdf_to_images(storage_file.name, temp_dir)
-            if not images:
-                logger.warning("No images generated from PDF {}", file_path)
-                raise NoImagesInPdfError
-
-            try:
-                openai_res = await openai_client.responses.create(
-                    model="gpt-5-mini",
-                    input=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": system_prompt},
-                                *[get_model_input_for_img(img) for img in images],
-                            ],
-                        }
-                    ],
-                )
-            except Exception:
-                logger.exception("OpenAI OCR call failed for {}", file_path)
-                raise OpenAiApiError
-
-            return openai_res.output_text
-
-        elif extension in image_extensions:
-            try:
-                openai_res = await openai_client.responses.create(
-                    model="gpt-5-mini",
-                    input=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "input_text", "text": system_prompt},
-                                get_model_input_for_img(storage_file.name),
-                            ],
-                        }
-                    ],
-                )
-            except Exception:
-                logger.exception("OpenAI OCR call failed for {", file_path)
-                raise OpenAiApiError
-
-            return openai_res.output_text
-        else:
-            raise UnsupportedExtensionError
+        await blob_cache.cache.download_to_filename(bucket, file_path, storage_file.name, blob)
+
+        if not content_hash:
+            data = await asyncio.to_thread(Path(storage_file.name).read_bytes)
+            content_hash = f"sha256:{hashlib.sha256(data).hexdigest()}"
+            extract_id = await llm_content_db.get_extract_id_by_hash(
+                data_context, content_hash, prompt_version
+            )
+            if extract_id:
+                logger.info("OCR cache hit for {} ({})", file_path, content_type)
+                return extract_id
+
+        logger.info("OCR cache miss for {} ({})", file_path, content_type)
+        text = await _ocr_file(storage_file.name, file_path, openai_client, system_prompt)
+
+    return await llm_content_db.insert_extract(
+        data_context, text, content_type, content_hash, prompt_version
+    )
+
+
+async def _ocr_file(
+    local_path: str, file_path: str, openai_client: AsyncOpenAI, system_prompt: str
+) -> str:
+    extension = Path(file_path).suffix
+    image_extensions = {".jpg", ".jpeg", ".png", ".webp"}
+
+    if extension == ".pdf":
+        images = await pdf_utils.render_pdf(local_path, image_prep.DOCUMENT, reference_dpi=300)
+        if not images:
+            logger.warning("No images generated from PDF {}", file_path)
+            raise NoImagesInPdfError
+        image_prep.record_savings(f"OCR {file_path}", images)
+
+        try:
+            openai_res = await openai_client.responses.create(
+                model=OCR_MODEL,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": system_prompt},
+                            *[image_prep.get_model_input(img) for img in images],
+                        ],
+                    }
+                ],
+            )
+        except Exception:
+            logger.exception("OpenAI OCR call failed for {}", file_path)
+            raise OpenAiApiError
+
+        return openai_res.output_text
+
+    elif extension in image_extensions:
+        image = await image_prep.prepare_image_file(local_path, image_prep.DOCUMENT)
+        image_prep.record_savings(f"OCR {file_path}", [image])
+
+        try:
+            openai_res = await openai_client.responses.create(
+                model=OCR_MODEL,
+                input=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "input_text", "text": system_prompt},
+                            image_prep.get_model_input(image),
+                        ],
+                    }
+                ],
+            )
+        except Exception:
+            logger.exception("OpenAI OCR call failed for {}", file_path)
+            raise OpenAiApiError
+
+        return openai_res.output_text
+    else:
+        raise UnsupportedExtensionError
 
 
 @background_job_decorator(lambda _, __, kwargs: kwargs.get("quiz_id", ""))
@@ -272,43 +551,26 @@ async def transcribe_quiz(
         logger.error("Quiz not found: {}", quiz_id)
         return
 
-    answer_text = await _extract_text_from_file(
-        bucket, quiz.answer_sheet_path, openai_client, EXTRACT_TEXT_FROM_MARKING_SCHEME_PROMPT
+    await report_progress("extracting marking scheme", 0)
+    answer_extract_id = await _extract_text_from_file(
+        data_context,
+        bucket,
+        quiz.answer_sheet_path,
+        openai_client,
+        EXTRACT_TEXT_FROM_MARKING_SCHEME_PROMPT,
+        LLM_CONTENT_EXTRACT_TYPE.MARKING_SCHEME,
     )
-    rubric_text = await _extract_text_from_file(
-        bucket, quiz.rubric_path, openai_client, EXTRACT_TEXT_FROM_RUBRIC_PROMPT
+    await report_progress("extracting rubric", 50)
+    rubric_extract_id = await _extract_text_from_file(
+        data_context,
+        bucket,
+        quiz.rubric_path,
+        openai_client,
+        EXTRACT_TEXT_FROM_RUBRIC_PROMPT,
+        LLM_CONTENT_EXTRACT_TYPE.RUBRIC,
     )
 
-    await quiz_db.update_llm_contents_for_quiz(data_context, quiz_id, rubric_text, answer_text)
-
-
-def pdf_to_images(pdf_path: str, output_dir: str, dpi: int = 300) -> list[str]:
-    """
-    Converts all pages of a PDF into images stored in the given directory.
-    """
-    base_name = os.path.basename(pdf_path)
-    file_name = os.path.splitext(base_name)[0]
-
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    image_paths: list[str] = []
-
-    for idx, page in enumerate(pages, start=1):
-        image_path = os.path.join(output_dir, f"{file_name}_p_{idx}.jpg")
-        page.save(image_path, "JPEG")
-        image_paths.append(image_path)
-        logger.info("Saved pdf -> image: {}", image_path)
-
-    return image_paths
-
-
-def encode_image(image_path: str) -> str:
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
+    await quiz_db.update_llm_contents_for_quiz(
+        data_context, quiz_id, rubric_extract_id, answer_extract_id
+    )
 
-def get_model_input_for_img(path: str) -> dict[str, str]:
-    base64_image = encode_image(path)
-    return {
-        "type": "input_image",
-        "image_url": f"data:image/jpeg;base64,{base64_image}",
-    }
@@ -1,17 +1,30 @@
-from psycopg import AsyncCursor
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
 
+from psycopg import AsyncCursor, sql
 
-async def get_user_row_id(cur: AsyncCursor, user_id: str) -> int | None:
-    await cur.execute("select row_id from sabqcha_user where public_id = %s", (user_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+from api.cache_utils import LruTtlCache
 
 
-async def get_teacher_row_id(cur: AsyncCursor, teacher_id: str) -> int | None:
-    await cur.execute(
-        """
+class IdKind(StrEnum):
+    USER = "USER"
+    TEACHER = "TEACHER"
+    STUDENT = "STUDENT"
+    ROOM = "ROOM"
+    LECTURE_GROUP = "LECTURE_GROUP"
+    LECTURE = "LECTURE"
+    TASK_SET = "TASK_SET"
+    TASK = "TASK"
+    QUIZ = "QUIZ"
+    SUBJECT = "SUBJECT"
+    PAST_PAPER = "PAST_PAPER"
+
+
+_ROW_ID_QUERIES: dict[IdKind, str] = {
+    IdKind.USER: "select row_id from sabqcha_user where public_id = %s",
+    IdKind.TEACHER: """
         select
             t.row_id
         from
@@ -21,17 +34,7 @@ async def get_teacher_row_id(cur: AsyncCursor, teacher_id: str) -> int | None:
         where
             su.public_id = %s
         """,
-        (teacher_id,),
-    )
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
-
-
-async def get_student_row_id(cur: AsyncCursor, student_id: str) -> int | None:
-    await cur.execute(
-        """
+    IdKind.STUDENT: """
         select
             st.row_id
         from
@@ -41,73 +44,141 @@ async def get_student_row_id(cur: AsyncCursor, student_id: str) -> int | None:
         where
             su.public_id = %s
         """,
-        (student_id,),
+    IdKind.ROOM: "select row_id from room where public_id = %s",
+    IdKind.LECTURE_GROUP: "select row_id from lecture_group where public_id = %s",
+    IdKind.LECTURE: "select row_id from lecture where public_id = %s",
+    IdKind.TASK_SET: "select row_id from task_set where public_id = %s",
+    IdKind.TASK: "select row_id from task where public_id = %s",
+    IdKind.QUIZ: "select row_id from quiz where public_id = %s",
+    IdKind.SUBJECT: "select row_id from subject where public_id = %s",
+    IdKind.PAST_PAPER: "select row_id from past_paper_bank where public_id = %s",
+}
+
+# public_id -> row_id mappings never change once a row exists, so they are
+# cached per request (identity map) and process wide (bounded LRU, no TTL).
+_process_cache: LruTtlCache[tuple[IdKind, str], int] = LruTtlCache(
+    max_size=int(os.getenv("SABQCHA_ID_MAP_CACHE_SIZE", "50000"))
+)
+_request_cache: ContextVar[dict[tuple[IdKind, str], int] | None] = ContextVar(
+    "id_map_request_cache", default=None
+)
+
+
+@contextmanager
+def request_scope():
+    """Open a fresh identity map for the duration of a request."""
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def id_map_cache_stats() -> dict[str, int | float]:
+    return _process_cache.stats()
+
+
+def _get_cached(key: tuple[IdKind, str]) -> int | None:
+    request_cache = _request_cache.get()
+    if request_cache is not None and key in request_cache:
+        return request_cache[key]
+
+    row_id = _process_cache.get(key)
+    if row_id is not None and request_cache is not None:
+        request_cache[key] = row_id
+    return row_id
+
+
+def _remember(key: tuple[IdKind, str], row_id: int):
+    request_cache = _request_cache.get()
+    if request_cache is not None:
+        request_cache[key] = row_id
+    _process_cache.set(key, row_id)
+
+
+async def resolve(cur: AsyncCursor, *ids: tuple[IdKind, str]) -> list[int | None]:
+    """
+    Resolve several public ids, possibly of different kinds, to row ids.
+    Cached ids are served from memory, the rest are fetched in a single query.
+    Results are returned in the order of the given ids.
+    """
+    row_ids: list[int | None] = [_get_cached(key) for key in ids]
+
+    missing = [i for i, row_id in enumerate(row_ids) if row_id is None]
+    if not missing:
+        return row_ids
+
+    query = sql.SQL(" union all ").join(
+        sql.SQL("select {}::int, ({} limit 1)").format(
+            sql.Literal(i), sql.SQL(_ROW_ID_QUERIES[ids[i][0]])
+        )
+        for i in missing
     )
+    await cur.execute(query, [ids[i][1] for i in missing])
+
+    for i, row_id in await cur.fetchall():
+        if row_id is None:
+            continue
+        row_ids[i] = row_id
+        _remember(ids[i], row_id)
+
+    return row_ids
+
+
+async def _resolve_one(cur: AsyncCursor, kind: IdKind, public_id: str) -> int | None:
+    key = (kind, public_id)
+    row_id = _get_cached(key)
+    if row_id is not None:
+        return row_id
+
+    await cur.execute(_ROW_ID_QUERIES[kind], (public_id,))
     row = await cur.fetchone()
     if not row:
         return None
+
+    _remember(key, row[0])
     return row[0]
 
 
+async def get_user_row_id(cur: AsyncCursor, user_id: str) -> int | None:
+    return await _resolve_one(cur, IdKind.USER, user_id)
+
+
+async def get_teacher_row_id(cur: AsyncCursor, teacher_id: str) -> int | None:
+    return await _resolve_one(cur, IdKind.TEACHER, teacher_id)
+
+
+async def get_student_row_id(cur: AsyncCursor, student_id: str) -> int | None:
+    return await _resolve_one(cur, IdKind.STUDENT, student_id)
+
+
 async def get_room_row_id(cur: AsyncCursor, room_id: str) -> int | None:
-    await cur.execute("select row_id from room where public_id = %s", (room_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.ROOM, room_id)
 
 
 async def get_lecture_group_row_id(cur: AsyncCursor, lecture_group_id: str) -> int | None:
-    await cur.execute("select row_id from lecture_group where public_id = %s", (lecture_group_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.LECTURE_GROUP, lecture_group_id)
 
 
 async def get_lecture_row_id(cur: AsyncCursor, lecture_id: str) -> int | None:
-    await cur.execute("select row_id from lecture where public_id = %s", (lecture_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.LECTURE, lecture_id)
 
 
 async def get_task_set_row_id(cur: AsyncCursor, task_set_id: str) -> int | None:
-    await cur.execute("select row_id from task_set where public_id = %s", (task_set_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.TASK_SET, task_set_id)
 
 
 async def get_task_row_id(cur: AsyncCursor, task_id: str) -> int | None:
-    await cur.execute("select row_id from task where public_id = %s", (task_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.TASK, task_id)
 
 
 async def get_quiz_row_id(cur: AsyncCursor, quiz_id: str) -> int | None:
-    await cur.execute("select row_id from quiz where public_id = %s", (quiz_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.QUIZ, quiz_id)
 
 
 async def get_subject_row_id(cur: AsyncCursor, subject_id: str) -> int | None:
-    await cur.execute("select row_id from subject where public_id = %s", (subject_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.SUBJECT, subject_id)
 
 
 async def get_past_paper_row_id(cur: AsyncCursor, past_paper_id: str) -> int | None:
-    await cur.execute("select row_id from past_paper_bank where public_id = %s", (past_paper_id,))
-    row = await cur.fetchone()
-    if not row:
-        return None
-    return row[0]
+    return await _resolve_one(cur, IdKind.PAST_PAPER, past_paper_id)
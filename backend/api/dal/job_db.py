@@ -1,44 +1,309 @@
-from api.dependencies import DataContext
+import json
+
+from psycopg import AsyncCursor
+
+from api.dependencies import DataContext, UnAuthDataContext
+from api.models.job_models import ClaimedJob, JobHandle, JobState
 from api.utils import internal_id
 
 
-async def insert_pending_job(data_context: DataContext, identifier: str) -> str:
+JOB_EVENTS_CHANNEL = "job_events"
+
+
+async def _notify_job_event(cur: AsyncCursor, job_id: str):
+    """Tell listeners (api.job_events) the job changed, delivered when the transaction commits."""
+    await cur.execute(
+        """
+        select
+            pg_notify(
+                %s,
+                json_build_object(
+                    'id', public_id,
+                    'user_id', user_id,
+                    'room_id', room_id,
+                    'status', status,
+                    'stage', stage,
+                    'progress', progress
+                )::text
+            )
+        from
+            job
+        where
+            public_id = %s
+        """,
+        (JOB_EVENTS_CHANNEL, job_id),
+    )
+
+
+async def insert_pending_job(
+    data_context: DataContext,
+    identifier: str,
+    name: str,
+    payload: dict,
+    max_attempts: int,
+    room_id: str | None = None,
+) -> str:
     job_id = internal_id()
 
     async with data_context.get_cursor() as cur:
         await cur.execute(
             """
             insert into job (
-                public_id, identifier, in_progress
+                public_id, identifier, in_progress, status, name, payload, user_id, user_role,
+                max_attempts, room_id
             )
             values (
-                %s, %s, true
+                %s, %s, true, 'QUEUED', %s, %s::jsonb, %s, %s, %s, %s
             )
             """,
-            (job_id, identifier),
+            (
+                job_id,
+                identifier,
+                name,
+                json.dumps(payload),
+                data_context.user_id,
+                data_context.user_role.value,
+                max_attempts,
+                room_id,
+            ),
         )
 
     return job_id
 
 
-async def complete_job(data_context: DataContext, job_id: str):
+async def requeue_failed_job(
+    data_context: DataContext,
+    identifier: str,
+    name: str,
+    payload: dict,
+    max_attempts: int,
+    room_id: str | None = None,
+) -> str | None:
+    """Queue a failed job again as if newly scheduled, returns its id if there was one."""
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            update job set
+                in_progress = true,
+                status = 'QUEUED',
+                name = %s,
+                payload = %s::jsonb,
+                user_id = %s,
+                user_role = %s,
+                attempts = 0,
+                max_attempts = %s,
+                room_id = %s,
+                run_after = now(),
+                last_error = null,
+                stage = null,
+                progress = 0,
+                started_at = null,
+                finished_at = null,
+                updated_at = now()
+            where
+                identifier = %s and
+                status = 'FAILED'
+            returning
+                public_id
+            """,
+            (
+                name,
+                json.dumps(payload),
+                data_context.user_id,
+                data_context.user_role.value,
+                max_attempts,
+                room_id,
+                identifier,
+            ),
+        )
+        row = await cur.fetchone()
+        if not row:
+            return None
+        await _notify_job_event(cur, row[0])
+    return row[0]
+
+
+async def claim_job(
+    data_context: UnAuthDataContext,
+    worker_id: str,
+    lease_seconds: float,
+    job_id: str | None = None,
+) -> ClaimedJob | None:
+    """
+    Lease the next runnable job (or the given one) to this worker.
+    Jobs whose lease expired without a heartbeat are picked up again.
+    """
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            update job j set
+                status = 'RUNNING',
+                attempts = j.attempts + 1,
+                locked_by = %(worker_id)s,
+                lease_expires_at = now() + make_interval(secs => %(lease_seconds)s),
+                heartbeat_at = now(),
+                started_at = coalesce(j.started_at, now()),
+                updated_at = now()
+            where
+                j.row_id = (
+                    select
+                        row_id
+                    from
+                        job
+                    where
+                        name is not null and
+                        (%(job_id)s::text is null or public_id = %(job_id)s) and
+                        (
+                            (status = 'QUEUED' and run_after <= now()) or
+                            (status = 'RUNNING' and lease_expires_at < now())
+                        )
+                    order by
+                        run_after
+                    limit 1
+                    for update skip locked
+                )
+            returning
+                j.public_id,
+                j.name,
+                j.payload,
+                j.user_id,
+                j.user_role,
+                j.attempts,
+                j.max_attempts
+            """,
+            {"worker_id": worker_id, "lease_seconds": lease_seconds, "job_id": job_id},
+        )
+        row = await cur.fetchone()
+        if not row:
+            return None
+        await _notify_job_event(cur, row[0])
+    return ClaimedJob(
+        id=row[0],
+        name=row[1],
+        payload=row[2],
+        user_id=row[3],
+        user_role=row[4],
+        attempts=row[5],
+        max_attempts=row[6],
+    )
+
+
+async def heartbeat_job(
+    data_context: UnAuthDataContext, job_id: str, worker_id: str, lease_seconds: float
+) -> bool:
+    """Extend the lease, returns False if this worker no longer owns the job."""
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            update job set
+                heartbeat_at = now(),
+                lease_expires_at = now() + make_interval(secs => %s)
+            where
+                public_id = %s and
+                locked_by = %s and
+                status = 'RUNNING'
+            """,
+            (lease_seconds, job_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+
+async def complete_job(data_context: DataContext | UnAuthDataContext, job_id: str, worker_id: str):
     async with data_context.get_cursor() as cur:
         await cur.execute(
             """
             update job set
-                in_progress = false
+                in_progress = false,
+                status = 'SUCCEEDED',
+                progress = 100,
+                locked_by = null,
+                lease_expires_at = null,
+                finished_at = now(),
+                updated_at = now()
             where
-                public_id = %s
+                public_id = %s and
+                locked_by = %s
             """,
-            (job_id,),
+            (job_id, worker_id),
         )
+        if cur.rowcount == 1:
+            await _notify_job_event(cur, job_id)
 
 
-async def get_job(data_context: DataContext, identifier: str) -> bool | None:
+async def fail_job(
+    data_context: DataContext | UnAuthDataContext,
+    job_id: str,
+    worker_id: str,
+    error: str,
+    retry_in_seconds: float | None,
+):
+    """Requeue the job after `retry_in_seconds`, or fail it for good when that is None."""
     async with data_context.get_cursor() as cur:
+        if retry_in_seconds is not None:
+            await cur.execute(
+                """
+                update job set
+                    status = 'QUEUED',
+                    run_after = now() + make_interval(secs => %s),
+                    last_error = %s,
+                    locked_by = null,
+                    lease_expires_at = null,
+                    updated_at = now()
+                where
+                    public_id = %s and
+                    locked_by = %s
+                """,
+                (retry_in_seconds, error, job_id, worker_id),
+            )
+        else:
+            await cur.execute(
+                """
+                update job set
+                    in_progress = false,
+                    status = 'FAILED',
+                    last_error = %s,
+                    locked_by = null,
+                    lease_expires_at = null,
+                    finished_at = now(),
+                    updated_at = now()
+                where
+                    public_id = %s and
+                    locked_by = %s
+                """,
+                (error, job_id, worker_id),
+            )
+
+        if cur.rowcount == 1:
+            await _notify_job_event(cur, job_id)
+
+
+async def update_job_progress(
+    data_context: UnAuthDataContext, job_id: str, stage: str, progress: int | None
+):
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            update job set
+                stage = %s,
+                progress = coalesce(%s, progress),
+                updated_at = now()
+            where
+                public_id = %s and
+                status = 'RUNNING'
+            """,
+            (stage, progress, job_id),
+        )
+        if cur.rowcount == 1:
+            await _notify_job_event(cur, job_id)
+
+
+async def get_job(data_context: DataContext, identifier: str) -> JobHandle | None:
+    async with data_context.get_model_cursor(JobHandle) as cur:
         await cur.execute(
             """
             select
+                public_id as id,
+                status,
                 in_progress
             from
                 job
@@ -47,7 +312,31 @@ async def get_job(data_context: DataContext, identifier: str) -> bool | None:
             """,
             (identifier,),
         )
-        row = await cur.fetchone()
-        if not row:
-            return None
-    return row[0]
+        return await cur.fetchone()
+
+
+async def get_job_state(data_context: DataContext, job_id: str) -> JobState | None:
+    """The job's state if it was scheduled by the current user."""
+    async with data_context.get_model_cursor(JobState) as cur:
+        await cur.execute(
+            """
+            select
+                public_id as id,
+                status,
+                stage,
+                progress,
+                attempts,
+                last_error as error,
+                created_at,
+                started_at,
+                finished_at,
+                updated_at
+            from
+                job
+            where
+                public_id = %s and
+                user_id = %s
+            """,
+            (job_id, data_context.user_id),
+        )
+        return await cur.fetchone()
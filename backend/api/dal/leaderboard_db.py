@@ -1,27 +1,231 @@
+from psycopg import sql
+
 from api.dal import id_map
+from api.dal.id_map import IdKind
 from api.dependencies import DataContext
-from api.models.user_models import StudentUser
+from api.models.leaderboard_models import LeaderboardEntry, RankMode
 
+# A page is seeked on the (room_row_id, score, student_row_id) index and only its rows are
+# ranked, each with an index only count of the higher scores, instead of ranking the room.
+_RANK_EXPRESSIONS = {
+    RankMode.COMPETITION: """
+        1 + (
+            select
+                count(*)
+            from
+                student_room o
+            where
+                o.room_row_id = %(room_row_id)s and
+                o.score > p.score
+        )
+    """,
+    RankMode.DENSE: """
+        1 + (
+            select
+                count(distinct o.score)
+            from
+                student_room o
+            where
+                o.room_row_id = %(room_row_id)s and
+                o.score > p.score
+        )
+    """,
+}
 
-async def list_students_with_scores(data_context: DataContext, room_id: str) -> list[StudentUser]:
-    async with data_context.get_cursor() as cur:
-        room_row_id = await id_map.get_room_row_id(cur, room_id)
-        assert room_row_id
+# The whole room is ranked in one pass instead, counting per row would be quadratic
+_RANK_WINDOWS = {
+    RankMode.COMPETITION: "rank() over (order by sr.score desc)",
+    RankMode.DENSE: "dense_rank() over (order by sr.score desc)",
+}
 
-        await cur.execute(
+
+def _ranked_page_query(page_cte: str, rank_mode: RankMode) -> sql.Composable:
+    """Rank and name the students of `page_cte`, a `page (student_row_id, score)` CTE."""
+    return sql.SQL(
+        """
+        with {page_cte}
+        select
+            su.public_id,
+            su.display_name,
+            p.score,
+            {rank} as rank,
+            p.student_row_id = %(student_row_id)s as is_current_user
+        from
+            page p
+            join student st on st.row_id = p.student_row_id
+            join sabqcha_user su on su.row_id = st.sabqcha_user_row_id
+        order by
+            p.score desc,
+            p.student_row_id desc
+        """
+    ).format(page_cte=sql.SQL(page_cte), rank=sql.SQL(_RANK_EXPRESSIONS[rank_mode]))
+
+
+async def list_ranked_students(
+    data_context: DataContext,
+    room_id: str,
+    *,
+    limit: int | None,
+    after: tuple[int, str] | None = None,
+    rank_mode: RankMode = RankMode.COMPETITION,
+) -> list[LeaderboardEntry]:
+    """
+    One page of the room's leaderboard, ranked by Postgres, highest score first.
+    `after` is the (score, id) of the last entry of the previous page (keyset pagination),
+    without a `limit` the whole leaderboard is returned.
+    """
+    if limit is None and after is None:
+        query = sql.SQL(
             """
             select
-                su.public_id as id,
+                su.public_id,
                 su.display_name,
-                sr.score
+                sr.score,
+                {rank_window} as rank,
+                sr.student_row_id = %(student_row_id)s as is_current_user
             from
-                student st
+                student_room sr
+                join student st on st.row_id = sr.student_row_id
                 join sabqcha_user su on su.row_id = st.sabqcha_user_row_id
-                join student_room sr on sr.student_row_id = st.row_id
             where
-                sr.room_row_id = %s
+                sr.room_row_id = %(room_row_id)s
+            order by
+                sr.score desc,
+                sr.student_row_id desc
+            """
+        ).format(rank_window=sql.SQL(_RANK_WINDOWS[rank_mode]))
+    else:
+        query = _ranked_page_query(
+            """
+            page as (
+                select
+                    sr.student_row_id,
+                    sr.score
+                from
+                    student_room sr
+                where
+                    sr.room_row_id = %(room_row_id)s and
+                    (
+                        %(after_score)s::bigint is null or
+                        (sr.score, sr.student_row_id)
+                            < (%(after_score)s::bigint, %(after_row_id)s::bigint)
+                    )
+                order by
+                    sr.score desc,
+                    sr.student_row_id desc
+                limit %(limit)s
+            )
             """,
-            (room_row_id,),
+            rank_mode,
+        )
+
+    async with data_context.get_cursor() as cur:
+        room_row_id, student_row_id = await id_map.resolve(
+            cur, (IdKind.ROOM, room_id), (IdKind.STUDENT, data_context.user_id)
+        )
+        assert room_row_id
+
+        after_row_id = await id_map.get_student_row_id(cur, after[1]) if after else None
+        if after and not after_row_id:
+            return []
+
+        await cur.execute(
+            query,
+            {
+                "room_row_id": room_row_id,
+                "student_row_id": student_row_id,
+                "after_score": after[0] if after else None,
+                "after_row_id": after_row_id,
+                "limit": limit,
+            },
+        )
+        rows = await cur.fetchall()
+    return [
+        LeaderboardEntry(id=r[0], display_name=r[1], score=r[2], rank=r[3], current_user=r[4])
+        for r in rows
+    ]
+
+
+async def list_ranked_students_around_user(
+    data_context: DataContext,
+    room_id: str,
+    *,
+    neighbours: int,
+    rank_mode: RankMode = RankMode.COMPETITION,
+) -> list[LeaderboardEntry]:
+    """The current user's leaderboard entry with `neighbours` entries above and below it."""
+    query = _ranked_page_query(
+        """
+        me as (
+            select
+                student_row_id,
+                score
+            from
+                student_room
+            where
+                room_row_id = %(room_row_id)s and
+                student_row_id = %(student_row_id)s
+        ), page as (
+            (
+                select
+                    sr.student_row_id,
+                    sr.score
+                from
+                    student_room sr,
+                    me
+                where
+                    sr.room_row_id = %(room_row_id)s and
+                    (sr.score, sr.student_row_id) > (me.score, me.student_row_id)
+                order by
+                    sr.score,
+                    sr.student_row_id
+                limit %(neighbours)s
+            )
+            union all
+            select
+                student_row_id,
+                score
+            from
+                me
+            union all
+            (
+                select
+                    sr.student_row_id,
+                    sr.score
+                from
+                    student_room sr,
+                    me
+                where
+                    sr.room_row_id = %(room_row_id)s and
+                    (sr.score, sr.student_row_id) < (me.score, me.student_row_id)
+                order by
+                    sr.score desc,
+                    sr.student_row_id desc
+                limit %(neighbours)s
+            )
+        )
+        """,
+        rank_mode,
+    )
+
+    async with data_context.get_cursor() as cur:
+        room_row_id, student_row_id = await id_map.resolve(
+            cur, (IdKind.ROOM, room_id), (IdKind.STUDENT, data_context.user_id)
+        )
+        assert room_row_id
+        if not student_row_id:
+            return []
+
+        await cur.execute(
+            query,
+            {
+                "room_row_id": room_row_id,
+                "student_row_id": student_row_id,
+                "neighbours": neighbours,
+            },
         )
         rows = await cur.fetchall()
-    return [StudentUser(id=r[0], display_name=r[1], score=r[2]) for r in rows]
+    return [
+        LeaderboardEntry(id=r[0], display_name=r[1], score=r[2], rank=r[3], current_user=r[4])
+        for r in rows
+    ]
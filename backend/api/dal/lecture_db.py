@@ -1,16 +1,22 @@
 from datetime import datetime
 
+from psycopg import AsyncCursor
+
 from api import utils
 from api.dal import id_map
-from api.dependencies import DataContext
+from api.dependencies import DataContext, UnAuthDataContext
 from api.models.lecture_models import (
     Lecture,
     LectureEntryRes,
+    LectureGroupDigest,
     LectureWeekRes,
     TaskSetRes,
 )
 from api.utils import internal_id
 
+# Words per lecture_chunk, the backfill in its migration splits the same way
+LECTURE_CHUNK_WORDS = 150
+
 
 async def insert_lecture(
     data_context: DataContext, lecture_group_id: str, file_path: str, title: str
@@ -32,6 +38,7 @@ async def insert_lecture(
             """,
             (lecture_id, lecture_group_row_id, file_path, title),
         )
+        await _bump_content_version(cur, lecture_group_row_id)
 
     return lecture_id
 
@@ -85,18 +92,24 @@ async def list_lectures_for_group(data_context: DataContext, lecture_group_id: s
                 l.public_id as id,
                 r.public_id as room_id,
                 l.file_path,
-                l.title
+                l.title,
+                l.transcribed_content
             from
                 lecture l
                 join lecture_group lg on lg.row_id = l.lecture_group_row_id
                 join room r on r.row_id = lg.room_row_id
             where
                 l.lecture_group_row_id = %s
+            order by
+                l.created_at
             """,
             (lecture_group_row_id,),
         )
         rows = await cur.fetchall()
-    return [Lecture(id=r[0], room_id=r[1], file_path=r[2], title=r[3]) for r in rows]
+    return [
+        Lecture(id=r[0], room_id=r[1], file_path=r[2], title=r[3], transcribed_content=r[4])
+        for r in rows
+    ]
 
 
 async def get_lecture(data_context: DataContext, lecture_id: str) -> Lecture | None:
@@ -110,7 +123,8 @@ async def get_lecture(data_context: DataContext, lecture_id: str) -> Lecture | N
                 l.title
             from
                 lecture l
-                join room r on r.row_id = l.room_row_id
+                join lecture_group lg on lg.row_id = l.lecture_group_row_id
+                join room r on r.row_id = lg.room_row_id
             where
                 l.public_id = %s
             """,
@@ -232,34 +246,111 @@ async def add_transcription(data_context: DataContext, lecture_id: str, transcri
                 transcribed_content = %s
             where
                 public_id = %s
+            returning
+                row_id,
+                lecture_group_row_id
             """,
             (transcript, lecture_id),
         )
+        row = await cur.fetchone()
+        assert row
+        lecture_row_id, lecture_group_row_id = row
+
+        words = transcript.split()
+        chunks = [
+            " ".join(words[i : i + LECTURE_CHUNK_WORDS])
+            for i in range(0, len(words), LECTURE_CHUNK_WORDS)
+        ]
+        await cur.execute("delete from lecture_chunk where lecture_row_id = %s", (lecture_row_id,))
+        await cur.executemany(
+            """
+            insert into lecture_chunk (
+                lecture_row_id, chunk_index, content
+            )
+            values (
+                %s, %s, %s
+            )
+            """,
+            [(lecture_row_id, idx, chunk) for idx, chunk in enumerate(chunks)],
+        )
+
+        await _bump_content_version(cur, lecture_group_row_id)
+
+
+async def _bump_content_version(cur: AsyncCursor, lecture_group_row_id: int):
+    # Any change to a group's lectures makes its digest stale
+    await cur.execute(
+        """
+        update lecture_group set
+            content_version = content_version + 1
+        where
+            row_id = %s
+        """,
+        (lecture_group_row_id,),
+    )
 
 
-async def get_lecture_group_for_task_set(data_context: DataContext, task_set_id: str) -> str | None:
+async def search_lecture_passages(
+    data_context: DataContext, lecture_group_id: str, queries: list[str], limit: int
+) -> list[list[str]]:
+    """
+    The `limit` lecture chunks of the group best matching each query, best first.
+    A chunk matches if it shares any word with the query, English stop words aside.
+    """
+    if not queries:
+        return []
+
     async with data_context.get_cursor() as cur:
+        lecture_group_row_id = await id_map.get_lecture_group_row_id(cur, lecture_group_id)
+        assert lecture_group_row_id
+
         await cur.execute(
             """
             select
-                lg.public_id
+                m.idx,
+                c.content
             from
-                lecture_group lg
-                join task_set ts on
-                    ts.lecture_group_row_id = lg.row_id and
-                    ts.public_id = %s
+                unnest(%s::text[]) with ordinality as m(query, idx)
+                cross join lateral (
+                    -- Any of the query's words, minus those the english config drops as stop
+                    -- words. The words are kept unstemmed to match the 'simple' chunk index
+                    select
+                        to_tsquery('simple', string_agg(quote_literal(w.lexeme), ' | ')) as tsq
+                    from
+                        unnest(to_tsvector('simple', m.query)) w
+                    where
+                        to_tsvector('english', w.lexeme) <> ''::tsvector
+                ) q
+                cross join lateral (
+                    select
+                        lc.content,
+                        ts_rank(lc.search, q.tsq) as rank
+                    from
+                        lecture_chunk lc
+                        join lecture l on l.row_id = lc.lecture_row_id
+                    where
+                        l.lecture_group_row_id = %s
+                        and lc.search @@ q.tsq
+                    order by
+                        rank desc
+                    limit %s
+                ) c
+            order by
+                m.idx, c.rank desc
             """,
-            (task_set_id,),
+            (queries, lecture_group_row_id, limit),
         )
-        row = await cur.fetchone()
-        if not row:
-            return None
-    return row[0]
+        rows = await cur.fetchall()
+
+    passages: list[list[str]] = [[] for _ in queries]
+    for idx, content in rows:
+        passages[idx - 1].append(content)
+    return passages
 
 
-async def get_transcriptions_for_lecture_group(
-    data_context: DataContext, lecture_group_id: str
-) -> list[str]:
+async def get_lecture_group_digest(
+    data_context: DataContext | UnAuthDataContext, lecture_group_id: str
+) -> LectureGroupDigest:
     async with data_context.get_cursor() as cur:
         lecture_group_row_id = await id_map.get_lecture_group_row_id(cur, lecture_group_id)
         assert lecture_group_row_id
@@ -267,13 +358,53 @@ async def get_transcriptions_for_lecture_group(
         await cur.execute(
             """
             select
-                l.transcribed_content
+                lg.content_version,
+                case when lg.digest_version = lg.content_version then lg.digest end,
+                (
+                    select
+                        coalesce(json_agg(l.transcribed_content order by l.created_at), '[]'::json)
+                    from
+                        lecture l
+                    where
+                        l.lecture_group_row_id = lg.row_id and
+                        l.transcribed_content is not null
+                ) as transcriptions
             from
-                lecture l
+                lecture_group lg
             where
-                l.lecture_group_row_id = %s
+                lg.row_id = %s
             """,
             (lecture_group_row_id,),
         )
-        rows = await cur.fetchall()
-    return [r[0] for r in rows]
+        row = await cur.fetchone()
+        assert row
+    return LectureGroupDigest(content_version=row[0], digest=row[1], transcriptions=row[2])
+
+
+async def set_lecture_group_digest(
+    data_context: DataContext | UnAuthDataContext,
+    lecture_group_id: str,
+    digest: str,
+    content_version: int,
+) -> bool:
+    """
+    Store a digest written from the group's lectures as of `content_version`.
+    Returns False, storing nothing, if the lectures changed since.
+    """
+    async with data_context.get_cursor() as cur:
+        lecture_group_row_id = await id_map.get_lecture_group_row_id(cur, lecture_group_id)
+        assert lecture_group_row_id
+
+        await cur.execute(
+            """
+            update lecture_group set
+                digest = %s,
+                digest_version = content_version,
+                digest_created_at = now()
+            where
+                row_id = %s
+                and content_version = %s
+            """,
+            (digest, lecture_group_row_id, content_version),
+        )
+        return cur.rowcount == 1
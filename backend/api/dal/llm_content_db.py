@@ -0,0 +1,57 @@
+from api.dependencies import DataContext
+from api.models.quiz_model import LLM_CONTENT_EXTRACT_TYPE
+from api.utils import internal_id
+
+
+async def get_extract_id_by_hash(
+    data_context: DataContext, content_hash: str, prompt_version: str
+) -> str | None:
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            select
+                public_id
+            from
+                llm_content_extract
+            where
+                content_hash = %s
+                and prompt_version = %s
+            """,
+            (content_hash, prompt_version),
+        )
+        row = await cur.fetchone()
+        return row[0] if row else None
+
+
+async def insert_extract(
+    data_context: DataContext,
+    content: str,
+    content_type: LLM_CONTENT_EXTRACT_TYPE,
+    content_hash: str,
+    prompt_version: str,
+) -> str:
+    """
+    Insert an extract for a document and return its public id.
+    If the same document was extracted concurrently the existing row wins.
+    """
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            insert into llm_content_extract (
+                public_id,
+                content,
+                content_type,
+                content_hash,
+                prompt_version
+            ) values (
+                %s, %s, %s, %s, %s
+            )
+            on conflict (content_hash, prompt_version) where content_hash is not null
+            do update set content_hash = excluded.content_hash
+            returning public_id
+            """,
+            (internal_id(), content, content_type, content_hash, prompt_version),
+        )
+        row = await cur.fetchone()
+        assert row
+        return row[0]
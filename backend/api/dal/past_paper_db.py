@@ -1,36 +1,65 @@
 from psycopg import sql
 
 from api.dal import id_map
-from api.dependencies import DataContext
-from api.models.past_paper_models import PastPaper
+from api.dal.id_map import IdKind
+from api.dependencies import DataContext, UnAuthDataContext
+from api.image_prep import PreparedImage
+from api.models.past_paper_models import PastPaper, PastPaperAsset, PastPaperAssetKind
 from api.utils import internal_id
 
 
 async def insert_student_solution(
     data_context: DataContext, past_paper_id: str, solution_file_path: str, user_id: str
 ) -> str:
-    solution_id = internal_id()
-
+    """
+    The user's solution row for this upload of the paper, inserted on first call.
+    Grading jobs are retried, a retry reuses the row instead of adding another.
+    """
     async with data_context.get_cursor() as cur:
-        past_paper_row_id = await id_map.get_past_paper_row_id(cur, past_paper_id)
-        assert past_paper_row_id
-
-        user_row_id = await id_map.get_user_row_id(cur, user_id)
-        assert user_row_id
+        past_paper_row_id, user_row_id = await id_map.resolve(
+            cur, (IdKind.PAST_PAPER, past_paper_id), (IdKind.USER, user_id)
+        )
+        assert past_paper_row_id and user_row_id
 
         await cur.execute(
             """
-            insert into student_past_paper_solution (
-                public_id, past_paper_bank_row_id, solution_file_path, sabqcha_user_row_id
-            )
-            values (
-                %s, %s, %s, %s
+            with existing as (
+                select
+                    public_id
+                from
+                    student_past_paper_solution
+                where
+                    sabqcha_user_row_id = %(user_row_id)s and
+                    past_paper_bank_row_id = %(past_paper_row_id)s and
+                    solution_file_path = %(solution_file_path)s
+                order by
+                    row_id
+                limit 1
+            ), inserted as (
+                insert into student_past_paper_solution (
+                    public_id, past_paper_bank_row_id, solution_file_path, sabqcha_user_row_id
+                )
+                select
+                    %(solution_id)s, %(past_paper_row_id)s, %(solution_file_path)s, %(user_row_id)s
+                where
+                    not exists (select 1 from existing)
+                returning
+                    public_id
             )
+            select public_id from existing
+            union all
+            select public_id from inserted
             """,
-            (solution_id, past_paper_row_id, solution_file_path, user_row_id),
+            {
+                "solution_id": internal_id(),
+                "past_paper_row_id": past_paper_row_id,
+                "solution_file_path": solution_file_path,
+                "user_row_id": user_row_id,
+            },
         )
-
-    return solution_id
+        row = await cur.fetchone()
+        assert row
+    return row[0]
 
 
 async def update_llm_contents_for_solution(
@@ -69,11 +98,10 @@ async def get_student_graded_solution(
     data_context: DataContext, user_id: str, past_paper_id: str
 ) -> str | None:
     async with data_context.get_cursor() as cur:
-        user_row_id = await id_map.get_user_row_id(cur, user_id)
-        assert user_row_id
-
-        past_paper_row_id = await id_map.get_past_paper_row_id(cur, past_paper_id)
-        assert past_paper_row_id
+        user_row_id, past_paper_row_id = await id_map.resolve(
+            cur, (IdKind.USER, user_id), (IdKind.PAST_PAPER, past_paper_id)
+        )
+        assert user_row_id and past_paper_row_id
 
         await cur.execute(
             """
@@ -117,14 +145,72 @@ async def get_rubric_for_past_paper(data_context: DataContext, past_paper_id: st
     return row[0]
 
 
-async def get_random_past_paper(data_context: DataContext, subject_id: str) -> PastPaper | None:
-    papers = await list_past_papers(data_context, None, subject_id)
-    if papers:
-        return papers[0]
-    return None
+async def get_random_past_paper(
+    data_context: DataContext,
+    subject_id: str,
+    *,
+    user_id: str | None = None,
+    year: int | None = None,
+    season: str | None = None,
+    paper: int | None = None,
+) -> PastPaper | None:
+    """
+    Pick a random paper of the subject matching the filters.
+    Papers the user already attempted are only picked once none are left.
+    """
+    async with data_context.get_cursor() as cur:
+        subject_row_id = await id_map.get_subject_row_id(cur, subject_id)
+        user_row_id = await id_map.get_user_row_id(cur, user_id) if user_id else None
+    if not subject_row_id:
+        return None
 
+    async with data_context.get_model_cursor(PastPaper) as cur:
+        await cur.execute(
+            """
+            select
+                ppb.public_id as id,
+                s.display_name || ' ' || s.code as subject,
+                ppb.season,
+                ppb.year,
+                ppb.paper,
+                ppb.variant,
+                ppb.question_file_path,
+                ppb.marking_scheme_file_path
+            from
+                past_paper_bank ppb
+                join subject s on s.row_id = ppb.subject_row_id
+            where
+                ppb.subject_row_id = %(subject_row_id)s and
+                (%(year)s::int is null or ppb.year = %(year)s) and
+                (%(season)s::text is null or ppb.season = %(season)s) and
+                (%(paper)s::int is null or ppb.paper = %(paper)s)
+            order by
+                exists (
+                    select
+                        1
+                    from
+                        student_past_paper_solution spps
+                    where
+                        spps.sabqcha_user_row_id = %(user_row_id)s and
+                        spps.past_paper_bank_row_id = ppb.row_id
+                ),
+                random()
+            limit 1
+            """,
+            {
+                "subject_row_id": subject_row_id,
+                "user_row_id": user_row_id,
+                "year": year,
+                "season": season,
+                "paper": paper,
+            },
+        )
+        return await cur.fetchone()
 
-async def get_past_paper(data_context: DataContext, past_paper_id: str) -> PastPaper | None:
+
+async def get_past_paper(
+    data_context: DataContext | UnAuthDataContext, past_paper_id: str
+) -> PastPaper | None:
     papers = await list_past_papers(data_context, past_paper_id, None)
     assert len(papers) <= 1
 
@@ -134,7 +220,9 @@ async def get_past_paper(data_context: DataContext, past_paper_id: str) -> PastP
 
 
 async def list_past_papers(
-    data_context: DataContext, past_paper_id: str | None = None, subject_id: str | None = None
+    data_context: DataContext | UnAuthDataContext,
+    past_paper_id: str | None = None,
+    subject_id: str | None = None,
 ) -> list[PastPaper]:
     assert past_paper_id or subject_id
 
@@ -175,6 +263,105 @@ async def list_past_papers(
         return await cur.fetchall()
 
 
+async def list_past_paper_ids(data_context: DataContext | UnAuthDataContext) -> list[str]:
+    async with data_context.get_cursor() as cur:
+        await cur.execute("select public_id from past_paper_bank order by created_at")
+        rows = await cur.fetchall()
+    return [r[0] for r in rows]
+
+
+async def list_past_paper_assets(
+    data_context: DataContext | UnAuthDataContext, past_paper_id: str, profile: str
+) -> list[PastPaperAsset]:
+    """Prepared pages that still match the paper's current files and the given profile."""
+    async with data_context.get_model_cursor(PastPaperAsset) as cur:
+        await cur.execute(
+            """
+            select
+                ppa.kind,
+                ppa.page,
+                ppa.data,
+                ppa.width,
+                ppa.height,
+                ppa.source_width,
+                ppa.source_height,
+                ppa.source_bytes
+            from
+                past_paper_asset ppa
+                join past_paper_bank ppb on ppb.row_id = ppa.past_paper_bank_row_id
+            where
+                ppb.public_id = %s and
+                ppa.profile = %s and
+                ppa.source_path = case ppa.kind
+                    when 'QUESTION' then ppb.question_file_path
+                    else ppb.marking_scheme_file_path
+                end
+            order by
+                ppa.kind, ppa.page
+            """,
+            (past_paper_id, profile),
+        )
+        return await cur.fetchall()
+
+
+async def replace_past_paper_assets(
+    data_context: DataContext | UnAuthDataContext,
+    past_paper_id: str,
+    kind: PastPaperAssetKind,
+    source_path: str,
+    profile: str,
+    images: list[PreparedImage],
+):
+    async with data_context.get_cursor() as cur:
+        past_paper_row_id = await id_map.get_past_paper_row_id(cur, past_paper_id)
+        assert past_paper_row_id
+
+        await cur.execute(
+            """
+            delete from past_paper_asset
+            where
+                past_paper_bank_row_id = %s and
+                kind = %s
+            """,
+            (past_paper_row_id, kind),
+        )
+        await cur.executemany(
+            """
+            insert into past_paper_asset (
+                past_paper_bank_row_id,
+                kind,
+                page,
+                source_path,
+                profile,
+                data,
+                width,
+                height,
+                source_width,
+                source_height,
+                source_bytes
+            ) values (
+                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+            )
+            """,
+            [
+                (
+                    past_paper_row_id,
+                    kind,
+                    page,
+                    source_path,
+                    profile,
+                    img.data,
+                    img.width,
+                    img.height,
+                    img.source_width,
+                    img.source_height,
+                    img.source_bytes,
+                )
+                for page, img in enumerate(images, start=1)
+            ],
+        )
+
+
 async def get_subject_id_for_room(data_context: DataContext, room_id: str) -> str | None:
     async with data_context.get_cursor() as cur:
         await cur.execute(
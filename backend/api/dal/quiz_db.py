@@ -4,7 +4,7 @@ from psycopg import sql
 
 from api.dal import id_map
 from api.dependencies import DataContext
-from api.models.quiz_model import Quiz, StudentSolution
+from api.models.quiz_model import GradingProgress, Quiz, StudentSolution
 from api.utils import internal_id
 
 
@@ -43,53 +43,24 @@ async def insert_quiz(
 async def update_llm_contents_for_quiz(
     data_context: DataContext,
     quiz_id: str,
-    rubric_text: str,
-    marking_scheme_text: str,
+    rubric_extract_id: str,
+    marking_scheme_extract_id: str,
 ):
+    """Point the quiz at its extracts, which may be shared with other quizzes."""
     async with data_context.get_cursor() as cur:
-        await cur.execute(
-            """
-            insert into llm_content_extract (
-                public_id,
-                content,
-                content_type
-            ) values (
-                %s, %s, 'RUBRIC'
-            )
-            returning row_id
-            """,
-            (internal_id(), rubric_text),
-        )
-        rubric_row = await cur.fetchone()
-        assert rubric_row
-        rubric_row_id = rubric_row[0]
-
-        await cur.execute(
-            """
-            insert into llm_content_extract (
-                public_id,
-                content,
-                content_type
-            ) values (
-                %s, %s, 'MARKING_SCHEME'
-            )
-            returning row_id
-            """,
-            (internal_id(), marking_scheme_text),
-        )
-        ms_row = await cur.fetchone()
-        assert ms_row
-        ms_row_id = ms_row[0]
-
         await cur.execute(
             """
             update quiz set
-                ms_llm_content_extract_row_id = %s,
-                rubric_llm_content_extract_row_id = %s
+                ms_llm_content_extract_row_id = (
+                    select row_id from llm_content_extract where public_id = %s
+                ),
+                rubric_llm_content_extract_row_id = (
+                    select row_id from llm_content_extract where public_id = %s
+                )
             where
                 public_id = %s
             """,
-            (ms_row_id, rubric_row_id, quiz_id),
+            (marking_scheme_extract_id, rubric_extract_id, quiz_id),
         )
 
 
@@ -188,7 +159,11 @@ async def list_student_solutions_for_quiz(
 
 
 async def list_student_solutions(
-    data_context: DataContext, *, quiz_id: str | None = None, solution_id: str | None = None
+    data_context: DataContext,
+    *,
+    quiz_id: str | None = None,
+    solution_id: str | None = None,
+    ungraded_only: bool = False,
 ) -> list[StudentSolution]:
     query = sql.SQL(
         """
@@ -215,6 +190,9 @@ async def list_student_solutions(
         conditions.append(sql.SQL("ss.public_id = %s"))
         args.append(solution_id)
 
+    if ungraded_only:
+        conditions.append(sql.SQL("ss.graded_llm_content_extract_row_id is null"))
+
     if conditions:
         query += sql.SQL(" where ") + sql.SQL(" and ").join(conditions)
     query += order_by
@@ -224,6 +202,28 @@ async def list_student_solutions(
         return await cur.fetchall()
 
 
+async def get_grading_progress(data_context: DataContext, quiz_id: str) -> GradingProgress:
+    async with data_context.get_model_cursor(GradingProgress) as cur:
+        await cur.execute(
+            """
+            select
+                q.public_id as quiz_id,
+                count(ss.row_id) as total,
+                count(ss.graded_llm_content_extract_row_id) as graded
+            from
+                quiz q
+                left join student_solution ss on ss.quiz_row_id = q.row_id
+            where
+                q.public_id = %s
+            group by
+                q.public_id
+            """,
+            (quiz_id,),
+        )
+        progress = await cur.fetchone()
+        return progress or GradingProgress(quiz_id=quiz_id, total=0, graded=0)
+
+
 async def update_llm_contents_for_solution(
     data_context: DataContext, solution_id: str, graded_text: str
 ):
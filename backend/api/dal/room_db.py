@@ -1,4 +1,5 @@
 from api.dal import id_map
+from api.dal.id_map import IdKind
 from api.dependencies import DataContext
 from api.models.room_models import Room
 from api.models.user_models import UserRole
@@ -29,11 +30,10 @@ async def insert_room(data_context: DataContext, display_name: str, teacher_id:
 
 async def join_room(data_context: DataContext, room_id: str, student_id: str):
     async with data_context.get_cursor() as cur:
-        student_row_id = await id_map.get_student_row_id(cur, student_id)
-        assert student_row_id
-
-        room_row_id = await id_map.get_room_row_id(cur, room_id)
-        assert room_row_id
+        student_row_id, room_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, student_id), (IdKind.ROOM, room_id)
+        )
+        assert student_row_id and room_row_id
 
         await cur.execute(
             """
@@ -50,10 +50,10 @@ async def join_room(data_context: DataContext, room_id: str, student_id: str):
 
 async def migrate_rooms(data_context: DataContext, from_user_id: str, to_user_id: str):
     async with data_context.get_cursor() as cur:
-        from_student_row_id = await id_map.get_student_row_id(cur, from_user_id)
-        assert from_student_row_id
-        to_student_row_id = await id_map.get_student_row_id(cur, to_user_id)
-        assert to_student_row_id
+        from_student_row_id, to_student_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, from_user_id), (IdKind.STUDENT, to_user_id)
+        )
+        assert from_student_row_id and to_student_row_id
 
         await cur.execute(
             """
@@ -83,31 +83,7 @@ async def list_rooms(data_context: DataContext, user_id: str, user_role: UserRol
                         r.public_id,
                         r.display_name,
                         r.invite_code,
-                        (
-                            select
-                                ts.public_id
-                            from
-                                task_set ts
-                                join lecture_group lg on
-                                    lg.row_id = ts.lecture_group_row_id and
-                                    lg.room_row_id = r.row_id
-                                left join task_set_attempt tsa on
-                                    tsa.task_set_row_id = ts.row_id
-                            where
-                                ts.day = case extract(dow from now())
-                                    when 1 then 'MONDAY'::week_day
-                                    when 2 then 'TUESDAY'::week_day
-                                    when 3 then 'WEDNESDAY'::week_day
-                                    when 4 then 'THURSDAY'::week_day
-                                    when 5 then 'FRIDAY'::week_day
-                                    else null
-                                end and
-                                tsa.row_id is null
-                            order by 
-                                lg.created_at DESC,
-                                ts.created_at ASC
-                            limit 1
-                        ) as daily_task_set_id,
+                        daily.public_id as daily_task_set_id,
                         sr.score,
                         r.ai_tutor_enabled
                     from
@@ -115,6 +91,34 @@ async def list_rooms(data_context: DataContext, user_id: str, user_role: UserRol
                         join student_room sr on sr.room_row_id = r.row_id
                         join student s on s.row_id = sr.student_row_id
                         join sabqcha_user su on su.row_id = s.sabqcha_user_row_id
+                        -- Today's set of the latest week this student hasn't attempted yet,
+                        -- null on weekends as week_day has no SATURDAY and SUNDAY
+                        left join lateral (
+                            select
+                                ts.public_id
+                            from
+                                lecture_group lg
+                                join task_set ts on
+                                    ts.lecture_group_row_id = lg.row_id and
+                                    ts.day = (enum_range(null::week_day))[
+                                        extract(isodow from now())::int
+                                    ]
+                            where
+                                lg.room_row_id = r.row_id and
+                                not exists (
+                                    select
+                                        1
+                                    from
+                                        task_set_attempt tsa
+                                    where
+                                        tsa.student_row_id = sr.student_row_id and
+                                        tsa.task_set_row_id = ts.row_id
+                                )
+                            order by
+                                lg.created_at desc,
+                                ts.created_at asc
+                            limit 1
+                        ) daily on true
                     where
                         su.public_id = %s
                     """,
@@ -252,14 +256,79 @@ async def get_room_for_task_set(data_context: DataContext, task_set_id: str) ->
         return row[0] if row else None
 
 
+async def get_room_for_lecture_group(
+    data_context: DataContext, lecture_group_id: str
+) -> str | None:
+    async with data_context.get_cursor() as cur:
+        await cur.execute(
+            """
+            select
+                r.public_id
+            from
+                room r
+                join lecture_group lg on lg.room_row_id = r.row_id
+            where
+                lg.public_id = %s
+            """,
+            (lecture_group_id,),
+        )
+        row = await cur.fetchone()
+        return row[0] if row else None
+
+
+async def is_room_member(
+    data_context: DataContext, user_id: str, user_role: UserRole, room_id: str
+) -> bool:
+    """Whether the student joined the room, or the teacher owns it."""
+    async with data_context.get_cursor() as cur:
+        match user_role:
+            case UserRole.STUDENT:
+                student_row_id = await id_map.get_student_row_id(cur, user_id)
+                if not student_row_id:
+                    return False
+
+                await cur.execute(
+                    """
+                    select
+                        1
+                    from
+                        room r
+                        join student_room sr on
+                            sr.room_row_id = r.row_id and
+                            sr.student_row_id = %s
+                    where
+                        r.public_id = %s
+                    """,
+                    (student_row_id, room_id),
+                )
+            case UserRole.TEACHER:
+                teacher_row_id = await id_map.get_teacher_row_id(cur, user_id)
+                if not teacher_row_id:
+                    return False
+
+                await cur.execute(
+                    """
+                    select
+                        1
+                    from
+                        room
+                    where
+                        public_id = %s and
+                        teacher_row_id = %s
+                    """,
+                    (room_id, teacher_row_id),
+                )
+        return await cur.fetchone() is not None
+
+
 async def update_user_score(
     data_context: DataContext, user_id: str, room_id: str, score_to_add: int
 ):
     async with data_context.get_cursor() as cur:
-        student_row_id = await id_map.get_student_row_id(cur, user_id)
-        assert student_row_id
-        room_row_id = await id_map.get_room_row_id(cur, room_id)
-        assert room_row_id
+        student_row_id, room_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, user_id), (IdKind.ROOM, room_id)
+        )
+        assert student_row_id and room_row_id
 
         await cur.execute(
             """
@@ -1,10 +1,20 @@
+import os
+
 from psycopg import AsyncCursor
 
+from api.cache_utils import LruTtlCache
 from api.dal import id_map
 from api.dependencies import DataContext, UnAuthDataContext
 from api.models.user_models import AuthData, UserRole
 from api.utils import internal_id
 
+# Sessions are read on every authenticated request, cache them in process.
+# The TTL bounds how long another process can serve a session after it changed.
+_session_cache: LruTtlCache[str, AuthData] = LruTtlCache(
+    max_size=int(os.getenv("SABQCHA_SESSION_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("SABQCHA_SESSION_CACHE_TTL", "60")),
+)
+
 
 async def insert_session(data_context: DataContext | UnAuthDataContext, user_id: str) -> str:
     session_id = internal_id()
@@ -22,7 +32,9 @@ async def insert_session(data_context: DataContext | UnAuthDataContext, user_id:
             """,
             (session_id, user_row_id),
         )
-        return session_id
+
+    data_context.after_commit(lambda: invalidate_user_sessions(user_id))
+    return session_id
 
 
 async def expire_user_sessions(data_context: DataContext | UnAuthDataContext, user_id: str):
@@ -37,6 +49,24 @@ async def expire_user_sessions(data_context: DataContext | UnAuthDataContext, us
             (user_row_id,),
         )
 
+    data_context.after_commit(lambda: invalidate_user_sessions(user_id))
+
+
+def get_cached_session(session_id: str) -> AuthData | None:
+    return _session_cache.get(session_id)
+
+
+def cache_session(session_id: str, auth_data: AuthData):
+    _session_cache.set(session_id, auth_data)
+
+
+def invalidate_user_sessions(user_id: str):
+    _session_cache.evict_where(lambda _, auth_data: auth_data.user_id == user_id)
+
+
+def session_cache_stats() -> dict[str, int | float]:
+    return _session_cache.stats()
+
 
 async def get_session(cur: AsyncCursor, session_id: str) -> AuthData | None:
     await cur.execute(
@@ -1,11 +1,13 @@
 import json
 
 from api.dal import id_map
+from api.dal.id_map import IdKind
 from api.dependencies import DataContext
 from api.models.task_models import (
     Task,
     TaskAttempted,
     TaskSet,
+    TaskSetAnalysisInput,
     TaskSetAttemptRes,
     TaskSetRes,
     WeekDay,
@@ -63,6 +65,26 @@ async def insert_task_set(
     return task_set_id
 
 
+async def list_task_set_days(data_context: DataContext, lecture_group_id: str) -> set[WeekDay]:
+    async with data_context.get_cursor() as cur:
+        lecture_group_row_id = await id_map.get_lecture_group_row_id(cur, lecture_group_id)
+        assert lecture_group_row_id
+
+        await cur.execute(
+            """
+            select
+                day
+            from
+                task_set
+            where
+                lecture_group_row_id = %s
+            """,
+            (lecture_group_row_id,),
+        )
+        rows = await cur.fetchall()
+    return {WeekDay(r[0]) for r in rows}
+
+
 async def insert_attempt(
     data_context: DataContext,
     user_id: str,
@@ -76,10 +98,10 @@ async def insert_attempt(
     attempt_id = internal_id()
 
     async with data_context.get_cursor() as cur:
-        student_row_id = await id_map.get_student_row_id(cur, user_id)
-        assert student_row_id
-        task_set_row_id = await id_map.get_task_set_row_id(cur, task_set_id)
-        assert task_set_row_id
+        student_row_id, task_set_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, user_id), (IdKind.TASK_SET, task_set_id)
+        )
+        assert student_row_id and task_set_row_id
 
         await cur.execute(
             """
@@ -155,10 +177,10 @@ async def list_task_sets_for_room(
     data_context: DataContext, user_id: str, room_id: str
 ) -> list[TaskSetRes]:
     async with data_context.get_cursor() as cur:
-        student_row_id = await id_map.get_student_row_id(cur, user_id)
-        assert student_row_id
-        room_row_id = await id_map.get_room_row_id(cur, room_id)
-        assert room_row_id
+        student_row_id, room_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, user_id), (IdKind.ROOM, room_id)
+        )
+        assert student_row_id and room_row_id
 
         await cur.execute(
             """
@@ -224,10 +246,10 @@ async def list_task_sets_for_room(
 
 async def migrate_attempts(data_context: DataContext, from_user_id: str, to_user_id: str):
     async with data_context.get_cursor() as cur:
-        from_student_row_id = await id_map.get_student_row_id(cur, from_user_id)
-        assert from_student_row_id
-        to_student_row_id = await id_map.get_student_row_id(cur, to_user_id)
-        assert to_student_row_id
+        from_student_row_id, to_student_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, from_user_id), (IdKind.STUDENT, to_user_id)
+        )
+        assert from_student_row_id and to_student_row_id
 
         await cur.execute(
             """
@@ -240,38 +262,92 @@ async def migrate_attempts(data_context: DataContext, from_user_id: str, to_user
         )
 
 
-async def get_room_id_for_task_set(data_context: DataContext, task_set_id: str) -> str | None:
+async def get_task_set_analysis_input(
+    data_context: DataContext, user_id: str, task_set_id: str
+) -> TaskSetAnalysisInput | None:
     async with data_context.get_cursor() as cur:
-        task_set_row_id = await id_map.get_task_set_row_id(cur, task_set_id)
-        assert task_set_row_id
+        student_row_id, task_set_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, user_id), (IdKind.TASK_SET, task_set_id)
+        )
+        assert student_row_id and task_set_row_id
 
         await cur.execute(
             """
             select
-                r.public_id
+                ts.public_id,
+                lg.public_id,
+                (
+                    select
+                        json_agg(
+                            json_build_object(
+                                'id', t.public_id,
+                                'question', t.question,
+                                'answer', t.answer,
+                                'options', t.options
+                            )
+                            order by t.row_id
+                        )
+                    from
+                        task t
+                    where
+                        t.task_set_row_id = ts.row_id
+                ) as tasks,
+                (
+                    select
+                        coalesce(json_agg(tsa.user_attempts order by tsa.created_at), '[]'::json)
+                    from
+                        task_set_attempt tsa
+                    where
+                        tsa.student_row_id = %s and
+                        tsa.task_set_row_id = ts.row_id
+                ) as attempts,
+                (
+                    select
+                        coalesce(json_agg(l.transcribed_content order by l.created_at), '[]'::json)
+                    from
+                        lecture l
+                    where
+                        l.lecture_group_row_id = lg.row_id and
+                        l.transcribed_content is not null
+                ) as transcriptions,
+                lg.content_version,
+                case when lg.digest_version = lg.content_version then lg.digest end
             from
-                room r
-                join lecture_group lg on lg.room_row_id = r.row_id
-                join task_set ts on
-                    ts.lecture_group_row_id = lg.row_id and
-                    ts.row_id = %s
+                task_set ts
+                join lecture_group lg on lg.row_id = ts.lecture_group_row_id
+            where
+                ts.row_id = %s
             """,
-            (task_set_row_id,),
+            (student_row_id, task_set_row_id),
         )
         row = await cur.fetchone()
         if not row:
             return None
-    return row[0]
+    return TaskSetAnalysisInput(
+        task_set_id=row[0],
+        lecture_group_id=row[1],
+        tasks=[
+            Task(id=t["id"], question=t["question"], answer=t["answer"], options=t["options"])
+            for t in row[2] or []
+        ],
+        attempts=[
+            [TaskAttempted(answer=ua["answer"], did_skip=ua["did_skip"]) for ua in attempt]
+            for attempt in row[3]
+        ],
+        transcriptions=row[4],
+        content_version=row[5],
+        digest=row[6],
+    )
 
 
 async def get_recent_mistake_analysis(
     data_context: DataContext, user_id: str, task_set_id: str
 ) -> dict | None:
     async with data_context.get_cursor() as cur:
-        student_row_id = await id_map.get_student_row_id(cur, user_id)
-        assert student_row_id
-        task_set_row_id = await id_map.get_task_set_row_id(cur, task_set_id)
-        assert task_set_row_id
+        student_row_id, task_set_row_id = await id_map.resolve(
+            cur, (IdKind.STUDENT, user_id), (IdKind.TASK_SET, task_set_id)
+        )
+        assert student_row_id and task_set_row_id
 
         await cur.execute(
             """
@@ -300,10 +376,10 @@ async def insert_analysis(
     analysis_id = internal_id()
 
     async with data_context.get_cursor() as cur:
-        task_set_row_id = await id_map.get_task_set_row_id(cur, task_set_id)
-        assert task_set_row_id
-        student_row_id = await id_map.get_student_row_id(cur, user_id)
-        assert student_row_id
+        task_set_row_id, student_row_id = await id_map.resolve(
+            cur, (IdKind.TASK_SET, task_set_id), (IdKind.STUDENT, user_id)
+        )
+        assert task_set_row_id and student_row_id
 
         await cur.execute(
             """
@@ -1,21 +1,35 @@
 import os
 from contextlib import asynccontextmanager
-from typing import TypeVar
+from typing import Callable, TypeVar
 
 import firebase_admin
 from fastapi import Request
 from firebase_admin import credentials, firestore, storage
 from loguru import logger
 from openai import AsyncOpenAI
+from psycopg import AsyncConnection
 from psycopg.rows import class_row
 from psycopg_pool import AsyncConnectionPool
 from pydantic import BaseModel
 
 from api.models.user_models import AuthData, UserRole
+from api.uplift_client import UpliftSttClient
 
 # Setup PG
 pool: AsyncConnectionPool | None = None
 
+
+def get_pg_conninfo() -> str:
+    dbname = os.getenv("SABQCHA_PG_DB")
+    user = os.getenv("SABQCHA_PG_USER")
+    password = os.getenv("SABQCHA_PG_PASSWORD")
+    host = os.getenv("SABQCHA_PG_HOST")
+    port = os.getenv("SABQCHA_PG_PORT")
+
+    assert dbname and user and password and host and port
+    return f"dbname={dbname} user={user} password={password} host={host} port={port}"
+
+
 # Setup Firebase
 _cred = credentials.Certificate("firebase_credentials.json")
 firebase_admin.initialize_app(_cred, {"storageBucket": "sabqcha.firebasestorage.app"})
@@ -26,16 +40,64 @@ _db = firestore.client()
 # Setup OpenAI
 _openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Setup Uplift speech-to-text
+_stt_client = UpliftSttClient(
+    os.getenv("UPLIFT_API_KEY"),
+    max_in_flight=int(os.getenv("UPLIFT_MAX_IN_FLIGHT", "8")),
+    requests_per_second=float(os.getenv("UPLIFT_REQUESTS_PER_SECOND", "4")),
+    max_retries=int(os.getenv("UPLIFT_MAX_RETRIES", "3")),
+)
+
 T = TypeVar("T", bound=BaseModel)
 
 
-class DataContext:
-    def __init__(self, user_id: str, role: UserRole) -> None:
-        self.user_id = user_id
-        self.user_role = role
+class _BaseDataContext:
+    def __init__(self) -> None:
+        self._conn: AsyncConnection | None = None
+        self._after_commit: list[Callable[[], None]] = []
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Unit of work: every DAL call made inside this block shares one pool
+        connection and one transaction, committed once at the end or rolled
+        back if the block raises. Nested blocks join the outer one.
+        """
+        if self._conn is not None:
+            yield
+            return
+
+        assert pool
+        self._after_commit = []
+        async with pool.connection() as conn:
+            self._conn = conn
+            try:
+                yield
+            finally:
+                self._conn = None
+
+        # Only reached once the transaction committed
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def after_commit(self, callback: Callable[[], None]):
+        """
+        Run `callback` once the current transaction commits, e.g. to update a process cache.
+        Outside a transaction every DAL call has already committed, so it runs right away.
+        """
+        if self._conn is None:
+            callback()
+        else:
+            self._after_commit.append(callback)
 
     @asynccontextmanager
     async def get_cursor(self):
+        if self._conn is not None:
+            async with self._conn.cursor() as cur:
+                yield cur
+            return
+
         assert pool
         async with pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -44,6 +106,11 @@ class DataContext:
 
     @asynccontextmanager
     async def get_model_cursor(self, model: type[T]):
+        if self._conn is not None:
+            async with self._conn.cursor(row_factory=class_row(model)) as cur:
+                yield cur
+            return
+
         assert pool
         async with pool.connection() as conn:
             async with conn.cursor(row_factory=class_row(model)) as cur:
@@ -51,14 +118,15 @@ class DataContext:
                 await cur.connection.commit()
 
 
-class UnAuthDataContext:
-    @asynccontextmanager
-    async def get_cursor(self):
-        assert pool
-        async with pool.connection() as conn:
-            async with conn.cursor() as cur:
-                yield cur
-                await cur.connection.commit()
+class DataContext(_BaseDataContext):
+    def __init__(self, user_id: str, role: UserRole) -> None:
+        super().__init__()
+        self.user_id = user_id
+        self.user_role = role
+
+
+class UnAuthDataContext(_BaseDataContext):
+    pass
 
 
 def get_un_auth_data_context() -> UnAuthDataContext:
@@ -90,3 +158,7 @@ def get_firestore():
 
 def get_openai_client() -> AsyncOpenAI:
     return _openai_client
+
+
+def get_stt_client() -> UpliftSttClient:
+    return _stt_client
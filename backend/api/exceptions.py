@@ -12,3 +12,11 @@ class NoImagesInPdfError(Exception):
 
 class UnsupportedExtensionError(Exception):
     pass
+
+
+class AudioSegmentationError(Exception):
+    pass
+
+
+class SolutionGradingError(Exception):
+    pass
@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import math
+from io import BytesIO
+from pathlib import Path
+
+from loguru import logger
+from PIL import Image, ImageOps
+from pydantic import BaseModel
+
+
+class ImageProfile(BaseModel):
+    name: str
+    max_long_edge: int
+    grayscale: bool
+    jpeg_quality: int
+
+
+# Printed pages, marking schemes and rubrics, colour carries no meaning
+DOCUMENT = ImageProfile(name="document", max_long_edge=1600, grayscale=True, jpeg_quality=70)
+
+# Student answers, often phone photos, colour is kept for diagrams and highlighted work
+HANDWRITING = ImageProfile(name="handwriting", max_long_edge=2048, grayscale=False, jpeg_quality=80)
+
+
+class PreparedImage(BaseModel):
+    data: bytes
+    width: int
+    height: int
+    # What would have been sent without preparation, source_bytes is unknown for rendered pages
+    source_width: int
+    source_height: int
+    source_bytes: int | None = None
+
+
+def estimate_vision_tokens(width: int, height: int) -> int:
+    """
+    OpenAI high detail estimate: the image is fit in 2048x2048, its short side
+    scaled down to 768, then billed 170 tokens per 512px tile plus 85.
+    """
+    if not width or not height:
+        return 0
+
+    scale = min(1.0, 2048 / max(width, height))
+    w, h = width * scale, height * scale
+    scale = min(1.0, 768 / min(w, h))
+    w, h = w * scale, h * scale
+    return 85 + 170 * math.ceil(w / 512) * math.ceil(h / 512)
+
+
+def prepare_image(
+    img: Image.Image,
+    profile: ImageProfile,
+    source_bytes: int | None = None,
+    source_size: tuple[int, int] | None = None,
+) -> PreparedImage:
+    img = ImageOps.exif_transpose(img)
+    source_width, source_height = source_size or img.size
+
+    scale = profile.max_long_edge / max(img.size)
+    if scale < 1:
+        img = img.resize(
+            (round(img.width * scale), round(img.height * scale)), Image.Resampling.LANCZOS
+        )
+    img = img.convert("L" if profile.grayscale else "RGB")
+
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=profile.jpeg_quality, optimize=True)
+
+    return PreparedImage(
+        data=buffer.getvalue(),
+        width=img.width,
+        height=img.height,
+        source_width=source_width,
+        source_height=source_height,
+        source_bytes=source_bytes,
+    )
+
+
+def prepare_image_bytes(data: bytes, profile: ImageProfile) -> PreparedImage:
+    with Image.open(BytesIO(data)) as img:
+        return prepare_image(img, profile, source_bytes=len(data))
+
+
+async def prepare_image_file(path: str, profile: ImageProfile) -> PreparedImage:
+    data = await asyncio.to_thread(Path(path).read_bytes)
+    return await asyncio.to_thread(prepare_image_bytes, data, profile)
+
+
+def get_model_input(image: PreparedImage) -> dict[str, str]:
+    base64_image = base64.b64encode(image.data).decode("utf-8")
+    return {
+        "type": "input_image",
+        "image_url": f"data:image/jpeg;base64,{base64_image}",
+    }
+
+
+def record_savings(label: str, images: list[PreparedImage]):
+    """Log what preparing the images of one LLM call saved."""
+    bytes_sent = sum(len(i.data) for i in images)
+    bytes_saved = sum(i.source_bytes - len(i.data) for i in images if i.source_bytes)
+    tokens_sent = sum(estimate_vision_tokens(i.width, i.height) for i in images)
+    tokens_saved = (
+        sum(estimate_vision_tokens(i.source_width, i.source_height) for i in images) - tokens_sent
+    )
+
+    logger.info(
+        "{}: sending {} images, {:.1f} KB ({:.1f} KB saved), ~{} vision tokens (~{} saved)",
+        label,
+        len(images),
+        bytes_sent / 1e3,
+        bytes_saved / 1e3,
+        tokens_sent,
+        tokens_saved,
+    )
+
@@ -0,0 +1,91 @@
+"""
+Prepares the question and marking scheme pages of past papers for grading,
+so a student's grading request only has to handle their own upload.
+Run after adding papers to past_paper_bank (already prepared papers are skipped):
+  uv run --env-file .env python -m api.ingest_past_papers [--force] [past_paper_id ...]
+"""
+
+import argparse
+import asyncio
+import sys
+
+from loguru import logger
+from psycopg_pool import AsyncConnectionPool
+
+from api import dependencies
+from api.controllers import past_paper_controller
+from api.dal import past_paper_db
+from api.dependencies import UnAuthDataContext
+from api.models.past_paper_models import PastPaperAssetKind
+
+# Setup logger
+logger.remove()
+
+# Configure output to console
+logger.add(
+    sys.stdout,
+    colorize=True,
+    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>",
+)
+
+
+async def ingest(data_context: UnAuthDataContext, past_paper_id: str, force: bool):
+    paper = await past_paper_db.get_past_paper(data_context, past_paper_id)
+    assert paper, f"Past paper {past_paper_id} not found"
+
+    assets = await past_paper_db.list_past_paper_assets(
+        data_context, past_paper_id, past_paper_controller.ASSET_PROFILE_KEY
+    )
+    prepared = {a.kind for a in assets}
+
+    file_paths = {
+        PastPaperAssetKind.QUESTION: paper.question_file_path,
+        PastPaperAssetKind.MARKING_SCHEME: paper.marking_scheme_file_path,
+    }
+    for kind, file_path in file_paths.items():
+        if kind in prepared and not force:
+            logger.info("Past paper {} {} already prepared", past_paper_id, kind)
+            continue
+
+        await past_paper_controller.prepare_past_paper_asset(
+            data_context, dependencies.get_bucket(), past_paper_id, kind, file_path
+        )
+
+
+async def main(past_paper_ids: list[str], force: bool):
+    dependencies.pool = AsyncConnectionPool(
+        dependencies.get_pg_conninfo(), min_size=1, max_size=2, open=False
+    )
+    await dependencies.pool.open()
+
+    data_context = UnAuthDataContext()
+    try:
+        past_paper_ids = past_paper_ids or await past_paper_db.list_past_paper_ids(data_context)
+        logger.info("Preparing {} past papers", len(past_paper_ids))
+
+        failed = 0
+        for past_paper_id in past_paper_ids:
+            try:
+                await ingest(data_context, past_paper_id, force)
+            except Exception:
+                logger.exception("Failed to prepare past paper {}", past_paper_id)
+                failed += 1
+    finally:
+        await dependencies.pool.close()
+        dependencies.pool = None
+
+    if failed:
+        logger.error("{} past papers failed", failed)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("past_paper_ids", nargs="*")
+    parser.add_argument("--force", action="store_true", help="Re-render prepared papers")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.past_paper_ids, args.force))
@@ -0,0 +1,109 @@
+"""
+Fans job state changes out to the API's server-sent event streams.
+job_db sends a NOTIFY on the job_events channel whenever a job is claimed, reports
+progress, completes or fails, from whichever process ran it. Each API process
+LISTENs on one dedicated connection and hands the events to the subscribed users,
+and to the subscribers of the job's room when it was scheduled for one.
+"""
+
+import asyncio
+import contextlib
+from collections import defaultdict
+from typing import Iterator
+
+from loguru import logger
+from psycopg import AsyncConnection
+from pydantic import ValidationError
+
+from api.dal.job_db import JOB_EVENTS_CHANNEL
+from api.models.job_models import JobEvent
+
+RECONNECT_DELAY = 5  # In seconds
+MAX_QUEUED_EVENTS = 100  # Per subscriber, a stream that falls this far behind drops events
+
+
+class JobEventHub:
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue[JobEvent]]] = defaultdict(set)
+        self._room_subscribers: dict[str, set[asyncio.Queue[JobEvent]]] = defaultdict(set)
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, conninfo: str):
+        self._listener = asyncio.create_task(self._listen(conninfo))
+
+    async def stop(self):
+        if not self._listener:
+            return
+
+        self._listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._listener
+        self._listener = None
+
+    def subscribe(
+        self, user_id: str
+    ) -> contextlib.AbstractContextManager[asyncio.Queue[JobEvent]]:
+        """Receive the events of the user's jobs for as long as the block runs."""
+        return self._subscribe(self._subscribers, user_id)
+
+    def subscribe_room(
+        self, room_id: str
+    ) -> contextlib.AbstractContextManager[asyncio.Queue[JobEvent]]:
+        """Receive the events of the room's jobs, the caller checks membership."""
+        return self._subscribe(self._room_subscribers, room_id)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _subscribe(
+        subscribers: dict[str, set[asyncio.Queue[JobEvent]]], key: str
+    ) -> Iterator[asyncio.Queue[JobEvent]]:
+        queue: asyncio.Queue[JobEvent] = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS)
+        subscribers[key].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers[key].discard(queue)
+            if not subscribers[key]:
+                del subscribers[key]
+
+    async def _listen(self, conninfo: str):
+        while True:
+            try:
+                async with await AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"listen {JOB_EVENTS_CHANNEL}")
+                    logger.info("Listening for job events")
+
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Job event listener disconnected, retrying in {}s", RECONNECT_DELAY
+                )
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _dispatch(self, payload: str):
+        try:
+            event = JobEvent.model_validate_json(payload)
+        except ValidationError:
+            logger.warning("Dropping malformed job event {}", payload)
+            return
+
+        if event.user_id:
+            self._publish(self._subscribers, event.user_id, event)
+        if event.room_id:
+            self._publish(self._room_subscribers, event.room_id, event)
+
+    @staticmethod
+    def _publish(
+        subscribers: dict[str, set[asyncio.Queue[JobEvent]]], key: str, event: JobEvent
+    ):
+        for queue in subscribers.get(key, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Job event stream for {} is full, dropping", key)
+
+
+hub = JobEventHub()
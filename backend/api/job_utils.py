@@ -1,55 +1,256 @@
+import asyncio
+import inspect
+import os
+import random
+from contextvars import ContextVar
 from typing import Any, Awaitable, Callable, Dict, Tuple
 
 from fastapi import BackgroundTasks
+from google.cloud.storage import Bucket
 from loguru import logger
+from openai import AsyncOpenAI
 from psycopg.errors import UniqueViolation
 
 from api.dal import job_db
-from api.dependencies import DataContext
+from api.dependencies import DataContext, UnAuthDataContext, get_bucket, get_openai_client
+from api.models.job_models import ClaimedJob, JobHandle, JobStatus
 
 AsyncFunc = Callable[..., Awaitable[Any]]
 IdentifierFn = Callable[[DataContext, Tuple[Any, ...], Dict[str, Any]], str]
+RoomFn = Callable[[DataContext, Tuple[Any, ...], Dict[str, Any]], Awaitable[str | None]]
 
+JOB_LEASE_SECONDS = float(os.getenv("SABQCHA_JOB_LEASE_SECONDS", "120"))
+JOB_RETRY_BASE_DELAY = float(os.getenv("SABQCHA_JOB_RETRY_BASE_DELAY", "30"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("SABQCHA_JOB_RETRY_MAX_DELAY", "900"))
 
-async def _run_and_complete(
-    data_context: DataContext, job_id: str, func: AsyncFunc, /, *args, **kwargs
-):
-    """Run the job func and mark job complete (always tries to complete)."""
+# Run queued jobs in the API process as well, handy when no worker is running locally
+JOB_INLINE = os.getenv("SABQCHA_JOB_INLINE", "false").lower() in ("1", "true")
+
+# Worker params that can't be stored in the job payload, they are rebuilt by the worker
+_INJECTED_DEPENDENCIES: dict[Any, Callable[[], Any]] = {
+    Bucket: get_bucket,
+    AsyncOpenAI: get_openai_client,
+}
+
+_registry: dict[str, AsyncFunc] = {}
+
+# Public id of the job the current task is running, set by the worker
+_current_job_id: ContextVar[str | None] = ContextVar("current_job_id", default=None)
+
+
+def _job_name(worker: AsyncFunc) -> str:
+    return f"{worker.__module__}.{worker.__qualname__}"
+
+
+def _build_payload(
+    signature: inspect.Signature, data_context: DataContext, args: tuple, kwargs: dict
+) -> dict[str, Any]:
+    bound = signature.bind(data_context, *args, **kwargs)
+    params = list(signature.parameters.values())
+
+    payload: dict[str, Any] = {}
+    for param in params[1:]:
+        if param.name not in bound.arguments:
+            continue
+        if param.annotation in _INJECTED_DEPENDENCIES:
+            continue
+        payload[param.name] = bound.arguments[param.name]
+    return payload
+
+
+def _build_kwargs(signature: inspect.Signature, payload: dict[str, Any]) -> dict[str, Any]:
+    kwargs = dict(payload)
+    for param in list(signature.parameters.values())[1:]:
+        provider = _INJECTED_DEPENDENCIES.get(param.annotation)
+        if provider:
+            kwargs[param.name] = provider()
+    return kwargs
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1), JOB_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def _heartbeat(job_id: str, worker_id: str, work: asyncio.Task):
+    """Keep the lease while `work` runs, cancelling it if another worker took the job over."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        try:
+            owned = await job_db.heartbeat_job(
+                UnAuthDataContext(), job_id, worker_id, JOB_LEASE_SECONDS
+            )
+        except Exception:
+            logger.exception("Heartbeat failed for job {}", job_id)
+            continue
+
+        if not owned:
+            logger.warning("Worker {} lost the lease on job {}, cancelling it", worker_id, job_id)
+            work.cancel()
+            return
+
+
+async def run_claimed_job(job: ClaimedJob, worker_id: str):
+    """Run a job leased to this worker and record the outcome (retry with backoff on failure)."""
+    data_context = UnAuthDataContext()
+
+    worker = _registry.get(job.name)
+    if not worker:
+        logger.error("No worker registered for job {} ({})", job.id, job.name)
+        await job_db.fail_job(data_context, job.id, worker_id, "Unknown job name", None)
+        return
+
+    if job.attempts > job.max_attempts:
+        logger.error("Job {} exhausted its {} attempts", job.id, job.max_attempts)
+        await job_db.fail_job(data_context, job.id, worker_id, "Lease expired too many times", None)
+        return
+
+    kwargs = _build_kwargs(inspect.signature(worker), job.payload)
+    user_data_context = DataContext(user_id=job.user_id, role=job.user_role)
+
+    logger.info("Running job {} ({}) attempt {}", job.id, job.name, job.attempts)
+    # Set before creating the task so it runs with the job id in its context
+    token = _current_job_id.set(job.id)
+    work = asyncio.create_task(worker(user_data_context, **kwargs))
+    heartbeat = asyncio.create_task(_heartbeat(job.id, worker_id, work))
     try:
-        await func(data_context, *args, **kwargs)
+        await work
+    except asyncio.CancelledError:
+        if not heartbeat.done():
+            raise
+        # The lease was lost, the worker now owning the job records its outcome
+        logger.warning("Job {} cancelled after losing its lease", job.id)
+    except Exception as e:
+        logger.exception("Background job failed {}", job.id)
+
+        retry_in = _retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+        await job_db.fail_job(data_context, job.id, worker_id, repr(e), retry_in)
+    else:
+        await job_db.complete_job(data_context, job.id, worker_id)
+    finally:
+        _current_job_id.reset(token)
+        heartbeat.cancel()
+
+
+async def report_progress(stage: str, progress: int | None = None):
+    """
+    Record what the running job is doing, `progress` is a percentage.
+    A no-op outside a job, so workers can also be called directly.
+    """
+    job_id = _current_job_id.get()
+    if not job_id:
+        return
+
+    try:
+        await job_db.update_job_progress(UnAuthDataContext(), job_id, stage, progress)
     except Exception:
-        logger.exception("Background job failed {}", job_id)
+        logger.exception("Failed to report progress for job {}", job_id)
+
+
+async def _run_inline(job_id: str):
+    worker_id = f"inline-{os.getpid()}"
+    job = await job_db.claim_job(UnAuthDataContext(), worker_id, JOB_LEASE_SECONDS, job_id)
+    if job:
+        await run_claimed_job(job, worker_id)
+
 
-    await job_db.complete_job(data_context, job_id)
+async def run_worker(worker_id: str, concurrency: int, poll_interval: float, stop: asyncio.Event):
+    """Claim and run queued jobs until `stop` is set, then wait for running jobs."""
+    slots = asyncio.Semaphore(concurrency)
+    running: set[asyncio.Task] = set()
 
+    def _on_done(task: asyncio.Task):
+        running.discard(task)
+        slots.release()
 
-def background_job_decorator(identifier_fn: IdentifierFn):
+    while not stop.is_set():
+        await slots.acquire()
+        if stop.is_set():
+            # Stopped while waiting for a slot, don't start another job
+            slots.release()
+            break
+
+        try:
+            job = await job_db.claim_job(UnAuthDataContext(), worker_id, JOB_LEASE_SECONDS)
+        except Exception:
+            logger.exception("Failed to claim a job")
+            job = None
+
+        if not job:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(run_claimed_job(job, worker_id))
+        running.add(task)
+        task.add_done_callback(_on_done)
+
+    if running:
+        logger.info("Waiting for {} running jobs to finish", len(running))
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+def background_job_decorator(
+    identifier_fn: IdentifierFn, max_attempts: int = 3, room_fn: RoomFn | None = None
+):
     """
     Decorator factory that turns an async worker into a scheduleable function.
     The decorated name becomes a scheduler that you `await` from a route:
       scheduled = await decorated(background_tasks, data_context, *worker_args)
-    If `False` is returned, a job is already in progress.
+    The job is stored in the `job` table and picked up by a worker process (api.worker).
+    Bucket and AsyncOpenAI args are re-injected by the worker, the rest must be JSON.
+    A JobHandle is returned, if an earlier job with the same identifier exists it is
+    returned instead and `in_progress` is False once that job has finished.
+    An earlier job that failed is only queued again when passed `retry_failed=True`.
+    With `room_fn` the job's events also reach the members of the room it returns.
+    Its state can be polled from GET /job/{id}.
     """
 
     def decorator(worker: AsyncFunc):
+        name = _job_name(worker)
+        signature = inspect.signature(worker)
+        _registry[name] = worker
+
         async def schedule(
-            background_tasks: BackgroundTasks, data_context: DataContext, *args, **kwargs
-        ) -> bool:
+            background_tasks: BackgroundTasks,
+            data_context: DataContext,
+            *args,
+            retry_failed: bool = False,
+            **kwargs,
+        ) -> JobHandle:
             identifier = identifier_fn(data_context, args, kwargs)
+            payload = _build_payload(signature, data_context, args, kwargs)
+            room_id = await room_fn(data_context, args, kwargs) if room_fn else None
             try:
-                job_id = await job_db.insert_pending_job(data_context, identifier)
+                job_id = await job_db.insert_pending_job(
+                    data_context, identifier, name, payload, max_attempts, room_id
+                )
             except UniqueViolation:
-                in_progress = await job_db.get_job(data_context, identifier)
-                assert in_progress is not None
+                # Routes are polled by scheduling again, only an explicit retry re-runs a failure
+                job_id = None
+                if retry_failed:
+                    job_id = await job_db.requeue_failed_job(
+                        data_context, identifier, name, payload, max_attempts, room_id
+                    )
+                if not job_id:
+                    in_progress = await job_db.get_job(data_context, identifier)
+                    assert in_progress is not None
 
-                logger.info("Job {} already {}", identifier, in_progress)
-                return in_progress
+                    logger.info("Job {} already {}", identifier, in_progress.status)
+                    return in_progress
 
-            logger.info("Starting job: {}", identifier)
-            background_tasks.add_task(
-                _run_and_complete, data_context, job_id, worker, *args, **kwargs
-            )
-            return True
+                logger.info("Re-queued failed job: {}", identifier)
+                if JOB_INLINE:
+                    background_tasks.add_task(_run_inline, job_id)
+                return JobHandle(id=job_id, status=JobStatus.QUEUED, in_progress=True)
+
+            logger.info("Queued job: {}", identifier)
+            if JOB_INLINE:
+                background_tasks.add_task(_run_inline, job_id)
+            return JobHandle(id=job_id, status=JobStatus.QUEUED, in_progress=True)
 
         # expose original worker if user wants to call it directly
         schedule._worker = worker  # type: ignore
@@ -1,4 +1,3 @@
-import os
 import sys
 import time
 from contextlib import asynccontextmanager
@@ -9,10 +8,11 @@ from loguru import logger
 from psycopg import AsyncCursor
 from psycopg_pool import AsyncConnectionPool
 
-from api import dependencies
-from api.dal import session_db
+from api import dependencies, job_events
+from api.dal import id_map, session_db
 from api.dependencies import get_cursor
 from api.routes import (
+    job_routes,
     leaderboard_routes,
     lecture_routes,
     past_paper_routes,
@@ -37,19 +37,13 @@ logger.add(
 
 
 # Setup PG lifcycle
-dbname = os.getenv("SABQCHA_PG_DB")
-user = os.getenv("SABQCHA_PG_USER")
-password = os.getenv("SABQCHA_PG_PASSWORD")
-host = os.getenv("SABQCHA_PG_HOST")
-port = os.getenv("SABQCHA_PG_PORT")
-
-assert dbname and user and password and host and port
+pg_conninfo = dependencies.get_pg_conninfo()
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     dependencies.pool = AsyncConnectionPool(
-        f"dbname={dbname} user={user} password={password} host={host} port={port}",
+        pg_conninfo,
         min_size=5,
         max_size=10,
         open=False,
@@ -57,8 +51,11 @@ async def lifespan(_: FastAPI):
     await dependencies.pool.open()
     logger.info("PG Pool initialized")
 
+    await job_events.hub.start(pg_conninfo)
+
     yield
 
+    await job_events.hub.stop()
     await dependencies.pool.close()
     dependencies.pool = None
     logger.info("PG Pool closed")
@@ -94,9 +91,14 @@ async def auth_middleware(request: Request, call_next):
         raise HTTPException(500, detail="PG Pool not initialized in auth middleware")
 
     session_id = token.split(" ")[1]
-    async with dependencies.pool.connection() as conn:
-        async with conn.cursor() as cur:
-            auth_data = await session_db.get_session(cur, session_id)
+    auth_data = session_db.get_cached_session(session_id)
+    if not auth_data:
+        async with dependencies.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                auth_data = await session_db.get_session(cur, session_id)
+        # Cached only here, where the session is read outside any write transaction
+        if auth_data:
+            session_db.cache_session(session_id, auth_data)
 
     if not auth_data:
         raise HTTPException(401, detail="Unauthorized")
@@ -106,6 +108,13 @@ async def auth_middleware(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def id_map_middleware(request: Request, call_next):
+    # Each request gets its own identity map for public_id -> row_id lookups
+    with id_map.request_scope():
+        return await call_next(request)
+
+
 # Middleware to log requests and response times
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -136,6 +145,7 @@ app.include_router(room_routes.router)
 app.include_router(task_routes.router)
 app.include_router(quiz_routes.router)
 app.include_router(past_paper_routes.router)
+app.include_router(job_routes.router)
 
 
 @app.get("/health-check")
@@ -150,3 +160,11 @@ async def health_check_pg(cur: AsyncCursor = Depends(get_cursor)):
     logger.info("PG Version: {}", v)
 
     return "PG works!"
+
+
+@app.get("/health-check-cache")
+async def health_check_cache():
+    return {
+        "session": session_db.session_cache_stats(),
+        "id_map": id_map.id_map_cache_stats(),
+    }
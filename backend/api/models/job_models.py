@@ -0,0 +1,51 @@
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from api.models.user_models import UserRole
+
+
+class JobStatus(StrEnum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
+class ClaimedJob(BaseModel):
+    id: str
+    name: str
+    payload: dict
+    user_id: str
+    user_role: UserRole
+    attempts: int
+    max_attempts: int
+
+
+class JobHandle(BaseModel):
+    id: str
+    status: JobStatus
+    in_progress: bool
+
+
+class JobState(BaseModel):
+    id: str
+    status: JobStatus
+    stage: str | None
+    progress: int
+    attempts: int
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
+    updated_at: datetime
+
+
+class JobEvent(BaseModel):
+    id: str
+    user_id: str | None
+    room_id: str | None = None
+    status: JobStatus
+    stage: str | None
+    progress: int
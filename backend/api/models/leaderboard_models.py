@@ -0,0 +1,15 @@
+from enum import StrEnum
+
+from api.models.user_models import StudentUser
+
+
+class RankMode(StrEnum):
+    # 1, 2, 2, 4
+    COMPETITION = "COMPETITION"
+    # 1, 2, 2, 3
+    DENSE = "DENSE"
+
+
+class LeaderboardEntry(StudentUser):
+    rank: int
+    current_user: bool
@@ -11,6 +11,18 @@ class Lecture(BaseModel):
     room_id: str
     file_path: str
     title: str
+    transcribed_content: str | None = None
+
+
+class LectureGroupDigest(BaseModel):
+    """
+    A lecture group's content version, and its digest if written for that version.
+    `transcriptions` are the group's transcripts as of that version, read with it.
+    """
+
+    content_version: int
+    digest: str | None = None
+    transcriptions: list[str] = []
 
 
 class LectureEntryRes(BaseModel):
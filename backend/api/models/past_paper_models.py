@@ -1,3 +1,5 @@
+from enum import StrEnum
+
 from pydantic import BaseModel
 
 
@@ -10,3 +12,19 @@ class PastPaper(BaseModel):
     variant: int
     question_file_path: str
     marking_scheme_file_path: str
+
+
+class PastPaperAssetKind(StrEnum):
+    QUESTION = "QUESTION"
+    MARKING_SCHEME = "MARKING_SCHEME"
+
+
+class PastPaperAsset(BaseModel):
+    kind: PastPaperAssetKind
+    page: int
+    data: bytes
+    width: int
+    height: int
+    source_width: int
+    source_height: int
+    source_bytes: int | None
@@ -20,6 +20,12 @@ class StudentSolution(BaseModel):
     solution_path: str
 
 
+class GradingProgress(BaseModel):
+    quiz_id: str
+    total: int
+    graded: int
+
+
 class LLM_CONTENT_EXTRACT_TYPE(StrEnum):
     RUBRIC = "RUBRIC"
     MARKING_SCHEME = "MARKING_SCHEME"
@@ -48,6 +48,18 @@ class TaskSetRes(BaseModel):
     attempts: list[TaskSetAttemptRes]
 
 
+class TaskSetAnalysisInput(BaseModel):
+    """One student's attempts on a task set, with its answer key and lecture transcripts."""
+
+    task_set_id: str
+    lecture_group_id: str
+    tasks: list[Task]
+    attempts: list[list[TaskAttempted]]
+    transcriptions: list[str]
+    content_version: int
+    digest: str | None = None
+
+
 class ListTaskSetAttemptsRes(BaseModel):
     room_id: str
     room_display_name: str
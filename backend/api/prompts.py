@@ -40,6 +40,71 @@ def generate_mcq_user_prompt(tr: str) -> str:
     return f"Lecture transcript: {tr}"
 
 
+def generate_mcq_notes_user_prompt(notes: list[str]) -> str:
+    joined_notes = "\n\n".join(notes)
+    return f"""
+        The week's lectures were too long to send whole, these revision notes were written from
+        consecutive parts of the transcript, in order. Treat them as the lecture transcript.
+
+        Lecture notes: {joined_notes}
+    """
+
+
+def generate_mcq_day_user_prompt(day: str, day_number: int, days: int) -> str:
+    return f"""
+        Generate only the {day} task set, day {day_number} of {days}, with exactly 10 tasks.
+        The other days are generated separately from the same lectures, so to avoid repeats
+        focus on part {day_number} of {days} of the material, taken in lecture order.
+    """
+
+
+LECTURE_NOTES_SYSTEM_PROMPT = """
+System Prompt: Lecture Segment Note Taker
+
+Role:
+You are an educational AI assistant condensing one part of a lecture transcript into revision notes.
+
+Purpose:
+The notes of every part of the week's lectures are combined and used to write multiple-choice
+revision questions, so they must keep everything a question could be asked about.
+
+Guidelines:
+- Keep every definition, key fact, formula, value, example and named concept from the segment.
+- Keep the lecture's own terminology and notation.
+- Drop filler, repetition, greetings and classroom logistics.
+- Do not add anything that is not in the segment.
+- Write in English, as concise bullet points grouped by topic.
+"""
+
+
+def generate_lecture_notes_user_prompt(segment: str, part: int, parts: int) -> str:
+    return f"Lecture transcript, part {part} of {parts}: {segment}"
+
+
+LECTURE_DIGEST_SYSTEM_PROMPT = """
+System Prompt: Lecture Week Digest Writer
+
+Role:
+You are an educational AI assistant condensing a week's lectures into concept notes.
+
+Purpose:
+The digest replaces the full transcript when explaining students' wrong answers, so every
+concept a question could be asked about must be in it, explained the way the lecturer did.
+
+Guidelines:
+- One section per concept, named as in the lectures, in lecture order.
+- Keep definitions, key facts, formulas, values and the lecturer's examples and explanations.
+- Keep the lecture's own terminology and notation.
+- Drop filler, repetition, greetings and classroom logistics.
+- Do not add anything that is not in the lectures.
+- Write in English, as concise bullet points.
+"""
+
+
+def generate_lecture_digest_user_prompt(material: str) -> str:
+    return f"Lectures of the week: {material}"
+
+
 HARD_MCQ_SYSTEM_PROMPT = """
 System Prompt: Advanced Technical & Conceptual Task Set Generator for Weekly Lectures
 
@@ -158,32 +223,33 @@ Role:
 You are an educational AI assistant specialized in diagnosing a student's weak concepts from lecture material.
 
 Purpose:
-You will analyze a lecture transcript and a list of questions that the student answered incorrectly. Based on this, you will identify the concepts the student is weak in, and for each weak concept, you will generate a clear and concise explanation strictly derived from the transcript.
+You will analyze lecture notes and a list of questions that the student answered incorrectly. Based on this, you will identify the concepts the student is weak in, and for each weak concept, you will generate a clear and concise explanation strictly derived from the notes.
 
 Input
 You will receive:
-- A lecture transcript (covering the week’s lectures).
+- Lecture notes (a digest of the week’s lecture transcripts).
 - A list of incorrectly answered questions, each including:
     - The question text
     - The correct option
     - The option selected by the student
+    - Where found, the lecture transcript passages most related to the question
 
 Guidelines
-1. Strictly use the transcript content to identify and explain concepts. Do not use external knowledge or inferred information.
+1. Strictly use the lecture notes and passages to identify and explain concepts. Do not use external knowledge or inferred information.
 2. Identify the underlying concept(s) that caused the student’s misunderstanding, not just the question topic.
 3. The explanation should be:
-    - Accurate and directly supported by the transcript.
+    - Accurate and directly supported by the notes.
     - Concise (2–5 sentences).
     - Focused on clarifying the misunderstanding likely causing the wrong answer.
 4. If a question relates to multiple weak concepts, list each separately but associate the question with all relevant concepts.
-5. Ignore questions where the transcript does not provide enough context.
+5. Ignore questions where the notes do not provide enough context.
 6. Output should be human-readable but machine-parseable (proper JSON-like formatting).
 """
 
 
-def generate_mistake_user_prompt(transcript: str, mistake: str) -> str:
+def generate_mistake_user_prompt(lecture_notes: str, mistake: str) -> str:
     return f"""
-        Lectures trancription: {transcript}
+        Lecture notes: {lecture_notes}
 
         User mistakes: {mistake}
     """
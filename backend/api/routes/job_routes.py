@@ -0,0 +1,112 @@
+import asyncio
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api import job_events
+from api.dal import job_db, room_db
+from api.dependencies import DataContext, get_data_context
+from api.models.job_models import JobEvent, JobState, JobStatus
+
+router = APIRouter(prefix="/job")
+
+# Comment lines keep proxies from closing idle streams
+SSE_KEEPALIVE_SECONDS = 15
+
+_FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+def _sse(event: JobEvent) -> str:
+    return f"event: job\ndata: {event.model_dump_json(exclude={'user_id'})}\n\n"
+
+
+@router.get("/events")
+async def stream_job_events(
+    job_id: str | None = None, data_context: DataContext = Depends(get_data_context)
+):
+    """
+    Server-sent events for the current user's jobs, replacing polling.
+    With `job_id` the stream starts with the job's current state and ends once it finishes.
+    """
+    if job_id and not await job_db.get_job_state(data_context, job_id):
+        raise HTTPException(404, detail="Job not found")
+
+    async def _events():
+        with job_events.hub.subscribe(data_context.user_id) as queue:
+            if job_id:
+                # Read after subscribing so a change in between isn't missed
+                job = await job_db.get_job_state(data_context, job_id)
+                assert job
+
+                yield _sse(
+                    JobEvent(
+                        id=job.id,
+                        user_id=data_context.user_id,
+                        status=job.status,
+                        stage=job.stage,
+                        progress=job.progress,
+                    )
+                )
+                if job.status in _FINISHED:
+                    return
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if job_id and event.id != job_id:
+                    continue
+
+                yield _sse(event)
+                if job_id and event.status in _FINISHED:
+                    return
+
+    return _event_stream(_events())
+
+
+@router.get("/events/room/{room_id}")
+async def stream_room_job_events(
+    room_id: str, data_context: DataContext = Depends(get_data_context)
+):
+    """
+    Server-sent events for the jobs scheduled for a room, such as the lecture transcription
+    its students are waiting on. Open to the room's students and its teacher.
+    """
+    if not await room_db.is_room_member(
+        data_context, data_context.user_id, data_context.user_role, room_id
+    ):
+        raise HTTPException(404, detail="Room not found")
+
+    async def _events():
+        with job_events.hub.subscribe_room(room_id) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield _sse(event)
+
+    return _event_stream(_events())
+
+
+def _event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}", response_model=JobState)
+async def get_job(job_id: str, data_context: DataContext = Depends(get_data_context)):
+    job = await job_db.get_job_state(data_context, job_id)
+    if not job:
+        raise HTTPException(404, detail="Job not found")
+
+    return JSONResponse(job.model_dump(mode="json"))
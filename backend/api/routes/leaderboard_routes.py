@@ -1,20 +1,50 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 
 from api.dal import leaderboard_db
 from api.dependencies import DataContext, get_data_context
+from api.models.leaderboard_models import RankMode
 
 router = APIRouter(prefix="/leaderboard")
 
 
+def _parse_cursor(cursor: str | None) -> tuple[int, str] | None:
+    if not cursor:
+        return None
+
+    score, _, user_id = cursor.partition(":")
+    if not score.lstrip("-").isdigit() or not user_id:
+        raise HTTPException(400, detail="Invalid cursor")
+    return int(score), user_id
+
+
 @router.get("/{room_id}")
-async def get_leaderboard(room_id: str, data_context: DataContext = Depends(get_data_context)):
-    students = await leaderboard_db.list_students_with_scores(data_context, room_id)
-    students = sorted(students, key=lambda u: u.score, reverse=True)
+async def get_leaderboard(
+    room_id: str,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    rank_mode: RankMode = RankMode.COMPETITION,
+    data_context: DataContext = Depends(get_data_context),
+):
+    students = await leaderboard_db.list_ranked_students(
+        data_context, room_id, limit=limit, after=_parse_cursor(cursor), rank_mode=rank_mode
+    )
+
+    res = JSONResponse(content=[s.model_dump(mode="json") for s in students])
+    if limit and len(students) == limit:
+        last = students[-1]
+        res.headers["X-Next-Cursor"] = f"{last.score}:{last.id}"
+    return res
 
-    res = [
-        {**ud.model_dump(mode="json"), "rank": rank, "current_user": data_context.user_id == ud.id}
-        for rank, ud in enumerate(students, start=1)
-    ]
 
-    return JSONResponse(content=res)
+@router.get("/{room_id}/me")
+async def get_leaderboard_around_me(
+    room_id: str,
+    neighbours: int = Query(5, ge=0, le=50),
+    rank_mode: RankMode = RankMode.COMPETITION,
+    data_context: DataContext = Depends(get_data_context),
+):
+    students = await leaderboard_db.list_ranked_students_around_user(
+        data_context, room_id, neighbours=neighbours, rank_mode=rank_mode
+    )
+    return JSONResponse(content=[s.model_dump(mode="json") for s in students])
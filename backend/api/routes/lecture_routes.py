@@ -1,4 +1,4 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from google.cloud.storage import Bucket
 from openai import AsyncOpenAI
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from api.controllers import transcribe_controller
 from api.dal import lecture_db, room_db
 from api.dependencies import DataContext, get_bucket, get_data_context, get_openai_client
+from api.models.job_models import JobStatus
 from api.models.lecture_models import LectureWeekRes, ListLecturesRes
 from api.models.user_models import UserRole
 
@@ -26,31 +27,46 @@ async def create_lecture(
 ):
     assert data_context.user_role == UserRole.TEACHER
 
-    lecture_group_id = await lecture_db.get_this_week_lecture_group(data_context, body.room_id)
-    await lecture_db.insert_lecture(data_context, lecture_group_id, body.file_path, body.title)
+    async with data_context.transaction():
+        lecture_group_id = await lecture_db.get_this_week_lecture_group(
+            data_context, body.room_id
+        )
+        await lecture_db.insert_lecture(
+            data_context, lecture_group_id, body.file_path, body.title
+        )
 
 
 @router.post("/group/{lecture_group_id}")
 async def transcribe_lecture_group(
     lecture_group_id: str,
     background_tasks: BackgroundTasks,
+    retry: bool = False,
     openai_client: AsyncOpenAI = Depends(get_openai_client),
     bucket: Bucket = Depends(get_bucket),
     data_context: DataContext = Depends(get_data_context),
 ):
-    in_progress = await transcribe_controller.transcribe(
-        background_tasks, data_context, bucket, openai_client, lecture_group_id=lecture_group_id
+    job = await transcribe_controller.transcribe(
+        background_tasks,
+        data_context,
+        bucket,
+        openai_client,
+        lecture_group_id=lecture_group_id,
+        retry_failed=retry,
     )
-    if in_progress:
-        return JSONResponse({"message": "Tasks are being generated..."})
-    return JSONResponse({"message": "Tasks generated, please refresh page"})
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(500, detail={"message": "Task generation failed", "job_id": job.id})
+
+    if job.in_progress:
+        return JSONResponse({"message": "Tasks are being generated...", "job_id": job.id})
+    return JSONResponse({"message": "Tasks generated, please refresh page", "job_id": job.id})
 
 
 @router.get("/room/{room_id}", response_model=ListLecturesRes)
 async def list_lectures(room_id: str, data_context: DataContext = Depends(get_data_context)):
-    this_week, pas_weeks = await lecture_db.list_lectures_ui(data_context, room_id)
-    room = await room_db.get_room(data_context, room_id)
-    assert room
+    async with data_context.transaction():
+        this_week, pas_weeks = await lecture_db.list_lectures_ui(data_context, room_id)
+        room = await room_db.get_room(data_context, room_id)
+        assert room
 
     res = ListLecturesRes(
         room=room,
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from api.controllers import grade_controller
 from api.dal import past_paper_db
 from api.dependencies import DataContext, get_bucket, get_data_context, get_openai_client
+from api.models.job_models import JobStatus
 from api.models.past_paper_models import PastPaper
 from api.models.user_models import UserRole
 
@@ -15,7 +16,11 @@ router = APIRouter(prefix="/past-paper")
 
 @router.get("/room/{room_id}/random", response_model=PastPaper)
 async def get_random_past_paper(
-    room_id: str, data_context: DataContext = Depends(get_data_context)
+    room_id: str,
+    year: int | None = None,
+    season: str | None = None,
+    paper: int | None = None,
+    data_context: DataContext = Depends(get_data_context),
 ):
     assert data_context.user_role == UserRole.STUDENT
 
@@ -23,10 +28,18 @@ async def get_random_past_paper(
     if not subject_id:
         raise HTTPException(status_code=400, detail="No subject found for this room")
 
-    paper = await past_paper_db.get_random_past_paper(data_context, subject_id)
-    assert paper
+    past_paper = await past_paper_db.get_random_past_paper(
+        data_context,
+        subject_id,
+        user_id=data_context.user_id,
+        year=year,
+        season=season,
+        paper=paper,
+    )
+    if not past_paper:
+        raise HTTPException(status_code=404, detail="No past paper matches the filters")
 
-    return JSONResponse(paper.model_dump(mode="json"))
+    return JSONResponse(past_paper.model_dump(mode="json"))
 
 
 class GradeSolutionBody(BaseModel):
@@ -35,6 +48,7 @@ class GradeSolutionBody(BaseModel):
 
 class GradeSolutionResponse(BaseModel):
     comment: str
+    job_id: str
 
 
 @router.post("/bank/{past_paper_id}", response_model=GradeSolutionResponse)
@@ -42,11 +56,12 @@ async def grade_solution(
     past_paper_id: str,
     body: GradeSolutionBody,
     background_tasks: BackgroundTasks,
+    retry: bool = False,
     bucket: Bucket = Depends(get_bucket),
     openai_client: AsyncOpenAI = Depends(get_openai_client),
     data_context: DataContext = Depends(get_data_context),
 ):
-    in_progress = await grade_controller.grade_question(
+    job = await grade_controller.grade_question(
         background_tasks,
         data_context,
         bucket,
@@ -54,12 +69,16 @@ async def grade_solution(
         past_paper_id=past_paper_id,
         solution_file_path=body.solution_file_path,
         user_id=data_context.user_id,
+        retry_failed=retry,
     )
-    if in_progress:
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(500, detail={"message": "Grading failed", "job_id": job.id})
+
+    if job.in_progress:
         return JSONResponse(
-            GradeSolutionResponse(comment="Task in progress, submit again in a min").model_dump(
-                mode="json"
-            )
+            GradeSolutionResponse(
+                comment="Task in progress, submit again in a min", job_id=job.id
+            ).model_dump(mode="json")
         )
 
     comment = await past_paper_db.get_student_graded_solution(
@@ -68,4 +87,6 @@ async def grade_solution(
     assert comment
 
     # TODO: Fetch solution and return
-    return JSONResponse(GradeSolutionResponse(comment=comment).model_dump(mode="json"))
+    return JSONResponse(
+        GradeSolutionResponse(comment=comment, job_id=job.id).model_dump(mode="json")
+    )
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from api.controllers import transcribe_controller
 from api.dal import quiz_db
 from api.dependencies import DataContext, get_bucket, get_data_context, get_openai_client
+from api.models.job_models import JobStatus
 from api.models.user_models import UserRole
 
 from ..controllers import grade_controller
@@ -44,11 +45,11 @@ async def create_quiz(
         rubric_path=body.rubric_path,
     )
 
-    await transcribe_controller.transcribe_quiz(
+    job = await transcribe_controller.transcribe_quiz(
         background_tasks, data_context, bucket, openai_client, quiz_id=quiz_id
     )
 
-    return JSONResponse({"id": quiz_id})
+    return JSONResponse({"id": quiz_id, "job_id": job.id})
 
 
 @router.get("/room/{room_id}")
@@ -91,26 +92,40 @@ async def list_solutions(
 async def grade_quiz(
     quiz_id: str,
     background_tasks: BackgroundTasks,
+    retry: bool = False,
     bucket: Bucket = Depends(get_bucket),
     openai_client: AsyncOpenAI = Depends(get_openai_client),
     data_context: DataContext = Depends(get_data_context),
 ):
     assert data_context.user_role == UserRole.TEACHER
 
-    all_solutions = await quiz_db.list_student_solutions_for_quiz(data_context, quiz_id=quiz_id)
-    all_solutions_ids = [si.id for si in all_solutions]
+    ungraded_solutions = await quiz_db.list_student_solutions(
+        data_context, quiz_id=quiz_id, ungraded_only=True
+    )
+    if not ungraded_solutions:
+        return JSONResponse({"status": "graded"})
+
+    job = await grade_controller.grade_quiz_solutions(
+        background_tasks,
+        data_context,
+        bucket,
+        openai_client,
+        quiz_id=quiz_id,
+        solution_ids=[s.id for s in ungraded_solutions],
+        retry_failed=retry,
+    )
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(500, detail={"message": "Quiz grading failed", "job_id": job.id})
 
-    for solution_id in all_solutions_ids:
-        await grade_controller.grade_quiz(
-            background_tasks,
-            data_context,
-            bucket,
-            openai_client,
-            quiz_id=quiz_id,
-            solution_id=solution_id,
-        )
+    return JSONResponse({"status": "scheduled", "job_id": job.id})
+
+
+@router.get("/{quiz_id}/grade")
+async def get_grading_progress(quiz_id: str, data_context: DataContext = Depends(get_data_context)):
+    assert data_context.user_role == UserRole.TEACHER
 
-    return JSONResponse({"status": "scheduled"})
+    progress = await quiz_db.get_grading_progress(data_context, quiz_id)
+    return JSONResponse(progress.model_dump(mode="json"))
 
 
 @router.get("/solution/{solution_id}")
@@ -35,18 +35,22 @@ async def join_room(
     data_context: DataContext = Depends(get_data_context),
 ):
     assert data_context.user_role == UserRole.STUDENT
-    room_id = await room_db.get_room_for_invite_code(data_context, body.invite_code)
-    if not room_id:
-        raise HTTPException(400, "Invite code invalid")
+    async with data_context.transaction():
+        room_id = await room_db.get_room_for_invite_code(data_context, body.invite_code)
+        if not room_id:
+            raise HTTPException(400, "Invite code invalid")
 
-    await room_db.join_room(data_context, room_id, data_context.user_id)
+        await room_db.join_room(data_context, room_id, data_context.user_id)
 
 
 @router.get("", response_model=DashboardResponse)
 async def list_rooms(data_context: DataContext = Depends(get_data_context)):
-    user = await user_db.get_user(data_context, data_context.user_id)
-    assert user
-    rooms = await room_db.list_rooms(data_context, data_context.user_id, data_context.user_role)
+    async with data_context.transaction():
+        user = await user_db.get_user(data_context, data_context.user_id)
+        assert user
+        rooms = await room_db.list_rooms(
+            data_context, data_context.user_id, data_context.user_role
+        )
 
     return JSONResponse(
         DashboardResponse(
@@ -59,12 +63,15 @@ async def list_rooms(data_context: DataContext = Depends(get_data_context)):
 async def list_attempts(room_id: str, data_context: DataContext = Depends(get_data_context)):
     assert data_context.user_role == UserRole.STUDENT
 
-    room = await room_db.get_student_room(data_context, data_context.user_id, room_id)
-    assert room
-    if not room.score:
-        room.score = 0
+    async with data_context.transaction():
+        room = await room_db.get_student_room(data_context, data_context.user_id, room_id)
+        assert room
+        if not room.score:
+            room.score = 0
 
-    task_sets = await task_db.list_task_sets_for_room(data_context, data_context.user_id, room_id)
+        task_sets = await task_db.list_task_sets_for_room(
+            data_context, data_context.user_id, room_id
+        )
     res = ListTaskSetAttemptsRes(
         score=room.score, room_display_name=room.display_name, room_id=room.id, task_sets=task_sets
     )
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from loguru import logger
 from openai import AsyncOpenAI
 from pydantic import BaseModel
 
+from api.controllers import transcribe_controller
 from api.dal import lecture_db, room_db, task_db
 from api.dependencies import DataContext, get_data_context, get_openai_client
 from api.exceptions import OpenAiApiError
-from api.job_utils import background_job_decorator
-from api.models.task_models import TaskAttempted, TaskSetRes
+from api.job_utils import background_job_decorator, report_progress
+from api.models.job_models import JobStatus
+from api.models.lecture_models import LectureGroupDigest
+from api.models.task_models import Task, TaskAttempted
 from api.models.user_models import UserRole
 from api.prompts import (
     MISTAKE_ANALYSIS_SYSTEM_PROMPT,
@@ -19,6 +22,13 @@ from api.prompts import (
 
 router = APIRouter(prefix="/task")
 
+# Transcript passages sent with each wrong answer in the mistake analysis
+MISTAKE_PASSAGES_PER_QUESTION = 3
+
+
+class MistakeAnalysisRes(MistakeAnalysisLlmRes):
+    job_id: str
+
 
 class SubmitTaskBody(BaseModel):
     tasks: list[TaskAttempted]
@@ -31,41 +41,42 @@ async def submit_task_set(
 ):
     assert data_context.user_role == UserRole.STUDENT
 
-    mcqs = await task_db.get_task_set(data_context, task_set_id)
-    assert mcqs
-
-    correct = 0
-    incorrect = 0
-    skip = 0
-    score = 0
+    async with data_context.transaction():
+        mcqs = await task_db.get_task_set(data_context, task_set_id)
+        assert mcqs
 
-    for mcq, mcq_attempt in zip(mcqs.tasks, body.tasks):
-        if mcq_attempt.did_skip:
-            skip += 1
-            continue
+        correct = 0
+        incorrect = 0
+        skip = 0
+        score = 0
 
-        if mcq_attempt.answer != mcq.answer:
-            incorrect += 1
-            score -= 1
-        else:
-            correct += 1
-            score += 3
-
-    score = max(score, 0)
+        for mcq, mcq_attempt in zip(mcqs.tasks, body.tasks):
+            if mcq_attempt.did_skip:
+                skip += 1
+                continue
 
-    room_id = await room_db.get_room_for_task_set(data_context, task_set_id)
-    assert room_id
-    await room_db.update_user_score(data_context, data_context.user_id, room_id, score)
-    await task_db.insert_attempt(
-        data_context,
-        data_context.user_id,
-        task_set_id,
-        body.tasks,
-        correct,
-        incorrect,
-        skip,
-        body.time_elapsed,
-    )
+            if mcq_attempt.answer != mcq.answer:
+                incorrect += 1
+                score -= 1
+            else:
+                correct += 1
+                score += 3
+
+        score = max(score, 0)
+
+        room_id = await room_db.get_room_for_task_set(data_context, task_set_id)
+        assert room_id
+        await room_db.update_user_score(data_context, data_context.user_id, room_id, score)
+        await task_db.insert_attempt(
+            data_context,
+            data_context.user_id,
+            task_set_id,
+            body.tasks,
+            correct,
+            incorrect,
+            skip,
+            body.time_elapsed,
+        )
 
 
 in_progres_res = MistakeAnalysisLlmRes(
@@ -78,24 +89,32 @@ in_progres_res = MistakeAnalysisLlmRes(
 ).model_dump(mode="json")
 
 
-@router.post("/set/{task_set_id}/analyze", response_model=MistakeAnalysisLlmRes)
+@router.post("/set/{task_set_id}/analyze", response_model=MistakeAnalysisRes)
 async def analyze_task_set(
     task_set_id: str,
     background_tasks: BackgroundTasks,
+    retry: bool = False,
     data_context: DataContext = Depends(get_data_context),
     openai_client: AsyncOpenAI = Depends(get_openai_client),
 ):
-    in_progress = await _do_analysis(
-        background_tasks, data_context, openai_client=openai_client, task_set_id=task_set_id
+    job = await _do_analysis(
+        background_tasks,
+        data_context,
+        openai_client=openai_client,
+        task_set_id=task_set_id,
+        retry_failed=retry,
     )
-    if not in_progress:
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(500, detail={"message": "Mistake analysis failed", "job_id": job.id})
+
+    if not job.in_progress:
         recent_analysis = await task_db.get_recent_mistake_analysis(
             data_context, data_context.user_id, task_set_id
         )
         assert recent_analysis
-        return JSONResponse(recent_analysis)
+        return JSONResponse({**recent_analysis, "job_id": job.id})
 
-    return JSONResponse(in_progres_res)
+    return JSONResponse({**in_progres_res, "job_id": job.id})
 
 
 def _job_identifier(data_context: DataContext, _: tuple, kwargs: dict) -> str:
@@ -106,47 +125,62 @@ def _job_identifier(data_context: DataContext, _: tuple, kwargs: dict) -> str:
 
 @background_job_decorator(_job_identifier)
 async def _do_analysis(data_context: DataContext, openai_client: AsyncOpenAI, task_set_id: str):
-    room_id = await task_db.get_room_id_for_task_set(data_context, task_set_id)
-    assert room_id
-    all_task_sets = await task_db.list_task_sets_for_room(
-        data_context, data_context.user_id, room_id
+    analysis_input = await task_db.get_task_set_analysis_input(
+        data_context, data_context.user_id, task_set_id
     )
+    assert analysis_input
 
-    task_set_attempts: TaskSetRes | None = None
-    for ts in all_task_sets:
-        if ts.id == task_set_id:
-            task_set_attempts = ts
-            break
-    assert task_set_attempts
-
-    task_set = await task_db.get_task_set(data_context, task_set_id)
-    assert task_set
-
-    mistake_str = ""
-    for attempt in task_set_attempts.attempts:
-        for at, task in zip(attempt.user_attempts, task_set.tasks):
+    mistakes: list[tuple[Task, str]] = []
+    for user_attempts in analysis_input.attempts:
+        for at, task in zip(user_attempts, analysis_input.tasks):
             if at.did_skip:
                 continue
 
             if at.answer != task.answer:
-                mistake_str += f"""
-                    Question: {task.question}
-                    User Answer: {at.answer}
-                    Correct Answer: {task.answer}
-                """
+                mistakes.append((task, at.answer))
 
-    lecture_group_id = await lecture_db.get_lecture_group_for_task_set(data_context, task_set_id)
-    assert lecture_group_id
+    # Passages are looked up once per question, even if it was missed in several attempts
+    mistaken_tasks = list({task.id: task for task, _ in mistakes}.values())
+    passages = await lecture_db.search_lecture_passages(
+        data_context,
+        analysis_input.lecture_group_id,
+        [f"{task.question} {_correct_option(task)}" for task in mistaken_tasks],
+        MISTAKE_PASSAGES_PER_QUESTION,
+    )
+    task_passages = {task.id: p for task, p in zip(mistaken_tasks, passages)}
+    logger.info(
+        "Found lecture passages for {} of {} mistaken questions",
+        sum(1 for p in passages if p),
+        len(mistaken_tasks),
+    )
 
-    transcriptions = await lecture_db.get_transcriptions_for_lecture_group(
-        data_context, lecture_group_id
+    mistake_str = ""
+    for task, answer in mistakes:
+        mistake_str += f"""
+            Question: {task.question}
+            User Answer: {answer}
+            Correct Answer: {task.answer}
+        """
+        for passage in task_passages.pop(task.id, []):
+            mistake_str += f"    Lecture passage: {passage}\n"
+
+    if not analysis_input.digest:
+        await report_progress("writing lecture digest", 20)
+    lecture_notes = await transcribe_controller.get_lecture_group_digest(
+        data_context,
+        openai_client,
+        analysis_input.lecture_group_id,
+        LectureGroupDigest(
+            content_version=analysis_input.content_version, digest=analysis_input.digest
+        ),
+        analysis_input.transcriptions,
     )
-    combined_transcript = " ".join(transcriptions)
 
+    await report_progress("analyzing mistakes", 50)
     logger.info(
-        "Calling llm to analyze mistakes for transcript: {} ... {}",
-        combined_transcript[:10],
-        combined_transcript[-10:],
+        "Calling llm to analyze mistakes for lecture group {}, {} words of notes",
+        analysis_input.lecture_group_id,
+        len(lecture_notes.split()),
     )
 
     openai_res = await openai_client.responses.parse(
@@ -155,7 +189,7 @@ async def _do_analysis(data_context: DataContext, openai_client: AsyncOpenAI, ta
             {"role": "system", "content": MISTAKE_ANALYSIS_SYSTEM_PROMPT},
             {
                 "role": "user",
-                "content": generate_mistake_user_prompt(combined_transcript, mistake_str),
+                "content": generate_mistake_user_prompt(lecture_notes, mistake_str),
             },
         ],
         text_format=MistakeAnalysisLlmRes,
@@ -175,6 +209,17 @@ async def _do_analysis(data_context: DataContext, openai_client: AsyncOpenAI, ta
     await task_db.insert_analysis(data_context, data_context.user_id, task_set_id, res)
 
 
+def _correct_option(task: Task) -> str:
+    """The correct option's text, the answer can also be given as its letter."""
+    if task.answer in task.options:
+        return task.answer
+
+    letter = task.answer.strip().rstrip(").").upper()
+    if len(letter) == 1 and 0 <= ord(letter) - ord("A") < len(task.options):
+        return task.options[ord(letter) - ord("A")]
+    return ""
+
+
 @router.get("/set/{task_set_id}")
 async def get_task_set(task_set_id: str, data_context: DataContext = Depends(get_data_context)):
     task_set = await task_db.get_task_set(data_context, task_set_id)
@@ -0,0 +1,161 @@
+import asyncio
+import random
+import time
+from pathlib import Path
+
+import httpx
+from loguru import logger
+
+from api.exceptions import UpliftAiApiError
+
+UPLIFT_BASE_URL = "https://api.upliftai.org/v1"
+
+
+class _RateLimiter:
+    """Spaces out request starts so at most `requests_per_second` begin each second."""
+
+    def __init__(self, requests_per_second: float) -> None:
+        self._interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self._interval:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class UpliftSttClient:
+    """
+    Async Uplift speech-to-text client with a persistent connection pool,
+    a bound on in-flight requests, a requests-per-second limit and retries.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None,
+        *,
+        max_in_flight: int = 8,
+        requests_per_second: float = 4,
+        max_retries: int = 3,
+        retry_base_delay: float = 1.0,
+        timeout: float = 120,
+    ) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=UPLIFT_BASE_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_in_flight, max_keepalive_connections=max_in_flight
+            ),
+        )
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._rate_limiter = _RateLimiter(requests_per_second)
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+
+        self.requests = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    async def transcribe(self, file_path: str, language: str = "ur") -> str:
+        audio = await asyncio.to_thread(Path(file_path).read_bytes)
+
+        for attempt in range(self._max_retries + 1):
+            retry_after: float | None = None
+            try:
+                return await self._post(audio, language)
+            except httpx.TransportError as e:
+                logger.warning("Uplift transport error on {}: {}", file_path, e)
+            except _RetryableError as e:
+                logger.warning("Uplift returned {} on {}", e.status_code, file_path)
+                retry_after = e.retry_after
+
+            if attempt == self._max_retries:
+                break
+
+            self.retries += 1
+            delay = retry_after or self._retry_base_delay * 2**attempt * random.uniform(0.8, 1.2)
+            await asyncio.sleep(delay)
+
+        self.failed += 1
+        raise UpliftAiApiError(f"Uplift API failed after {self._max_retries + 1} attempts")
+
+    async def _post(self, audio: bytes, language: str) -> str:
+        async with self._in_flight:
+            # Taken once a request can actually start, so queued requests can't burst
+            await self._rate_limiter.acquire()
+
+            self.requests += 1
+            self.bytes_sent += len(audio)
+
+            start_time = time.perf_counter()
+            response = await self._client.post(
+                "/transcribe/speech-to-text",
+                files={"file": ("audio.mp3", audio, "audio/mpeg")},
+                data={"model": "scribe-mini", "language": language},
+            )
+            latency = time.perf_counter() - start_time
+
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+        status_code = response.status_code
+        if status_code == 429 or status_code >= 500:
+            retry_after = response.headers.get("retry-after")
+            raise _RetryableError(
+                status_code, float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+
+        try:
+            res_json = response.json()
+        except Exception:
+            res_json = None
+
+        if status_code != 200:
+            self.failed += 1
+            logger.error("Uplift API returned non 200 error: {}", status_code, json=res_json)
+            raise UpliftAiApiError("Uplift API returned non 200 error")
+
+        if not res_json or "transcript" not in res_json:
+            self.failed += 1
+            logger.error("No transcript in response", json=res_json)
+            raise UpliftAiApiError("No transcript in response")
+
+        self.succeeded += 1
+
+        t = res_json["transcript"]
+        logger.info("Got transcription in {:.2f}s: {} ... {}", latency, t[:10], t[-10:])
+        return t
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "requests": self.requests,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "latency_avg": self.latency_total / self.requests if self.requests else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class _RetryableError(Exception):
+    def __init__(self, status_code: int, retry_after: float | None) -> None:
+        super().__init__(f"Retryable status {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
@@ -4,12 +4,16 @@ import datetime
 import os
 import random
 import secrets
+import time
+from typing import AsyncIterator
 
 import base58
 import ffmpeg
 import yt_dlp
 from loguru import logger
 
+from api.exceptions import AudioSegmentationError
+
 
 def internal_id(size: int = 16) -> str:
     return base58.b58encode(secrets.token_bytes(size)).decode()
@@ -73,6 +77,68 @@ async def audio_video_to_mp3(input_path: str, output_path: str):
     logger.info("Converted: {} → {}", input_path, output_path)
 
 
+async def segment_audio(
+    input_path: str, output_dir: str, segment_len: int, copy_codec: bool
+) -> AsyncIterator[tuple[int, str]]:
+    """
+    Split an audio/video file into mp3 chunks of `segment_len` seconds in a single ffmpeg
+    pass (segment muxer). Yields (index, path) for each chunk as soon as it is written.
+    With `copy_codec` the mp3 stream is copied, otherwise it is re-encoded to mp3.
+    """
+    output_kwargs: dict = {
+        "f": "segment",
+        "segment_time": segment_len,
+        "reset_timestamps": 1,
+        # Completed segments are listed on stdout, one per line
+        "segment_list": "pipe:1",
+        "segment_list_type": "flat",
+    }
+    if copy_codec:
+        output_kwargs["c"] = "copy"
+    else:
+        output_kwargs.update(acodec="libmp3lame", ar="44100", ac=2, audio_bitrate="192k", vn=None)
+
+    args = (
+        ffmpeg.input(input_path)
+        .output(os.path.join(output_dir, "chunk_%04d.mp3"), **output_kwargs)
+        .global_args("-loglevel", "error")
+        .overwrite_output()
+        .compile()
+    )
+
+    start_time = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    assert process.stdout and process.stderr
+
+    num_chunks = 0
+    try:
+        async for line in process.stdout:
+            chunk_name = line.decode().strip()
+            if not chunk_name:
+                continue
+
+            yield num_chunks, os.path.join(output_dir, os.path.basename(chunk_name))
+            num_chunks += 1
+
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            logger.error("ffmpeg segmentation failed: {}", stderr.decode())
+            raise AudioSegmentationError("ffmpeg segmentation failed")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    logger.info(
+        "Segmented {} into {} chunks in {:.2f}s",
+        input_path,
+        num_chunks,
+        time.perf_counter() - start_time,
+    )
+
+
 def week_to_text(year: int, week: int) -> str:
     # Get the Monday of the given ISO week
     monday = datetime.date.fromisocalendar(year, week, 1)
@@ -0,0 +1,67 @@
+"""
+Job worker, claims jobs from the `job` table and runs them.
+Run as many of these as needed, on one or more machines:
+  uv run --env-file .env python -m api.worker
+"""
+
+import asyncio
+import os
+import signal
+import socket
+import sys
+
+from loguru import logger
+from psycopg_pool import AsyncConnectionPool
+
+from api import dependencies
+
+# Importing the modules registers their background jobs
+from api.controllers import grade_controller, transcribe_controller  # noqa: F401
+from api.job_utils import run_worker
+from api.routes import task_routes  # noqa: F401
+
+WORKER_CONCURRENCY = int(os.getenv("SABQCHA_WORKER_CONCURRENCY", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("SABQCHA_WORKER_POLL_INTERVAL", "2"))
+
+# Setup logger
+logger.remove()
+
+# Configure output to console
+logger.add(
+    sys.stdout,
+    colorize=True,
+    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - "
+    "<level>{message}</level>",
+)
+
+
+async def main():
+    dependencies.pool = AsyncConnectionPool(
+        dependencies.get_pg_conninfo(),
+        min_size=2,
+        max_size=WORKER_CONCURRENCY + 2,
+        open=False,
+    )
+    await dependencies.pool.open()
+    logger.info("PG Pool initialized")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info("Worker {} started with concurrency {}", worker_id, WORKER_CONCURRENCY)
+
+    try:
+        await run_worker(worker_id, WORKER_CONCURRENCY, WORKER_POLL_INTERVAL, stop)
+    finally:
+        await dependencies.pool.close()
+        dependencies.pool = None
+        logger.info("Worker {} stopped", worker_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,286 @@
+"""
+Checks that the DAL queries use indexes at realistic data volumes.
+Every query a DAL function runs is EXPLAINed first, sequential scans on large
+tables are reported and the script exits non zero if any are found.
+Run against a disposable database migrated with dbmate:
+  uv run --env-file .env python -m bench.index_check --scale 1
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from psycopg import AsyncCursor, sql
+from psycopg_pool import AsyncConnectionPool
+
+from api import dependencies
+from api.dal import (
+    id_map,
+    leaderboard_db,
+    lecture_db,
+    past_paper_db,
+    quiz_db,
+    room_db,
+    session_db,
+    task_db,
+    user_db,
+)
+from api.dependencies import DataContext, T
+from api.models.user_models import UserRole
+from bench.seed import SeedIds, get_seed_ids, is_seeded, seed
+
+Check = Callable[[DataContext, SeedIds], Awaitable[Any]]
+
+
+class _SeqScan:
+    def __init__(self, check: str, relation: str, rows: float, query: str) -> None:
+        self.check = check
+        self.relation = relation
+        self.rows = rows
+        self.query = query
+
+
+class _ExplainingCursor:
+    """Cursor proxy that EXPLAINs every statement before running it."""
+
+    def __init__(self, cur: AsyncCursor, on_plan: Callable[[str, dict], None]) -> None:
+        self._cur = cur
+        self._on_plan = on_plan
+
+    async def execute(self, query, params=None, **kwargs):
+        await self._explain(query, params)
+        return await self._cur.execute(query, params, **kwargs)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        params_seq = list(params_seq)
+        if params_seq:
+            await self._explain(query, params_seq[0])
+        return await self._cur.executemany(query, params_seq, **kwargs)
+
+    async def _explain(self, query, params):
+        explain = sql.SQL("explain (format json) ") + (
+            sql.SQL(query) if isinstance(query, str) else query
+        )
+        # Separate cursor, the wrapped one may have a model row factory
+        async with self._cur.connection.cursor() as explain_cur:
+            await explain_cur.execute(explain, params)
+            row = await explain_cur.fetchone()
+        assert row
+
+        plan = row[0] if isinstance(row[0], list) else json.loads(row[0])
+        query_text = query if isinstance(query, str) else query.as_string(self._cur.connection)
+        self._on_plan(query_text, plan[0]["Plan"])
+
+    def __getattr__(self, name: str):
+        return getattr(self._cur, name)
+
+
+class _ExplainingDataContext(DataContext):
+    def __init__(self, user_id: str, role: UserRole, on_plan: Callable[[str, dict], None]):
+        super().__init__(user_id, role)
+        self._on_plan = on_plan
+
+    @asynccontextmanager
+    async def get_cursor(self):
+        async with super().get_cursor() as cur:
+            yield _ExplainingCursor(cur, self._on_plan)
+
+    @asynccontextmanager
+    async def get_model_cursor(self, model: type[T]):
+        async with super().get_model_cursor(model) as cur:
+            yield _ExplainingCursor(cur, self._on_plan)
+
+
+async def _get_session(dc: DataContext, ids: SeedIds):
+    async with dc.get_cursor() as cur:
+        return await session_db.get_session(cur, ids.session_id)  # type: ignore
+
+
+_STUDENT_CHECKS: dict[str, Check] = {
+    "session_db.get_session": _get_session,
+    "user_db.get_user": lambda dc, ids: user_db.get_user(dc, ids.student_id),
+    "user_db.get_user_id_from_device": lambda dc, ids: user_db.get_user_id_from_device(
+        dc, ids.device_id  # type: ignore
+    ),
+    "user_db.get_user_id_from_credentials": lambda dc, ids: user_db.get_user_id_from_credentials(
+        dc, ids.email, ids.password
+    ),
+    "room_db.list_rooms": lambda dc, ids: room_db.list_rooms(dc, ids.student_id, UserRole.STUDENT),
+    "room_db.get_room": lambda dc, ids: room_db.get_room(dc, ids.room_id),
+    "room_db.get_student_room": lambda dc, ids: room_db.get_student_room(
+        dc, ids.student_id, ids.room_id
+    ),
+    "room_db.get_room_for_invite_code": lambda dc, ids: room_db.get_room_for_invite_code(
+        dc, ids.invite_code
+    ),
+    "room_db.get_room_for_task_set": lambda dc, ids: room_db.get_room_for_task_set(
+        dc, ids.task_set_id
+    ),
+    "room_db.update_user_score": lambda dc, ids: room_db.update_user_score(
+        dc, ids.student_id, ids.room_id, 0
+    ),
+    "leaderboard_db.list_ranked_students": lambda dc, ids: leaderboard_db.list_ranked_students(
+        dc, ids.room_id, limit=100
+    ),
+    "leaderboard_db.list_ranked_students_around_user": (
+        lambda dc, ids: leaderboard_db.list_ranked_students_around_user(
+            dc, ids.room_id, neighbours=5
+        )
+    ),
+    "lecture_db.get_this_week_lecture_group": (
+        lambda dc, ids: lecture_db.get_this_week_lecture_group(dc, ids.room_id)
+    ),
+    "lecture_db.list_lectures_for_group": lambda dc, ids: lecture_db.list_lectures_for_group(
+        dc, ids.lecture_group_id
+    ),
+    "lecture_db.get_lecture": lambda dc, ids: lecture_db.get_lecture(dc, ids.lecture_id),
+    "lecture_db.list_lectures_ui": lambda dc, ids: lecture_db.list_lectures_ui(dc, ids.room_id),
+    "lecture_db.search_lecture_passages": lambda dc, ids: lecture_db.search_lecture_passages(
+        dc, ids.lecture_group_id, ["photosynthesis light reaction"], limit=3
+    ),
+    "task_db.get_task_set": lambda dc, ids: task_db.get_task_set(dc, ids.task_set_id),
+    "task_db.list_task_sets_for_room": lambda dc, ids: task_db.list_task_sets_for_room(
+        dc, ids.student_id, ids.room_id
+    ),
+    "task_db.get_task_set_analysis_input": (
+        lambda dc, ids: task_db.get_task_set_analysis_input(dc, ids.student_id, ids.task_set_id)
+    ),
+    "task_db.get_recent_mistake_analysis": lambda dc, ids: task_db.get_recent_mistake_analysis(
+        dc, ids.student_id, ids.task_set_id
+    ),
+    "quiz_db.list_quizzes_for_room": lambda dc, ids: quiz_db.list_quizzes_for_room(
+        dc, ids.room_id
+    ),
+    "quiz_db.get_quiz": lambda dc, ids: quiz_db.get_quiz(dc, ids.quiz_id),
+    "quiz_db.list_student_solutions_for_quiz": (
+        lambda dc, ids: quiz_db.list_student_solutions_for_quiz(dc, ids.quiz_id)
+    ),
+    "quiz_db.get_student_solution": lambda dc, ids: quiz_db.get_student_solution(
+        dc, ids.solution_id
+    ),
+    "quiz_db.get_student_graded_solution": lambda dc, ids: quiz_db.get_student_graded_solution(
+        dc, ids.solution_id
+    ),
+    "past_paper_db.get_past_paper": lambda dc, ids: past_paper_db.get_past_paper(
+        dc, ids.past_paper_id
+    ),
+    "past_paper_db.get_random_past_paper": lambda dc, ids: past_paper_db.get_random_past_paper(
+        dc, ids.subject_id, user_id=ids.student_id
+    ),
+    "past_paper_db.get_rubric_for_past_paper": (
+        lambda dc, ids: past_paper_db.get_rubric_for_past_paper(dc, ids.past_paper_id)
+    ),
+    "past_paper_db.get_student_graded_solution": (
+        lambda dc, ids: past_paper_db.get_student_graded_solution(
+            dc, ids.student_id, ids.past_paper_id
+        )
+    ),
+    "past_paper_db.get_subject_id_for_room": lambda dc, ids: past_paper_db.get_subject_id_for_room(
+        dc, ids.room_id
+    ),
+}
+
+_TEACHER_CHECKS: dict[str, Check] = {
+    "room_db.list_rooms (teacher)": lambda dc, ids: room_db.list_rooms(
+        dc, ids.teacher_id, UserRole.TEACHER
+    ),
+}
+
+
+async def _table_sizes(cur: AsyncCursor) -> dict[str, float]:
+    await cur.execute(
+        """
+        select
+            c.relname,
+            c.reltuples
+        from
+            pg_class c
+            join pg_namespace n on n.oid = c.relnamespace
+        where
+            n.nspname = 'public' and
+            c.relkind = 'r'
+        """
+    )
+    return {r[0]: r[1] for r in await cur.fetchall()}
+
+
+def _seq_scans(plan: dict) -> list[tuple[str, float]]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append((plan["Relation Name"], plan.get("Plan Rows", 0)))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def run_checks(ids: SeedIds, table_sizes: dict[str, float], min_rows: int) -> list[_SeqScan]:
+    offenders: list[_SeqScan] = []
+
+    async def run(name: str, check: Check, user_id: str, role: UserRole):
+        def on_plan(query: str, plan: dict):
+            for relation, rows in _seq_scans(plan):
+                if table_sizes.get(relation, 0) >= min_rows:
+                    offenders.append(_SeqScan(name, relation, rows, query))
+
+        # Start cold so id lookups are checked as well
+        id_map._process_cache.clear()
+        data_context = _ExplainingDataContext(user_id, role, on_plan)
+        await check(data_context, ids)
+        logger.info("Checked {}", name)
+
+    for name, check in _STUDENT_CHECKS.items():
+        await run(name, check, ids.student_id, UserRole.STUDENT)
+    for name, check in _TEACHER_CHECKS.items():
+        await run(name, check, ids.teacher_id, UserRole.TEACHER)
+
+    return offenders
+
+
+async def main(scale: float, min_rows: int):
+    dependencies.pool = AsyncConnectionPool(dependencies.get_pg_conninfo(), open=False)
+    await dependencies.pool.open()
+
+    try:
+        async with dependencies.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                if not await is_seeded(cur):
+                    logger.info("Seeding database at scale {}", scale)
+                    await seed(cur, scale)
+                    await conn.commit()
+
+                ids = await get_seed_ids(cur)
+                table_sizes = await _table_sizes(cur)
+
+        offenders = await run_checks(ids, table_sizes, min_rows)
+    finally:
+        await dependencies.pool.close()
+        dependencies.pool = None
+
+    if not offenders:
+        logger.info("All DAL queries use indexes on tables with >= {} rows", min_rows)
+        return 0
+
+    for o in offenders:
+        logger.error(
+            "{}: Seq Scan on {} ({:.0f} rows)\n{}",
+            o.check,
+            o.relation,
+            table_sizes.get(o.relation, 0),
+            o.query.strip(),
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=float, default=1, help="Seed volume multiplier")
+    parser.add_argument(
+        "--min-rows", type=int, default=10_000, help="Ignore sequential scans on smaller tables"
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.scale, args.min_rows)))
@@ -0,0 +1,319 @@
+"""
+End to end HTTP load test for api.main:app against a local Postgres.
+Seeds the database (see bench.seed) if needed, stubs Firebase, boots the app
+with uvicorn in process and drives the hot routes one phase at a time,
+reporting latency percentiles, throughput and DB queries per request.
+OpenAI and Uplift clients are built with dummy keys, none of the driven routes call them.
+Run against a disposable database migrated with dbmate:
+  uv run --env-file .env python -m bench.load_test --concurrency 32 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable
+from unittest import mock
+
+import httpx
+import uvicorn
+from loguru import logger
+from psycopg import AsyncConnection, AsyncCursor
+from pydantic import BaseModel
+
+from bench.seed import TASKS_PER_SET, is_seeded, seed
+
+
+class VirtualUser(BaseModel):
+    device_id: str
+    room_id: str
+    task_set_id: str
+    token: str | None = None
+
+
+class PhaseResult(BaseModel):
+    name: str
+    requests: int
+    errors: int
+    concurrency: int
+    duration: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries_per_request: float
+
+
+RequestFn = Callable[[httpx.AsyncClient, VirtualUser], Any]
+
+
+class _QueryCounter:
+    """Counts statements sent through psycopg cursors, app wide."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def install(self):
+        execute = AsyncCursor.execute
+        executemany = AsyncCursor.executemany
+
+        async def counted_execute(cur, *args, **kwargs):
+            self.count += 1
+            return await execute(cur, *args, **kwargs)
+
+        async def counted_executemany(cur, *args, **kwargs):
+            self.count += 1
+            return await executemany(cur, *args, **kwargs)
+
+        mock.patch.object(AsyncCursor, "execute", counted_execute).start()
+        mock.patch.object(AsyncCursor, "executemany", counted_executemany).start()
+
+
+def _stub_external_services():
+    """Firebase needs real credentials at import time, replace it before api.main is imported."""
+    mock.patch("firebase_admin.credentials.Certificate").start()
+    mock.patch("firebase_admin.initialize_app").start()
+    mock.patch("firebase_admin.storage.bucket").start()
+    mock.patch("firebase_admin.firestore.client").start()
+
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    os.environ.setdefault("UPLIFT_API_KEY", "load-test")
+    os.environ["SABQCHA_JOB_INLINE"] = "false"
+
+
+async def _load_virtual_users(conninfo: str, users: int, scale: float) -> list[VirtualUser]:
+    async with await AsyncConnection.connect(conninfo) as conn:
+        async with conn.cursor() as cur:
+            if not await is_seeded(cur):
+                logger.warning("Seeding database at scale {}", scale)
+                await seed(cur, scale)
+                await conn.commit()
+
+            await cur.execute(
+                """
+                select distinct on (su.row_id)
+                    du.device_id,
+                    r.public_id,
+                    ts.public_id
+                from
+                    sabqcha_user su
+                    join device_user du on du.sabqcha_user_row_id = su.row_id
+                    join student st on st.sabqcha_user_row_id = su.row_id
+                    join student_room sr on sr.student_row_id = st.row_id
+                    join room r on r.row_id = sr.room_row_id
+                    join lecture_group lg on lg.room_row_id = r.row_id
+                    join task_set ts on ts.lecture_group_row_id = lg.row_id
+                where
+                    su.public_id like 'bench-user-%%'
+                order by
+                    su.row_id, ts.created_at desc
+                limit %s
+                """,
+                (users,),
+            )
+            rows = await cur.fetchall()
+
+    return [VirtualUser(device_id=r[0], room_id=r[1], task_set_id=r[2]) for r in rows]
+
+
+def _auth(user: VirtualUser) -> dict[str, str]:
+    return {"Authorization": f"Bearer {user.token}"}
+
+
+async def _login_device(client: httpx.AsyncClient, user: VirtualUser):
+    res = await client.post(f"/user/device/{user.device_id}")
+    if res.status_code == 200:
+        user.token = res.json()["token"]
+    return res
+
+
+async def _list_rooms(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get("/room", headers=_auth(user))
+
+
+async def _get_task_set(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get(f"/task/set/{user.task_set_id}", headers=_auth(user))
+
+
+async def _submit_task_set(client: httpx.AsyncClient, user: VirtualUser):
+    body = {
+        "tasks": [
+            {"answer": random.choice("ABCD"), "did_skip": random.random() < 0.1}
+            for _ in range(TASKS_PER_SET)
+        ],
+        "time_elapsed": random.randint(30, 600),
+    }
+    return await client.post(f"/task/set/{user.task_set_id}", json=body, headers=_auth(user))
+
+
+async def _get_leaderboard(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get(f"/leaderboard/{user.room_id}", headers=_auth(user))
+
+
+async def _list_lectures(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get(f"/lecture/room/{user.room_id}", headers=_auth(user))
+
+
+PHASES: dict[str, RequestFn] = {
+    "POST /user/device/{id}": _login_device,
+    "GET /room": _list_rooms,
+    "GET /task/set/{id}": _get_task_set,
+    "POST /task/set/{id}": _submit_task_set,
+    "GET /leaderboard/{room_id}": _get_leaderboard,
+    "GET /lecture/room/{id}": _list_lectures,
+}
+
+
+def _percentile(quantiles: list[float], p: int) -> float:
+    return quantiles[p - 1] * 1000 if quantiles else 0.0
+
+
+async def run_phase(
+    name: str,
+    request_fn: RequestFn,
+    client: httpx.AsyncClient,
+    users: list[VirtualUser],
+    total_requests: int,
+    concurrency: int,
+    counter: _QueryCounter,
+) -> PhaseResult:
+    latencies: list[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < total_requests:
+            user = users[next_request % len(users)]
+            next_request += 1
+
+            start_time = time.perf_counter()
+            try:
+                res = await request_fn(client, user)
+                failed = res.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start_time)
+            errors += failed
+
+    queries_before = counter.count
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start_time
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return PhaseResult(
+        name=name,
+        requests=len(latencies),
+        errors=errors,
+        concurrency=concurrency,
+        duration=duration,
+        throughput=len(latencies) / duration if duration else 0.0,
+        p50_ms=_percentile(quantiles, 50),
+        p95_ms=_percentile(quantiles, 95),
+        p99_ms=_percentile(quantiles, 99),
+        max_ms=max(latencies, default=0.0) * 1000,
+        queries_per_request=(counter.count - queries_before) / len(latencies) if latencies else 0,
+    )
+
+
+def _print_report(results: list[PhaseResult]):
+    header = f"{'route':<28}{'reqs':>7}{'errs':>6}{'req/s':>9}"
+    header += f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'q/req':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.name:<28}{r.requests:>7}{r.errors:>6}{r.throughput:>9.1f}"
+            f"{r.p50_ms:>9.1f}{r.p95_ms:>9.1f}{r.p99_ms:>9.1f}{r.max_ms:>9.1f}"
+            f"{r.queries_per_request:>7.1f}"
+        )
+
+
+async def main(args: argparse.Namespace) -> int:
+    _stub_external_services()
+
+    # Imported here so the stubs are in place before the app builds its clients
+    from api import dependencies
+    from api.main import app
+
+    # Per request logging would dominate the measurements
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    users = await _load_virtual_users(dependencies.get_pg_conninfo(), args.users, args.scale)
+    if not users:
+        logger.error("No seeded students with task sets found")
+        return 1
+
+    counter = _QueryCounter()
+    counter.install()
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    server = uvicorn.Server(config)
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            return 1
+        await asyncio.sleep(0.05)
+
+    selected = [name for name in PHASES if not args.routes or any(r in name for r in args.routes)]
+    results: list[PhaseResult] = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60
+        ) as client:
+            logged_in = False
+            for name in selected:
+                if PHASES[name] is not _login_device and not logged_in:
+                    # Log every user in once so each holds a live session token
+                    await run_phase(
+                        "login", _login_device, client, users, len(users), args.concurrency, counter
+                    )
+                    logged_in = True
+
+                result = await run_phase(
+                    name,
+                    PHASES[name],
+                    client,
+                    users,
+                    args.requests,
+                    args.concurrency,
+                    counter,
+                )
+                results.append(result)
+                if PHASES[name] is _login_device and args.requests >= len(users):
+                    # Users are taken round robin, so every one of them now holds a session
+                    logged_in = True
+    finally:
+        server.should_exit = True
+        await serve_task
+
+    _print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([r.model_dump() for r in results], f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=float, default=1, help="Seed volume multiplier")
+    parser.add_argument("--users", type=int, default=200, help="Distinct students to log in")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route")
+    parser.add_argument(
+        "--routes", nargs="*", help="Only run routes whose name contains one of these"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,99 @@
+"""
+Benchmarks PDF page rendering for the LLM image inputs.
+Compares the old pdf2image path (poppler subprocess, PIL pages, temp JPEGs,
+re-read and base64) with the in memory PyMuPDF path in api.pdf_utils.
+The pymupdf row renders full size RGB at the same DPI and JPEG quality as
+pdf2image, so it only measures the engine change. The pymupdf+doc row adds
+the document image profile (downscale, grayscale, lower quality) on top.
+  uv run python -m bench.pdf_render --dpi 150 300 --repeat 3
+"""
+
+import argparse
+import asyncio
+import base64
+import glob
+import os
+import tempfile
+import time
+
+from pdf2image import convert_from_path
+
+from api import image_prep
+from api.pdf_utils import iter_pdf_pages
+
+
+# Matches pdf2image, no downscale, colour kept, PIL's default JPEG quality
+FULL_PAGE = image_prep.ImageProfile(
+    name="full", max_long_edge=1_000_000, grayscale=False, jpeg_quality=75
+)
+
+
+def _pdf2image_inputs(pdf_path: str, dpi: int) -> list[dict[str, str]]:
+    inputs = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pages = convert_from_path(pdf_path, dpi=dpi)
+        for idx, page in enumerate(pages, start=1):
+            image_path = os.path.join(temp_dir, f"p_{idx}.jpg")
+            page.save(image_path, "JPEG")
+            with open(image_path, "rb") as image_file:
+                base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+            inputs.append(
+                {"type": "input_image", "image_url": f"data:image/jpeg;base64,{base64_image}"}
+            )
+    return inputs
+
+
+async def _pdf2image_inputs_async(pdf_path: str, dpi: int) -> list[dict[str, str]]:
+    return await asyncio.to_thread(_pdf2image_inputs, pdf_path, dpi)
+
+
+async def _pymupdf_inputs(
+    pdf_path: str, dpi: int, profile: image_prep.ImageProfile = FULL_PAGE
+) -> list[dict[str, str]]:
+    return [
+        image_prep.get_model_input(page)
+        async for page in iter_pdf_pages(pdf_path, profile, reference_dpi=dpi)
+    ]
+
+
+async def _pymupdf_document_inputs(pdf_path: str, dpi: int) -> list[dict[str, str]]:
+    return await _pymupdf_inputs(pdf_path, dpi, image_prep.DOCUMENT)
+
+
+async def _measure(name: str, pdf_path: str, dpi: int, repeat: int, render) -> None:
+    timings = []
+    size = 0
+    pages = 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        inputs = await render(pdf_path, dpi)
+        timings.append(time.perf_counter() - start_time)
+
+        pages = len(inputs)
+        size = sum(len(i["image_url"]) for i in inputs)
+
+    best = min(timings)
+    print(
+        f"{os.path.basename(pdf_path):<40}{dpi:>5}{name:>13}{pages:>7}"
+        f"{best:>10.3f}{best / max(pages, 1) * 1000:>12.1f}{size / 1e6:>10.2f}"
+    )
+
+
+async def main(pdf_paths: list[str], dpis: list[int], repeat: int):
+    header = f"{'pdf':<40}{'dpi':>5}{'engine':>13}{'pages':>7}"
+    print(f"{header}{'best s':>10}{'ms/page':>12}{'b64 MB':>10}")
+    for pdf_path in pdf_paths:
+        for dpi in dpis:
+            await _measure("pdf2image", pdf_path, dpi, repeat, _pdf2image_inputs_async)
+            await _measure("pymupdf", pdf_path, dpi, repeat, _pymupdf_inputs)
+            await _measure("pymupdf+doc", pdf_path, dpi, repeat, _pymupdf_document_inputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", default=sorted(glob.glob("content/*.pdf")))
+    parser.add_argument("--dpi", type=int, nargs="+", default=[150, 300])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.pdfs, args.dpi, args.repeat))
@@ -0,0 +1,431 @@
+"""
+Seeds a database with production-like volumes for benchmarks and plan checks.
+Only meant for a disposable database, every seeded public id starts with `bench-`.
+"""
+
+from psycopg import AsyncCursor
+from pydantic import BaseModel
+
+# Rows per unit of scale
+TEACHERS = 200
+STUDENTS = 20_000
+SUBJECTS = 20
+ROOMS_PER_TEACHER = 5
+ROOMS_PER_STUDENT = 3
+WEEKS_PER_ROOM = 20
+LECTURES_PER_WEEK = 3
+TASKS_PER_SET = 10
+ATTEMPTS = 200_000
+ANALYSES = 50_000
+SESSIONS_PER_USER = 2
+QUIZZES_PER_ROOM = 2
+SOLUTIONS_PER_QUIZ = 30
+PAST_PAPERS_PER_SUBJECT = 100
+PAST_PAPER_SOLUTIONS = 5_000
+
+
+class SeedIds(BaseModel):
+    """Public ids of one well connected student, teacher and their room."""
+
+    student_id: str
+    teacher_id: str
+    room_id: str
+    invite_code: str
+    lecture_group_id: str
+    lecture_id: str
+    task_set_id: str
+    quiz_id: str
+    solution_id: str
+    subject_id: str
+    past_paper_id: str
+    device_id: str
+    session_id: str
+    email: str
+    password: str
+
+
+_SEED_STATEMENTS = [
+    """
+    insert into sabqcha_user (public_id, display_name, email, password)
+    select
+        'bench-user-' || g,
+        'Bench User ' || g,
+        'bench-user-' || g || '@example.com',
+        'password'
+    from
+        generate_series(1, %(teachers)s + %(students)s) g
+    """,
+    """
+    insert into teacher (sabqcha_user_row_id)
+    select row_id from sabqcha_user where public_id like 'bench-user-%%'
+    order by row_id limit %(teachers)s
+    """,
+    """
+    insert into student (sabqcha_user_row_id)
+    select row_id from sabqcha_user where public_id like 'bench-user-%%'
+    order by row_id offset %(teachers)s
+    """,
+    """
+    insert into device_user (device_id, sabqcha_user_row_id)
+    select 'bench-device-' || row_id, row_id from sabqcha_user where public_id like 'bench-user-%%'
+    """,
+    """
+    insert into session (public_id, sabqcha_user_row_id, is_expired, created_at)
+    select
+        'bench-session-' || su.row_id || '-' || g,
+        su.row_id,
+        g > 1,
+        now() - make_interval(days => g)
+    from
+        sabqcha_user su
+        cross join generate_series(1, %(sessions_per_user)s) g
+    where
+        su.public_id like 'bench-user-%%'
+    """,
+    """
+    insert into subject (public_id, display_name, code, program, rubric_content)
+    select
+        'bench-subject-' || g,
+        'Bench Subject ' || g,
+        'bench-' || g,
+        (case when g %% 2 = 0 then 'O_LEVEL' else 'A_LEVEL' end)::program_type,
+        'Rubric for subject ' || g
+    from
+        generate_series(1, %(subjects)s) g
+    """,
+    """
+    with subjects as (
+        select array_agg(row_id) as ids from subject where public_id like 'bench-subject-%%'
+    )
+    insert into room (public_id, display_name, invite_code, teacher_row_id, subject_row_id)
+    select
+        'bench-room-' || t.row_id || '-' || g,
+        'Bench Room ' || t.row_id || '-' || g,
+        left(md5(t.row_id || '-' || g), 4) || '-' || right(md5(t.row_id || '-' || g), 4),
+        t.row_id,
+        s.ids[1 + (t.row_id + g) %% cardinality(s.ids)]
+    from
+        teacher t
+        join sabqcha_user su on su.row_id = t.sabqcha_user_row_id
+        cross join generate_series(1, %(rooms_per_teacher)s) g
+        cross join subjects s
+    where
+        su.public_id like 'bench-user-%%'
+    """,
+    """
+    with rooms as (
+        select array_agg(row_id order by row_id) as ids
+        from room where public_id like 'bench-room-%%'
+    )
+    insert into student_room (student_row_id, room_row_id, score)
+    select distinct on (st.row_id, r.ids[1 + (st.row_id * 7 + g * 13) %% cardinality(r.ids)])
+        st.row_id,
+        r.ids[1 + (st.row_id * 7 + g * 13) %% cardinality(r.ids)],
+        (random() * 5000)::bigint
+    from
+        student st
+        join sabqcha_user su on su.row_id = st.sabqcha_user_row_id
+        cross join generate_series(1, %(rooms_per_student)s) g
+        cross join rooms r
+    where
+        su.public_id like 'bench-user-%%'
+    """,
+    """
+    insert into lecture_group (public_id, room_row_id, created_at)
+    select
+        'bench-lecture-group-' || r.row_id || '-' || w,
+        r.row_id,
+        now() - make_interval(weeks => w)
+    from
+        room r
+        cross join generate_series(0, %(weeks_per_room)s - 1) w
+    where
+        r.public_id like 'bench-room-%%'
+    """,
+    """
+    insert into lecture (
+        public_id, lecture_group_row_id, file_path, title, transcribed_content, created_at
+    )
+    select
+        'bench-lecture-' || lg.row_id || '-' || g,
+        lg.row_id,
+        'bench/lecture-' || lg.row_id || '-' || g || '.mp3',
+        'Bench Lecture ' || g,
+        repeat('transcribed lecture content ', 20),
+        lg.created_at
+    from
+        lecture_group lg
+        cross join generate_series(1, %(lectures_per_week)s) g
+    where
+        lg.public_id like 'bench-lecture-group-%%'
+    """,
+    """
+    insert into task_set (public_id, lecture_group_row_id, day, created_at)
+    select
+        'bench-task-set-' || lg.row_id || '-' || g,
+        lg.row_id,
+        (enum_range(null::week_day))[g],
+        lg.created_at + make_interval(days => g - 1)
+    from
+        lecture_group lg
+        cross join generate_series(1, 5) g
+    where
+        lg.public_id like 'bench-lecture-group-%%'
+    """,
+    """
+    insert into task (public_id, task_set_row_id, question, answer, options)
+    select
+        'bench-task-' || ts.row_id || '-' || g,
+        ts.row_id,
+        'Bench question ' || g || '?',
+        'A',
+        array['A', 'B', 'C', 'D']
+    from
+        task_set ts
+        cross join generate_series(1, %(tasks_per_set)s) g
+    where
+        ts.public_id like 'bench-task-set-%%'
+    """,
+    """
+    with
+        students as (
+            select array_agg(st.row_id) as ids
+            from student st join sabqcha_user su on su.row_id = st.sabqcha_user_row_id
+            where su.public_id like 'bench-user-%%'
+        ),
+        task_sets as (
+            select array_agg(row_id) as ids from task_set where public_id like 'bench-task-set-%%'
+        )
+    insert into task_set_attempt (
+        public_id, task_set_row_id, student_row_id, user_attempts,
+        time_elapsed, correct_count, incorrect_count, skip_count, created_at
+    )
+    select
+        'bench-attempt-' || g,
+        ts.ids[1 + (random() * (cardinality(ts.ids) - 1))::int],
+        s.ids[1 + (random() * (cardinality(s.ids) - 1))::int],
+        '[{"answer": "A", "did_skip": false}]'::jsonb,
+        (random() * 600)::int,
+        (random() * 10)::int,
+        (random() * 5)::int,
+        (random() * 2)::int,
+        now() - make_interval(days => (random() * 140)::int)
+    from
+        generate_series(1, %(attempts)s) g
+        cross join students s
+        cross join task_sets ts
+    """,
+    """
+    insert into mistake_analysis (public_id, task_set_row_id, student_row_id, analysis, created_at)
+    select
+        'bench-analysis-' || tsa.row_id,
+        tsa.task_set_row_id,
+        tsa.student_row_id,
+        '{"mistakes": []}'::jsonb,
+        tsa.created_at
+    from
+        task_set_attempt tsa
+    where
+        tsa.public_id like 'bench-attempt-%%'
+    limit %(analyses)s
+    """,
+    """
+    insert into llm_content_extract (public_id, content, content_type)
+    select
+        'bench-extract-' || g,
+        repeat('extracted content ', 50),
+        (enum_range(null::llm_content_extract_type))[1 + g %% 3]
+    from
+        generate_series(1, 1000) g
+    """,
+    """
+    insert into quiz (public_id, room_row_id, title, answer_sheet_path, rubric_path)
+    select
+        'bench-quiz-' || r.row_id || '-' || g,
+        r.row_id,
+        'Bench Quiz ' || g,
+        'bench/answer-sheet.pdf',
+        'bench/rubric.pdf'
+    from
+        room r
+        cross join generate_series(1, %(quizzes_per_room)s) g
+    where
+        r.public_id like 'bench-room-%%'
+    """,
+    """
+    insert into student_solution (public_id, quiz_row_id, title, solution_path)
+    select
+        'bench-solution-' || q.row_id || '-' || g,
+        q.row_id,
+        'Bench Solution ' || g,
+        'bench/solution.pdf'
+    from
+        quiz q
+        cross join generate_series(1, %(solutions_per_quiz)s) g
+    where
+        q.public_id like 'bench-quiz-%%'
+    """,
+    """
+    insert into past_paper_bank (
+        public_id, subject_row_id, season, year, paper, variant,
+        question_file_path, marking_scheme_file_path
+    )
+    select
+        'bench-past-paper-' || s.row_id || '-' || g,
+        s.row_id,
+        (array['MJ', 'ON', 'FM'])[1 + g %% 3],
+        2000 + g %% 25,
+        1 + g %% 4,
+        1 + g %% 3,
+        'bench/qp.pdf',
+        'bench/ms.pdf'
+    from
+        subject s
+        cross join generate_series(1, %(past_papers_per_subject)s) g
+    where
+        s.public_id like 'bench-subject-%%'
+    """,
+    """
+    with
+        users as (
+            select array_agg(row_id) as ids from sabqcha_user where public_id like 'bench-user-%%'
+        ),
+        papers as (
+            select array_agg(row_id) as ids
+            from past_paper_bank where public_id like 'bench-past-paper-%%'
+        )
+    insert into student_past_paper_solution (
+        public_id, past_paper_bank_row_id, solution_file_path, sabqcha_user_row_id
+    )
+    select
+        'bench-past-paper-solution-' || g,
+        p.ids[1 + (random() * (cardinality(p.ids) - 1))::int],
+        'bench/solution.pdf',
+        u.ids[1 + (random() * (cardinality(u.ids) - 1))::int]
+    from
+        generate_series(1, %(past_paper_solutions)s) g
+        cross join users u
+        cross join papers p
+    """,
+]
+
+
+async def is_seeded(cur: AsyncCursor) -> bool:
+    await cur.execute("select exists (select 1 from room where public_id like 'bench-room-%')")
+    row = await cur.fetchone()
+    return bool(row and row[0])
+
+
+async def seed(cur: AsyncCursor, scale: float = 1):
+    params = {
+        "teachers": int(TEACHERS * scale),
+        "students": int(STUDENTS * scale),
+        "subjects": SUBJECTS,
+        "rooms_per_teacher": ROOMS_PER_TEACHER,
+        "rooms_per_student": ROOMS_PER_STUDENT,
+        "weeks_per_room": WEEKS_PER_ROOM,
+        "lectures_per_week": LECTURES_PER_WEEK,
+        "tasks_per_set": TASKS_PER_SET,
+        "attempts": int(ATTEMPTS * scale),
+        "analyses": int(ANALYSES * scale),
+        "sessions_per_user": SESSIONS_PER_USER,
+        "quizzes_per_room": QUIZZES_PER_ROOM,
+        "solutions_per_quiz": SOLUTIONS_PER_QUIZ,
+        "past_papers_per_subject": PAST_PAPERS_PER_SUBJECT,
+        "past_paper_solutions": int(PAST_PAPER_SOLUTIONS * scale),
+    }
+    for statement in _SEED_STATEMENTS:
+        await cur.execute(statement, params)
+
+    await cur.execute("analyze")
+
+
+async def get_seed_ids(cur: AsyncCursor) -> SeedIds:
+    """Pick the busiest seeded room, one of its students and the latest rows hanging off it."""
+    await cur.execute(
+        """
+        with busy_room as (
+            select
+                sr.room_row_id,
+                min(sr.student_row_id) as student_row_id
+            from
+                student_room sr
+                join room r on r.row_id = sr.room_row_id
+            where
+                r.public_id like 'bench-room-%'
+            group by
+                sr.room_row_id
+            order by
+                count(*) desc
+            limit 1
+        )
+        select
+            stu.public_id,
+            tu.public_id,
+            r.public_id,
+            r.invite_code,
+            lg.public_id,
+            l.public_id,
+            ts.public_id,
+            q.public_id,
+            ss.public_id,
+            s.public_id,
+            ppb.public_id,
+            du.device_id,
+            se.public_id,
+            stu.email,
+            stu.password
+        from
+            busy_room br
+            join room r on r.row_id = br.room_row_id
+            join student st on st.row_id = br.student_row_id
+            join sabqcha_user stu on stu.row_id = st.sabqcha_user_row_id
+            join teacher t on t.row_id = r.teacher_row_id
+            join sabqcha_user tu on tu.row_id = t.sabqcha_user_row_id
+            join subject s on s.row_id = r.subject_row_id
+            join lateral (
+                select * from lecture_group where room_row_id = r.row_id
+                order by created_at desc limit 1
+            ) lg on true
+            join lateral (
+                select * from lecture where lecture_group_row_id = lg.row_id limit 1
+            ) l on true
+            join lateral (
+                select * from task_set where lecture_group_row_id = lg.row_id limit 1
+            ) ts on true
+            join lateral (
+                select * from quiz where room_row_id = r.row_id limit 1
+            ) q on true
+            join lateral (
+                select * from student_solution where quiz_row_id = q.row_id limit 1
+            ) ss on true
+            join lateral (
+                select * from past_paper_bank where subject_row_id = s.row_id limit 1
+            ) ppb on true
+            join device_user du on du.sabqcha_user_row_id = stu.row_id
+            join lateral (
+                select * from session where sabqcha_user_row_id = stu.row_id and not is_expired
+                limit 1
+            ) se on true
+        """
+    )
+    row = await cur.fetchone()
+    assert row, "Database is not seeded"
+
+    return SeedIds(
+        student_id=row[0],
+        teacher_id=row[1],
+        room_id=row[2],
+        invite_code=row[3],
+        lecture_group_id=row[4],
+        lecture_id=row[5],
+        task_set_id=row[6],
+        quiz_id=row[7],
+        solution_id=row[8],
+        subject_id=row[9],
+        past_paper_id=row[10],
+        device_id=row[11],
+        session_id=row[12],
+        email=row[13],
+        password=row[14],
+    )
@@ -0,0 +1,47 @@
+-- migrate:up
+
+create type job_status as enum (
+  'QUEUED',
+  'RUNNING',
+  'SUCCEEDED',
+  'FAILED'
+);
+
+alter table job add column status job_status not null default 'QUEUED';
+alter table job add column name text;
+alter table job add column payload jsonb not null default '{}'::jsonb;
+alter table job add column user_id text;
+alter table job add column user_role text;
+alter table job add column attempts int not null default 0;
+alter table job add column max_attempts int not null default 3;
+alter table job add column run_after timestamptz not null default now();
+alter table job add column locked_by text;
+alter table job add column lease_expires_at timestamptz;
+alter table job add column heartbeat_at timestamptz;
+alter table job add column last_error text;
+
+-- Jobs from before the queue ran inside the API process and can't be resumed
+update job set
+  status = case when in_progress then 'FAILED' else 'SUCCEEDED' end::job_status,
+  in_progress = false;
+
+create index job_claim_idx on job (run_after) where status in ('QUEUED', 'RUNNING');
+
+-- migrate:down
+
+drop index job_claim_idx;
+
+alter table job drop column status;
+alter table job drop column name;
+alter table job drop column payload;
+alter table job drop column user_id;
+alter table job drop column user_role;
+alter table job drop column attempts;
+alter table job drop column max_attempts;
+alter table job drop column run_after;
+alter table job drop column locked_by;
+alter table job drop column lease_expires_at;
+alter table job drop column heartbeat_at;
+alter table job drop column last_error;
+
+drop type job_status;
@@ -0,0 +1,7 @@
+-- migrate:up
+
+create index student_room_room_row_id_score_idx on student_room (room_row_id, score desc);
+
+-- migrate:down
+
+drop index student_room_room_row_id_score_idx;
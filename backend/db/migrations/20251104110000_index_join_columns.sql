@@ -0,0 +1,31 @@
+-- migrate:up
+
+create index task_task_set_row_id_idx on task (task_set_row_id);
+create index task_set_lecture_group_row_id_idx on task_set (lecture_group_row_id);
+create index lecture_group_room_row_id_idx on lecture_group (room_row_id);
+create index lecture_lecture_group_row_id_idx on lecture (lecture_group_row_id);
+create index task_set_attempt_student_row_id_task_set_row_id_idx on task_set_attempt (student_row_id, task_set_row_id);
+create index mistake_analysis_task_set_row_id_student_row_id_created_at_idx on mistake_analysis (task_set_row_id, student_row_id, created_at);
+create index session_sabqcha_user_row_id_idx on session (sabqcha_user_row_id);
+create index room_invite_code_idx on room (invite_code);
+create index sabqcha_user_email_idx on sabqcha_user (email);
+create index student_sabqcha_user_row_id_idx on student (sabqcha_user_row_id);
+create index teacher_sabqcha_user_row_id_idx on teacher (sabqcha_user_row_id);
+create index quiz_room_row_id_idx on quiz (room_row_id);
+create index student_solution_quiz_row_id_idx on student_solution (quiz_row_id);
+
+-- migrate:down
+
+drop index student_solution_quiz_row_id_idx;
+drop index quiz_room_row_id_idx;
+drop index teacher_sabqcha_user_row_id_idx;
+drop index student_sabqcha_user_row_id_idx;
+drop index sabqcha_user_email_idx;
+drop index room_invite_code_idx;
+drop index session_sabqcha_user_row_id_idx;
+drop index mistake_analysis_task_set_row_id_student_row_id_created_at_idx;
+drop index task_set_attempt_student_row_id_task_set_row_id_idx;
+drop index lecture_lecture_group_row_id_idx;
+drop index lecture_group_room_row_id_idx;
+drop index task_set_lecture_group_row_id_idx;
+drop index task_task_set_row_id_idx;
@@ -0,0 +1,14 @@
+-- migrate:up
+
+alter table llm_content_extract add column content_hash text;
+alter table llm_content_extract add column prompt_version text;
+
+create unique index llm_content_extract_content_hash_prompt_version_idx
+  on llm_content_extract (content_hash, prompt_version)
+  where content_hash is not null;
+
+-- migrate:down
+
+drop index llm_content_extract_content_hash_prompt_version_idx;
+alter table llm_content_extract drop column prompt_version;
+alter table llm_content_extract drop column content_hash;
@@ -0,0 +1,19 @@
+-- migrate:up
+
+alter table job add column stage text;
+alter table job add column progress smallint not null default 0;
+alter table job add column started_at timestamptz;
+alter table job add column finished_at timestamptz;
+alter table job add column updated_at timestamptz not null default now();
+
+update job set
+  progress = case when status = 'SUCCEEDED' then 100 else 0 end,
+  finished_at = case when status in ('SUCCEEDED', 'FAILED') then created_at end;
+
+-- migrate:down
+
+alter table job drop column stage;
+alter table job drop column progress;
+alter table job drop column started_at;
+alter table job drop column finished_at;
+alter table job drop column updated_at;
@@ -0,0 +1,33 @@
+-- migrate:up
+
+create type past_paper_asset_kind as enum (
+  'QUESTION',
+  'MARKING_SCHEME'
+);
+
+-- Question and marking scheme pages prepared for the LLM once, instead of on every grading
+create table past_paper_asset (
+  row_id bigint primary key generated always as identity,
+
+  past_paper_bank_row_id bigint not null references past_paper_bank(row_id) on delete cascade,
+  kind past_paper_asset_kind not null,
+  page int not null,
+
+  source_path text not null,
+  profile text not null,
+  data bytea not null,
+  width int not null,
+  height int not null,
+  source_width int not null,
+  source_height int not null,
+  source_bytes int,
+
+  created_at timestamptz not null default now(),
+
+  unique (past_paper_bank_row_id, kind, page)
+);
+
+-- migrate:down
+
+drop table past_paper_asset;
+drop type past_paper_asset_kind;
@@ -0,0 +1,10 @@
+-- migrate:up
+
+create index past_paper_bank_subject_row_id_idx on past_paper_bank (subject_row_id);
+create index student_past_paper_solution_user_paper_idx
+  on student_past_paper_solution (sabqcha_user_row_id, past_paper_bank_row_id);
+
+-- migrate:down
+
+drop index past_paper_bank_subject_row_id_idx;
+drop index student_past_paper_solution_user_paper_idx;
@@ -0,0 +1,13 @@
+-- migrate:up
+
+alter table lecture_group add column content_version integer not null default 0;
+alter table lecture_group add column digest text;
+alter table lecture_group add column digest_version integer;
+alter table lecture_group add column digest_created_at timestamptz;
+
+-- migrate:down
+
+alter table lecture_group drop column content_version;
+alter table lecture_group drop column digest;
+alter table lecture_group drop column digest_version;
+alter table lecture_group drop column digest_created_at;
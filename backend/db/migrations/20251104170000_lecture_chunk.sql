@@ -0,0 +1,35 @@
+-- migrate:up
+
+-- Transcripts split into passages, so prompts can include only the relevant ones.
+-- 'simple' keeps every word unstemmed, transcripts are Urdu with English terms mixed in
+create table lecture_chunk (
+  row_id bigint primary key generated always as identity,
+
+  lecture_row_id bigint not null references lecture(row_id) on delete cascade,
+  chunk_index int not null,
+  content text not null,
+  search tsvector generated always as (to_tsvector('simple', content)) stored,
+
+  unique (lecture_row_id, chunk_index)
+);
+
+create index lecture_chunk_search_idx on lecture_chunk using gin (search);
+
+-- Same 150 word chunks as lecture_db.add_transcription
+insert into lecture_chunk (lecture_row_id, chunk_index, content)
+select
+  l.row_id,
+  (w.n - 1) / 150,
+  string_agg(w.word, ' ' order by w.n)
+from
+  lecture l
+  cross join lateral regexp_split_to_table(btrim(l.transcribed_content), '\s+')
+    with ordinality as w(word, n)
+where
+  btrim(l.transcribed_content) <> ''
+group by
+  l.row_id, (w.n - 1) / 150;
+
+-- migrate:down
+
+drop table lecture_chunk;
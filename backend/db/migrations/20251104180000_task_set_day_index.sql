@@ -0,0 +1,10 @@
+-- migrate:up
+
+-- Finds a group's task set for a day, and still serves lookups by group alone
+create index task_set_lecture_group_row_id_day_idx on task_set (lecture_group_row_id, day);
+drop index task_set_lecture_group_row_id_idx;
+
+-- migrate:down
+
+create index task_set_lecture_group_row_id_idx on task_set (lecture_group_row_id);
+drop index task_set_lecture_group_row_id_day_idx;
@@ -0,0 +1,12 @@
+-- migrate:up
+
+-- Leaderboard pages are seeked on (score, student) and ranked by counting higher scores,
+-- both served from this index alone
+create index student_room_room_row_id_score_student_row_id_idx
+  on student_room (room_row_id, score desc, student_row_id desc);
+drop index student_room_room_row_id_score_idx;
+
+-- migrate:down
+
+create index student_room_room_row_id_score_idx on student_room (room_row_id, score desc);
+drop index student_room_room_row_id_score_student_row_id_idx;
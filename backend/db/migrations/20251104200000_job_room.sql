@@ -0,0 +1,8 @@
+-- migrate:up
+
+-- Public id of the room whose members are told about the job, null for personal jobs
+alter table job add column room_id text;
+
+-- migrate:down
+
+alter table job drop column room_id;
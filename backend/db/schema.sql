@@ -15,6 +15,18 @@ SET xmloption = content;
 SET client_min_messages = warning;
 SET row_security = off;
 
+--
+-- Name: job_status; Type: TYPE; Schema: public; Owner: -
+--
+
+CREATE TYPE public.job_status AS ENUM (
+    'QUEUED',
+    'RUNNING',
+    'SUCCEEDED',
+    'FAILED'
+);
+
+
 --
 -- Name: llm_content_extract_type; Type: TYPE; Schema: public; Owner: -
 --
@@ -26,6 +38,16 @@ CREATE TYPE public.llm_content_extract_type AS ENUM (
 );
 
 
+--
+-- Name: past_paper_asset_kind; Type: TYPE; Schema: public; Owner: -
+--
+
+CREATE TYPE public.past_paper_asset_kind AS ENUM (
+    'QUESTION',
+    'MARKING_SCHEME'
+);
+
+
 --
 -- Name: program_type; Type: TYPE; Schema: public; Owner: -
 --
@@ -87,7 +109,25 @@ CREATE TABLE public.job (
     public_id text NOT NULL,
     identifier text NOT NULL,
     in_progress boolean NOT NULL,
-    created_at timestamp with time zone DEFAULT now() NOT NULL
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    status public.job_status DEFAULT 'QUEUED'::public.job_status NOT NULL,
+    name text,
+    payload jsonb DEFAULT '{}'::jsonb NOT NULL,
+    user_id text,
+    user_role text,
+    attempts integer DEFAULT 0 NOT NULL,
+    max_attempts integer DEFAULT 3 NOT NULL,
+    run_after timestamp with time zone DEFAULT now() NOT NULL,
+    locked_by text,
+    lease_expires_at timestamp with time zone,
+    heartbeat_at timestamp with time zone,
+    last_error text,
+    stage text,
+    progress smallint DEFAULT 0 NOT NULL,
+    started_at timestamp with time zone,
+    finished_at timestamp with time zone,
+    updated_at timestamp with time zone DEFAULT now() NOT NULL,
+    room_id text
 );
 
 
@@ -120,6 +160,33 @@ CREATE TABLE public.lecture (
 );
 
 
+--
+-- Name: lecture_chunk; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.lecture_chunk (
+    row_id bigint NOT NULL,
+    lecture_row_id bigint NOT NULL,
+    chunk_index integer NOT NULL,
+    content text NOT NULL,
+    search tsvector GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, content)) STORED
+);
+
+
+--
+-- Name: lecture_chunk_row_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+ALTER TABLE public.lecture_chunk ALTER COLUMN row_id ADD GENERATED ALWAYS AS IDENTITY (
+    SEQUENCE NAME public.lecture_chunk_row_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1
+);
+
+
 --
 -- Name: lecture_group; Type: TABLE; Schema: public; Owner: -
 --
@@ -128,7 +195,11 @@ CREATE TABLE public.lecture_group (
     row_id bigint NOT NULL,
     public_id text NOT NULL,
     created_at timestamp with time zone DEFAULT now() NOT NULL,
-    room_row_id bigint NOT NULL
+    room_row_id bigint NOT NULL,
+    content_version integer DEFAULT 0 NOT NULL,
+    digest text,
+    digest_version integer,
+    digest_created_at timestamp with time zone
 );
 
 
@@ -169,7 +240,9 @@ CREATE TABLE public.llm_content_extract (
     public_id text NOT NULL,
     content text NOT NULL,
     content_type public.llm_content_extract_type NOT NULL,
-    created_at timestamp with time zone DEFAULT now() NOT NULL
+    created_at timestamp with time zone DEFAULT now() NOT NULL,
+    content_hash text,
+    prompt_version text
 );
 
 
@@ -215,6 +288,41 @@ ALTER TABLE public.mistake_analysis ALTER COLUMN row_id ADD GENERATED ALWAYS AS
 );
 
 
+--
+-- Name: past_paper_asset; Type: TABLE; Schema: public; Owner: -
+--
+
+CREATE TABLE public.past_paper_asset (
+    row_id bigint NOT NULL,
+    past_paper_bank_row_id bigint NOT NULL,
+    kind public.past_paper_asset_kind NOT NULL,
+    page integer NOT NULL,
+    source_path text NOT NULL,
+    profile text NOT NULL,
+    data bytea NOT NULL,
+    width integer NOT NULL,
+    height integer NOT NULL,
+    source_width integer NOT NULL,
+    source_height integer NOT NULL,
+    source_bytes integer,
+    created_at timestamp with time zone DEFAULT now() NOT NULL
+);
+
+
+--
+-- Name: past_paper_asset_row_id_seq; Type: SEQUENCE; Schema: public; Owner: -
+--
+
+ALTER TABLE public.past_paper_asset ALTER COLUMN row_id ADD GENERATED ALWAYS AS IDENTITY (
+    SEQUENCE NAME public.past_paper_asset_row_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1
+);
+
+
 --
 -- Name: past_paper_bank; Type: TABLE; Schema: public; Owner: -
 --
@@ -645,6 +753,22 @@ ALTER TABLE ONLY public.job
     ADD CONSTRAINT job_public_id_key UNIQUE (public_id);
 
 
+--
+-- Name: lecture_chunk lecture_chunk_lecture_row_id_chunk_index_key; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.lecture_chunk
+    ADD CONSTRAINT lecture_chunk_lecture_row_id_chunk_index_key UNIQUE (lecture_row_id, chunk_index);
+
+
+--
+-- Name: lecture_chunk lecture_chunk_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.lecture_chunk
+    ADD CONSTRAINT lecture_chunk_pkey PRIMARY KEY (row_id);
+
+
 --
 -- Name: lecture_group lecture_group_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -709,6 +833,22 @@ ALTER TABLE ONLY public.mistake_analysis
     ADD CONSTRAINT mistake_analysis_public_id_key UNIQUE (public_id);
 
 
+--
+-- Name: past_paper_asset past_paper_asset_past_paper_bank_row_id_kind_page_key; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.past_paper_asset
+    ADD CONSTRAINT past_paper_asset_past_paper_bank_row_id_kind_page_key UNIQUE (past_paper_bank_row_id, kind, page);
+
+
+--
+-- Name: past_paper_asset past_paper_asset_pkey; Type: CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.past_paper_asset
+    ADD CONSTRAINT past_paper_asset_pkey PRIMARY KEY (row_id);
+
+
 --
 -- Name: past_paper_bank past_paper_bank_pkey; Type: CONSTRAINT; Schema: public; Owner: -
 --
@@ -925,6 +1065,139 @@ ALTER TABLE ONLY public.teacher
     ADD CONSTRAINT teacher_pkey PRIMARY KEY (row_id);
 
 
+--
+-- Name: job_claim_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX job_claim_idx ON public.job USING btree (run_after) WHERE (status = ANY (ARRAY['QUEUED'::public.job_status, 'RUNNING'::public.job_status]));
+
+
+--
+-- Name: lecture_chunk_search_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX lecture_chunk_search_idx ON public.lecture_chunk USING gin (search);
+
+
+--
+-- Name: lecture_group_room_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX lecture_group_room_row_id_idx ON public.lecture_group USING btree (room_row_id);
+
+
+--
+-- Name: lecture_lecture_group_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX lecture_lecture_group_row_id_idx ON public.lecture USING btree (lecture_group_row_id);
+
+
+--
+-- Name: llm_content_extract_content_hash_prompt_version_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE UNIQUE INDEX llm_content_extract_content_hash_prompt_version_idx ON public.llm_content_extract USING btree (content_hash, prompt_version) WHERE (content_hash IS NOT NULL);
+
+
+--
+-- Name: mistake_analysis_task_set_row_id_student_row_id_created_at_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX mistake_analysis_task_set_row_id_student_row_id_created_at_idx ON public.mistake_analysis USING btree (task_set_row_id, student_row_id, created_at);
+
+
+--
+-- Name: past_paper_bank_subject_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX past_paper_bank_subject_row_id_idx ON public.past_paper_bank USING btree (subject_row_id);
+
+
+--
+-- Name: quiz_room_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX quiz_room_row_id_idx ON public.quiz USING btree (room_row_id);
+
+
+--
+-- Name: room_invite_code_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX room_invite_code_idx ON public.room USING btree (invite_code);
+
+
+--
+-- Name: sabqcha_user_email_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX sabqcha_user_email_idx ON public.sabqcha_user USING btree (email);
+
+
+--
+-- Name: session_sabqcha_user_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX session_sabqcha_user_row_id_idx ON public.session USING btree (sabqcha_user_row_id);
+
+
+--
+-- Name: student_past_paper_solution_user_paper_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX student_past_paper_solution_user_paper_idx ON public.student_past_paper_solution USING btree (sabqcha_user_row_id, past_paper_bank_row_id);
+
+
+--
+-- Name: student_room_room_row_id_score_student_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX student_room_room_row_id_score_student_row_id_idx ON public.student_room USING btree (room_row_id, score DESC, student_row_id DESC);
+
+
+--
+-- Name: student_sabqcha_user_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX student_sabqcha_user_row_id_idx ON public.student USING btree (sabqcha_user_row_id);
+
+
+--
+-- Name: student_solution_quiz_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX student_solution_quiz_row_id_idx ON public.student_solution USING btree (quiz_row_id);
+
+
+--
+-- Name: task_set_attempt_student_row_id_task_set_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX task_set_attempt_student_row_id_task_set_row_id_idx ON public.task_set_attempt USING btree (student_row_id, task_set_row_id);
+
+
+--
+-- Name: task_set_lecture_group_row_id_day_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX task_set_lecture_group_row_id_day_idx ON public.task_set USING btree (lecture_group_row_id, day);
+
+
+--
+-- Name: task_task_set_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX task_task_set_row_id_idx ON public.task USING btree (task_set_row_id);
+
+
+--
+-- Name: teacher_sabqcha_user_row_id_idx; Type: INDEX; Schema: public; Owner: -
+--
+
+CREATE INDEX teacher_sabqcha_user_row_id_idx ON public.teacher USING btree (sabqcha_user_row_id);
+
+
 --
 -- Name: device_user device_user_sabqcha_user_row_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
 --
@@ -933,6 +1206,14 @@ ALTER TABLE ONLY public.device_user
     ADD CONSTRAINT device_user_sabqcha_user_row_id_fkey FOREIGN KEY (sabqcha_user_row_id) REFERENCES public.sabqcha_user(row_id);
 
 
+--
+-- Name: lecture_chunk lecture_chunk_lecture_row_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.lecture_chunk
+    ADD CONSTRAINT lecture_chunk_lecture_row_id_fkey FOREIGN KEY (lecture_row_id) REFERENCES public.lecture(row_id) ON DELETE CASCADE;
+
+
 --
 -- Name: lecture_group lecture_group_room_row_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
 --
@@ -965,6 +1246,14 @@ ALTER TABLE ONLY public.mistake_analysis
     ADD CONSTRAINT mistake_analysis_task_set_row_id_fkey FOREIGN KEY (task_set_row_id) REFERENCES public.task_set(row_id);
 
 
+--
+-- Name: past_paper_asset past_paper_asset_past_paper_bank_row_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
+--
+
+ALTER TABLE ONLY public.past_paper_asset
+    ADD CONSTRAINT past_paper_asset_past_paper_bank_row_id_fkey FOREIGN KEY (past_paper_bank_row_id) REFERENCES public.past_paper_bank(row_id) ON DELETE CASCADE;
+
+
 --
 -- Name: past_paper_bank past_paper_bank_subject_row_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: -
 --
@@ -1154,4 +1443,16 @@ INSERT INTO public.schema_migrations (version) VALUES
     ('20251025080248'),
     ('20251025143919'),
     ('20251026083021'),
-    ('20251102153351');
+    ('20251102153351'),
+    ('20251104090000'),
+    ('20251104100000'),
+    ('20251104110000'),
+    ('20251104120000'),
+    ('20251104130000'),
+    ('20251104140000'),
+    ('20251104150000'),
+    ('20251104160000'),
+    ('20251104170000'),
+    ('20251104180000'),
+    ('20251104190000'),
+    ('20251104200000');
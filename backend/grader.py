@@ -1,9 +1,8 @@
-import base64
 import os
 import sys
-from io import BytesIO
 
 import fitz
+from api import image_prep
 from api.prompts import GRADER_SYSTEM_PROMPT
 from loguru import logger
 from openai import AsyncOpenAI
@@ -68,18 +67,14 @@ def main():
     read_pdf()
 
 
-def encode_image(image_path) -> str:
-    """Function to encode the image"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+def prepare_images(paths: list[str], profile: image_prep.ImageProfile) -> list[dict[str, str]]:
+    images = []
+    for path in paths:
+        with open(path, "rb") as image_file:
+            images.append(image_prep.prepare_image_bytes(image_file.read(), profile))
 
-
-def get_model_input_for_img(path):
-    base64_image = encode_image(path)
-    return {
-        "type": "input_image",
-        "image_url": f"data:image/jpeg;base64,{base64_image}",
-    }
+    image_prep.record_savings(f"{len(paths)} {profile.name} images", images)
+    return [image_prep.get_model_input(img) for img in images]
 
 
 async def grader() -> str:
@@ -96,17 +91,17 @@ async def grader() -> str:
                         "type": "input_text",
                         "text": "Rubric for grading guidelines:",
                     },
-                    *[get_model_input_for_img(img) for img in physics_p1_rubrics],
+                    *prepare_images(physics_p1_rubrics, image_prep.DOCUMENT),
                     {
                         "type": "input_text",
                         "text": "Correct solution for reference:",
                     },
-                    *[get_model_input_for_img(img) for img in physics_p1_answers],
+                    *prepare_images(physics_p1_answers, image_prep.DOCUMENT),
                     {
                         "type": "input_text",
                         "text": "Student's answer to be graded:",
                     },
-                    *[get_model_input_for_img(img) for img in physics_p1_solutions],
+                    *prepare_images(physics_p1_solutions, image_prep.HANDWRITING),
                     {
                         "type": "input_text",
                         "text": (
@@ -176,9 +171,9 @@ async def draw_annotations():
     img = Image.open("s-1-cropped.jpg")
     img = ImageOps.exif_transpose(img)
 
-    buffer = BytesIO()
-    img.save(buffer, format="jpeg")
-    img_64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    # Annotations are normalized, so the model can be sent a smaller copy
+    prepared = image_prep.prepare_image(img, image_prep.HANDWRITING)
+    image_prep.record_savings("Annotation", [prepared])
 
     response = await openai_client.responses.parse(
         model="gpt-5-mini",
@@ -187,10 +182,7 @@ async def draw_annotations():
                 "role": "user",
                 "content": [
                     {"type": "input_text", "text": "Student's solution"},
-                    {
-                        "type": "input_image",
-                        "image_url": f"data:image/jpeg;base64,{img_64}",
-                    },
+                    image_prep.get_model_input(prepared),
                     {
                         "type": "input_text",
                         "text": """Return annotations around each question in the provided image.
@@ -238,18 +230,23 @@ async def simple_grader():
                         "type": "input_text",
                         "text": "Rubric for grading guidelines:",
                     },
-                    *[get_model_input_for_img(img) for img in physics_p1_rubrics],
+                    *prepare_images(physics_p1_rubrics, image_prep.DOCUMENT),
                     {
                         "type": "input_text",
                         "text": "Correct solution for reference:",
                     },
-                    get_model_input_for_img("content/pdf_images/ms-p2-2025.jpg"),
+                    *prepare_images(["content/pdf_images/ms-p2-2025.jpg"], image_prep.DOCUMENT),
                     {
                         "type": "input_text",
                         "text": "Student's answer to be graded:",
                     },
-                    get_model_input_for_img("content/pdf_images/sol-p2-maryam_p_1.jpg"),
-                    get_model_input_for_img("content/pdf_images/sol-p2-maryam_p_2.jpg"),
+                    *prepare_images(
+                        [
+                            "content/pdf_images/sol-p2-maryam_p_1.jpg",
+                            "content/pdf_images/sol-p2-maryam_p_2.jpg",
+                        ],
+                        image_prep.HANDWRITING,
+                    ),
                     {
                         "type": "input_text",
                         "text": (